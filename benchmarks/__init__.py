@@ -0,0 +1 @@
+# Бенчмарки и локальный стенд Qobuz API
@@ -0,0 +1,418 @@
+"""
+Микробенчмарки горячих путей core/
+Результаты выводятся в JSON, чтобы сравнивать их между релизами.
+
+Запуск:
+    python -m benchmarks.bench_core                         # все бенчмарки, таблица
+    python -m benchmarks.bench_core --json results.json     # сохранить результаты
+    python -m benchmarks.bench_core --compare results.json  # сравнить с прошлым прогоном
+    python -m benchmarks.bench_core -k lrc -k filename      # только выбранные
+"""
+import argparse
+import json
+import logging
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.mock_qobuz_server import COVER_JPEG, make_flac_payload, make_mp3_payload  # noqa: E402
+
+
+# Реестр бенчмарков: имя → функция подготовки, возвращающая (вызываемое, число операций на вызов)
+BENCHMARKS = {}
+
+
+def benchmark(name: str):
+    """Регистрация бенчмарка"""
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+# --- Синтетические данные ---
+
+def make_candidates(count: int, artist: str, title: str, rnd: random.Random) -> List[Dict]:
+    """Кандидаты в формате ответа LRCLib /api/search"""
+    candidates = []
+    for i in range(count):
+        kind = rnd.random()
+        if kind < 0.1:
+            item_artist, item_title = artist, f"{title} (Live {i})"
+        elif kind < 0.5:
+            item_artist, item_title = f"{artist} Tribute {i}", title
+        else:
+            item_artist, item_title = f"Other Artist {i}", f"Other Song {i} [Remix]"
+        candidates.append({
+            'id': i,
+            'trackName': item_title,
+            'artistName': item_artist,
+            'albumName': f"Album {i % 17}",
+            'duration': 200 + rnd.randint(-120, 120),
+            'instrumental': False,
+            'plainLyrics': "la la la" if i % 3 else None,
+            'syncedLyrics': "[00:01.00]la la la" if i % 2 else None,
+        })
+    return candidates
+
+
+def make_lrc(lines: int, karaoke: bool = False) -> str:
+    """LRC заданной длины (опционально - с таймкодами слов)"""
+    out = ["[ar:Bench Artist]", "[ti:Bench Title]"]
+    for i in range(lines):
+        ms = i * 3170
+        stamp = f"[{ms // 60000:02d}:{ms // 1000 % 60:02d}.{ms % 1000 // 10:02d}]"
+        if karaoke:
+            words = " ".join(
+                f"<{(ms + w * 300) // 60000:02d}:{(ms + w * 300) // 1000 % 60:02d}.{(ms + w * 300) % 1000 // 10:02d}>word{w}"
+                for w in range(6)
+            )
+            out.append(f"{stamp}{words}")
+        else:
+            out.append(f"{stamp}Line number {i} with some words in it")
+    return "\n".join(out)
+
+
+def make_track_meta(n: int) -> Dict:
+    return {
+        'id': 100000 + n,
+        'title': f"Track {n}: \"Quoted\" / Slashed?",
+        'version': "Remastered 2011" if n % 4 == 0 else None,
+        'track_number': n,
+        'duration': 245,
+        'isrc': f"GBAAA{n:07d}",
+        'performer': {'name': "Bench Artist"},
+        'copyright': "(P) Bench Records",
+        'composer': {'name': "Bench Composer"},
+        'parental_warning': n % 5 == 0,
+    }
+
+
+def make_album_meta(tracks: int = 12) -> Dict:
+    return {
+        'id': "benchalbum01",
+        'title': "Bench Album <Deluxe Edition>",
+        'artist': {'name': "Bench Artist"},
+        'release_date_original': "2011-09-26",
+        'label': {'name': "Bench Records"},
+        'genre': {'name': "Rock"},
+        'upc': "0602527809880",
+        'release_type': 'album',
+        'tracks': {'items': [make_track_meta(n) for n in range(1, tracks + 1)]},
+    }
+
+
+def make_links(count: int, rnd: random.Random) -> List[str]:
+    kinds = ['album', 'track', 'artist', 'playlist', 'label']
+    links = []
+    for i in range(count):
+        kind = rnd.choice(kinds)
+        if i % 3 == 0:
+            links.append(f"https://play.qobuz.com/{kind}/{rnd.getrandbits(40):x}")
+        elif i % 3 == 1:
+            links.append(f"https://www.qobuz.com/us-en/{kind}/some-title-(remastered-{i})/{rnd.getrandbits(40):x}")
+        else:
+            links.append(f"https://open.qobuz.com/{kind}/{rnd.randint(1, 10 ** 8)}")
+        if i % 50 == 0:
+            links.append("# комментарий")
+    return links
+
+
+# --- Бенчмарки ---
+
+@benchmark('lyrics.find_best_match.1000')
+def bench_find_best_match(ctx):
+    from core.lyrics_search import LyricsSearcher
+    searcher = LyricsSearcher()
+    candidates = make_candidates(1000, "Bench Artist", "Bench Title", ctx['rnd'])
+    return lambda: searcher._find_best_match(candidates, "Bench Artist", "Bench Title", 200, True), 1
+
+
+@benchmark('lyrics.find_best_match.10000')
+def bench_find_best_match_large(ctx):
+    from core.lyrics_search import LyricsSearcher
+    searcher = LyricsSearcher()
+    candidates = make_candidates(10000, "Bench Artist", "Bench Title", ctx['rnd'])
+    return lambda: searcher._find_best_match(candidates, "Bench Artist", "Bench Title", 200, False), 1
+
+
+@benchmark('lyrics.get_clean_title')
+def bench_clean_title(ctx):
+    from core.lyrics_search import LyricsSearcher
+    searcher = LyricsSearcher()
+    titles = [
+        "01. Song Title (Remastered 2011) [Deluxe] - Live",
+        "Another_Song_Name 'Radio Edit' «Версия»",
+        "Plain title",
+        "Track \"Quoted\" - acoustic",
+    ] * 250
+
+    def run():
+        for title in titles:
+            searcher._get_clean_title(title)
+    return run, len(titles)
+
+
+@benchmark('lyrics.lrc_to_srt.200_lines')
+def bench_lrc_to_srt(ctx):
+    from core.lyrics_search import LyricsSearcher
+    from core import lrc
+    searcher = LyricsSearcher()
+    text = make_lrc(200)
+
+    def run():
+        # Сбрасываем кеш разбора, чтобы мерить полный цикл
+        lrc.parse_lrc.cache_clear()
+        searcher.lrc_to_srt(text)
+    return run, 1
+
+
+@benchmark('lyrics.lrc_to_srt.karaoke')
+def bench_lrc_to_srt_karaoke(ctx):
+    from core.lyrics_search import LyricsSearcher
+    from core import lrc
+    searcher = LyricsSearcher()
+    text = make_lrc(200, karaoke=True)
+
+    def run():
+        lrc.parse_lrc.cache_clear()
+        searcher.lrc_to_srt(text)
+    return run, 1
+
+
+def _embed_bench(ctx, ext: str, size: int, with_cover: bool):
+    from core.metadata import MetadataWriter, _load_mutagen
+    _load_mutagen()  # вызываем _embed_* напрямую, минуя embed_metadata
+    writer = MetadataWriter({'lyrics_enable': True, 'download_cover': True})
+    path = Path(ctx['tmp']) / f"bench_{ext}_{size}_{int(with_cover)}.{ext}"
+    data = make_flac_payload(size) if ext == 'flac' else make_mp3_payload(size)
+    path.write_bytes(data)
+    meta = {**make_track_meta(1), 'album': make_album_meta(1)}
+    lrc_text = make_lrc(60)
+    cover = COVER_JPEG if with_cover else None
+    embed = writer._embed_flac if ext == 'flac' else writer._embed_mp3
+    return lambda: embed(path, meta, None, lrc_text, cover), 1
+
+
+@benchmark('metadata.embed_flac.40mb')
+def bench_embed_flac(ctx):
+    return _embed_bench(ctx, 'flac', 40 * 1024 * 1024, False)
+
+
+@benchmark('metadata.embed_flac.40mb_cover')
+def bench_embed_flac_cover(ctx):
+    return _embed_bench(ctx, 'flac', 40 * 1024 * 1024, True)
+
+
+@benchmark('metadata.embed_mp3.10mb')
+def bench_embed_mp3(ctx):
+    return _embed_bench(ctx, 'mp3', 10 * 1024 * 1024, False)
+
+
+@benchmark('metadata.embed_mp3.10mb_cover')
+def bench_embed_mp3_cover(ctx):
+    return _embed_bench(ctx, 'mp3', 10 * 1024 * 1024, True)
+
+
+def _make_downloader(ctx):
+    from core.downloader import QobuzDownloader
+    settings = {
+        'download_folder': ctx['tmp'],
+        'folder_template': '{artist} - {album} ({year}) [{label}] {upc}',
+        'file_template': '{tracknumber}. {artist} - {title} [{isrc}]',
+    }
+    return QobuzDownloader(None, settings)
+
+
+@benchmark('naming.get_track_filename')
+def bench_track_filename(ctx):
+    downloader = _make_downloader(ctx)
+    album = make_album_meta(100)
+    tracks = album['tracks']['items']
+
+    def run():
+        for track in tracks:
+            downloader.get_track_filename(track, album)
+    return run, len(tracks)
+
+
+@benchmark('naming.get_album_folder')
+def bench_album_folder(ctx):
+    downloader = _make_downloader(ctx)
+    album = make_album_meta(1)
+
+    def run():
+        for _ in range(100):
+            downloader.get_album_folder(album)
+    return run, 100
+
+
+@benchmark('urls.downloader.get_url_info.10000')
+def bench_get_url_info(ctx):
+    from core.downloader import get_url_info
+    links = make_links(10000, ctx['rnd'])
+
+    def run():
+        for link in links:
+            get_url_info(link)
+    return run, len(links)
+
+
+@benchmark('urls.dispatcher.parse_sources.10000')
+def bench_parse_sources(ctx):
+    from core.url_dispatcher import get_url_info, parse_sources
+    links_file = Path(ctx['tmp']) / "links.txt"
+    links_file.write_text("\n".join(make_links(10000, ctx['rnd'])), encoding='utf-8')
+
+    def run():
+        for url in parse_sources([str(links_file)]):
+            get_url_info(url)
+    return run, 10000
+
+
+# --- Запуск ---
+
+def measure(func: Callable, ops: int, min_time: float, repeat: int) -> Dict:
+    """
+    Замер: калибруем число вызовов на раунд под min_time, затем repeat раундов.
+    Возвращает время на одну операцию (секунды).
+    """
+    func()  # прогрев
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        # Экстраполируем число вызовов по последнему замеру (не меньше чем вдвое больше)
+        loops = max(loops * 2, int(loops * min_time / elapsed)) if elapsed > 0 else loops * 10
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - started) / (loops * ops))
+
+    return {
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.fmean(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'ops_per_sec': 1.0 / min(samples) if min(samples) else 0.0,
+        'loops': loops,
+        'ops_per_call': ops,
+        'repeat': repeat,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                             text=True, cwd=Path(__file__).resolve().parent, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_all(selected: List[str] = None, min_time: float = 0.2, repeat: int = 5, seed: int = 1) -> Dict:
+    results = {}
+    tmp = tempfile.mkdtemp(prefix="qobuz_bench_core_")
+    try:
+        for name, setup in BENCHMARKS.items():
+            if selected and not any(key in name for key in selected):
+                continue
+            ctx = {'tmp': tmp, 'rnd': random.Random(seed)}
+            try:
+                func, ops = setup(ctx)
+            except ImportError as e:
+                results[name] = {'skipped': f"нет зависимости: {e}"}
+                continue
+            results[name] = measure(func, ops, min_time, repeat)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    return {
+        'benchmark': 'core',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Список регрессий: медиана выросла больше чем на threshold (доля)"""
+    regressions = []
+    for name, res in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base or 'median' not in base or 'median' not in res:
+            continue
+        ratio = res['median'] / base['median'] if base['median'] else 1.0
+        if ratio > 1.0 + threshold:
+            regressions.append(f"{name}: {base['median'] * 1e6:.2f} → {res['median'] * 1e6:.2f} мкс/оп (x{ratio:.2f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарки core/")
+    parser.add_argument('-k', dest='select', action='append', help="подстрока имени бенчмарка (можно несколько)")
+    parser.add_argument('--min-time', type=float, default=0.2, help="минимальное время раунда, секунд")
+    parser.add_argument('--repeat', type=int, default=5, help="число раундов")
+    parser.add_argument('--json', metavar='FILE', help="сохранить результаты в JSON ('-' - stdout)")
+    parser.add_argument('--compare', metavar='FILE', help="сравнить с сохранёнными результатами")
+    parser.add_argument('--threshold', type=float, default=0.10, help="допустимое замедление (доля), по умолчанию 0.10")
+    parser.add_argument('--list', action='store_true', help="показать список бенчмарков")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    logging.basicConfig(level=logging.ERROR)
+    # Логи бенчмаркаемых функций не должны влиять на замеры
+    logging.disable(logging.CRITICAL)
+
+    data = run_all(args.select, args.min_time, args.repeat)
+
+    if args.json != '-':
+        for name, res in data['results'].items():
+            if 'skipped' in res:
+                print(f"{name:45s} пропущен ({res['skipped']})")
+            else:
+                print(f"{name:45s} {res['median'] * 1e6:12.2f} мкс/оп  {res['ops_per_sec']:12.0f} оп/с")
+
+    if args.json:
+        text = json.dumps(data, indent=2, ensure_ascii=False)
+        if args.json == '-':
+            print(text)
+        else:
+            Path(args.json).write_text(text, encoding='utf-8')
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        regressions = compare(data, baseline, args.threshold)
+        if regressions:
+            print("\nРегрессии:")
+            for line in regressions:
+                print(f"  ✗ {line}")
+            return 1
+        print("\n✓ Регрессий не обнаружено")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+Сквозной бенчмарк скачивания на локальном стенде Qobuz API
+Прогоняет QobuzDownloader.download_album / download_artist против
+MockQobuzServer и выводит треков/с, МБ/с и p50/p99 задержки на трек.
+
+Запуск:
+    python -m benchmarks.bench_e2e --mode artist --albums 4 --tracks 8 --track-size 8 --bandwidth 50
+    python -m benchmarks.bench_e2e --json bench_e2e.json
+    python -m benchmarks.bench_e2e --drop-after 1   # обрывы соединения: все треки должны докачаться
+"""
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.mock_qobuz_server import MockQobuzServer  # noqa: E402
+from core.downloader import QobuzDownloader  # noqa: E402
+from core.qobuz_api import QobuzClient  # noqa: E402
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Перцентиль (метод ближайшего ранга)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def run_benchmark(mode: str = 'album', albums: int = 3, tracks: int = 10,
+                  track_size: int = 5 * 1024 * 1024, latency: float = 0.0,
+                  bandwidth: int = None, quality_index: int = 1,
+                  lyrics: bool = True, settings_override: Dict = None,
+                  drop_after: int = None) -> Dict:
+    """
+    Один прогон бенчмарка.
+
+    Returns:
+        словарь с результатами (треки, байты, время, треков/с, МБ/с, p50/p99)
+    """
+    with MockQobuzServer(latency=latency, bandwidth=bandwidth, albums=albums,
+                         tracks_per_album=tracks, track_size=track_size,
+                         lyrics=lyrics, drop_after=drop_after) as server, \
+            tempfile.TemporaryDirectory(prefix="qobuz_bench_") as tmp:
+
+        settings = {
+            'download_folder': tmp,
+            'quality_index': quality_index,
+            'download_cover': True,
+            'create_playlist': True,
+            'folder_template': '{artist} - {album} ({year})',
+            'file_template': '{tracknumber}. {artist} - {title}',
+            'lyrics_enable': lyrics,
+            'lyrics_save_lrc': True,
+            'lyrics_save_srt': True,
+            'lyrics_save_txt': True,
+        }
+        settings.update(settings_override or {})
+
+        client = QobuzClient("bench@example.com", "bench", "123456789",
+                             {'mock': "mock-secret"}, base_url=server.api_url)
+        downloader = QobuzDownloader(client, settings)
+        downloader.lyrics_searcher.API_URL = server.lyrics_url
+
+        # Замер задержки на каждый трек
+        latencies = []
+        original_download_track = downloader.download_track
+
+        def timed_download_track(*args, **kwargs):
+            started = time.perf_counter()
+            result = original_download_track(*args, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            return result
+
+        downloader.download_track = timed_download_track
+
+        started = time.perf_counter()
+        if mode == 'artist':
+            ok = downloader.download_artist("1")
+        else:
+            ok = all(downloader.download_album(server.catalog.album_id(i)) for i in range(albums))
+        elapsed = time.perf_counter() - started
+        downloader.export_trace()
+
+        audio_files = [p for p in Path(tmp).rglob('*') if p.suffix in ('.flac', '.mp3')]
+        total_bytes = sum(p.stat().st_size for p in audio_files)
+        # После обрывов все треки должны быть докачаны до конца
+        if drop_after and len(audio_files) != albums * tracks:
+            ok = False
+
+        return {
+            'mode': mode,
+            'success': bool(ok),
+            'tracks': len(audio_files),
+            'bytes': total_bytes,
+            'seconds': round(elapsed, 4),
+            'tracks_per_sec': round(len(audio_files) / elapsed, 3) if elapsed else 0.0,
+            'mb_per_sec': round(total_bytes / 1024 / 1024 / elapsed, 3) if elapsed else 0.0,
+            'track_latency_p50': round(percentile(latencies, 50), 4),
+            'track_latency_p99': round(percentile(latencies, 99), 4),
+            'api_requests': dict(server.requests_count),
+            'params': {
+                'albums': albums,
+                'tracks_per_album': tracks,
+                'track_size': track_size,
+                'latency': latency,
+                'bandwidth': bandwidth,
+                'quality_index': quality_index,
+                'lyrics': lyrics,
+                'drop_after': drop_after,
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк скачивания")
+    parser.add_argument('--mode', choices=['album', 'artist'], default='album')
+    parser.add_argument('--albums', type=int, default=3)
+    parser.add_argument('--tracks', type=int, default=10, help="треков в альбоме")
+    parser.add_argument('--track-size', type=float, default=5.0, help="размер трека, МБ")
+    parser.add_argument('--latency', type=float, default=0.0, help="задержка API, секунд")
+    parser.add_argument('--bandwidth', type=float, default=0.0, help="скорость CDN, МБ/с (0 - без ограничений)")
+    parser.add_argument('--quality', type=int, default=1, help="quality_index (0-3)")
+    parser.add_argument('--no-lyrics', action='store_true', help="не искать тексты")
+    parser.add_argument('--drop-after', type=float, default=0.0,
+                        help="обрывать скачивание каждого файла после стольких МБ (проверка докачки)")
+    parser.add_argument('--repeat', type=int, default=1, help="число прогонов")
+    parser.add_argument('--trace', metavar='FILE', help="записать замеры по этапам (.jsonl или .json)")
+    parser.add_argument('--json', metavar='FILE', help="сохранить результаты в JSON ('-' - stdout)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    runs = []
+    for _ in range(args.repeat):
+        runs.append(run_benchmark(
+            mode=args.mode,
+            albums=args.albums,
+            tracks=args.tracks,
+            track_size=int(args.track_size * 1024 * 1024),
+            latency=args.latency,
+            bandwidth=int(args.bandwidth * 1024 * 1024) or None,
+            quality_index=args.quality,
+            lyrics=not args.no_lyrics,
+            settings_override={'trace_file': args.trace} if args.trace else None,
+            drop_after=int(args.drop_after * 1024 * 1024) or None,
+        ))
+
+    for r in runs:
+        print(f"{r['mode']}: {r['tracks']} треков, {r['bytes'] / 1024 / 1024:.1f} МБ за {r['seconds']:.2f} с | "
+              f"{r['tracks_per_sec']:.2f} треков/с, {r['mb_per_sec']:.2f} МБ/с | "
+              f"p50 {r['track_latency_p50'] * 1000:.1f} мс, p99 {r['track_latency_p99'] * 1000:.1f} мс")
+
+    if args.json:
+        data = json.dumps({'benchmark': 'e2e', 'runs': runs}, indent=2, ensure_ascii=False)
+        if args.json == '-':
+            print(data)
+        else:
+            Path(args.json).write_text(data, encoding='utf-8')
+
+    return 0 if all(r['success'] for r in runs) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Бенчмарк запуска: время до окна входа и до первого скачанного трека
+Каждый сценарий выполняется в отдельном интерпретаторе (холодный импорт),
+с профилем импорта (-X importtime) и бюджетом времени.
+
+Запуск:
+    python -m benchmarks.bench_startup                    # все сценарии, таблица
+    python -m benchmarks.bench_startup --repeat 5 --json startup.json
+    python -m benchmarks.bench_startup --profile 15       # 15 самых дорогих импортов
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.mock_qobuz_server import MockQobuzServer  # noqa: E402
+
+
+# Бюджеты (медиана, секунды) - от запуска интерпретатора до готовности
+BUDGETS = {
+    'import.cli': 0.25,
+    'import.engine': 0.6,
+    'login_window': 1.5,
+    'first_download': 2.0,
+}
+
+# Код сценариев: выполняется в дочернем процессе, время меряется снаружи
+SCENARIOS = {
+    # Консольный режим до разбора аргументов
+    'import.cli': """
+import cli
+""",
+    # Движок скачивания (консольный режим после авторизации)
+    'import.engine': """
+import core.engine
+""",
+    # То, что делает main() до показа окна входа
+    'login_window': """
+import os
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+import main
+from PyQt6.QtWidgets import QApplication
+app = QApplication([])
+config = main.ConfigManager()
+settings = config.load_settings()
+from gui.login_window import LoginWindow
+window = LoginWindow(config=config)
+window.show()
+app.processEvents()
+""",
+    # Импорт движка, клиент, один трек с тегами и текстом с локального стенда
+    'first_download': """
+import os, tempfile
+from core.qobuz_api import QobuzClient
+from core.downloader import QobuzDownloader
+client = QobuzClient("bench@example.com", "bench", "123456789", {'mock': "mock-secret"},
+                     base_url=os.environ['BENCH_API_URL'])
+with tempfile.TemporaryDirectory() as tmp:
+    downloader = QobuzDownloader(client, {'download_folder': tmp, 'quality_index': 1})
+    downloader.lyrics_searcher.API_URL = os.environ['BENCH_LYRICS_URL']
+    assert downloader.download_track_by_id('1')
+    downloader.finish()
+""",
+}
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """
+    Разбор вывода -X importtime:
+    "import time:  self [us] | cumulative | imported package" (вложенность - отступом)
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # заголовок
+        name = fields[2].rstrip()
+        rows.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_ms': int(fields[0]) / 1000,
+            'cumulative_ms': int(fields[1]) / 1000,
+        })
+    return rows
+
+
+def run_scenario(name: str, env: Dict, profile: bool = False) -> Dict:
+    """Один холодный запуск сценария"""
+    args = [sys.executable]
+    if profile:
+        args += ['-X', 'importtime']
+    args += ['-c', SCENARIOS[name]]
+
+    started = time.perf_counter()
+    proc = subprocess.run(args, cwd=ROOT, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+
+    result = {'scenario': name, 'seconds': elapsed, 'ok': proc.returncode == 0}
+    if proc.returncode != 0:
+        lines = [line for line in proc.stderr.strip().splitlines() if not line.startswith('import time:')]
+        result['error'] = lines[-1] if lines else f"exit code {proc.returncode}"
+    if profile:
+        result['imports'] = parse_importtime(proc.stderr)
+    return result
+
+
+def run_all(names: List[str], repeat: int, profile_top: int) -> List[Dict]:
+    results = []
+    with MockQobuzServer(albums=1, tracks_per_album=1, track_size=4 * 1024 * 1024) as server:
+        env = dict(os.environ)
+        env['BENCH_API_URL'] = server.api_url
+        env['BENCH_LYRICS_URL'] = server.lyrics_url
+        env['PYTHONDONTWRITEBYTECODE'] = '1'
+
+        for name in names:
+            runs = [run_scenario(name, env) for _ in range(repeat)]
+            ok_runs = [r['seconds'] for r in runs if r['ok']]
+            entry = {
+                'scenario': name,
+                'ok': bool(ok_runs),
+                'median': statistics.median(ok_runs) if ok_runs else None,
+                'min': min(ok_runs) if ok_runs else None,
+                'budget': BUDGETS.get(name),
+                'runs': [round(r['seconds'], 4) for r in runs],
+            }
+            errors = [r['error'] for r in runs if not r['ok']]
+            if errors:
+                entry['error'] = errors[0]
+            if ok_runs and profile_top:
+                imports = run_scenario(name, env, profile=True).get('imports', [])
+                # Самые дорогие модули верхнего уровня (накопленное время),
+                # кроме стандартной библиотеки и запуска интерпретатора
+                top = sorted((row for row in imports if row['depth'] == 0 and
+                              row['module'].split('.')[0] not in sys.stdlib_module_names),
+                             key=lambda row: row['cumulative_ms'], reverse=True)
+                entry['imports_top'] = top[:profile_top]
+            results.append(entry)
+    return results
+
+
+def over_budget(entry: Dict) -> bool:
+    return entry['ok'] and entry['budget'] is not None and entry['median'] > entry['budget']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк запуска")
+    parser.add_argument('-k', action='append', dest='only', metavar='NAME',
+                        help="только сценарии, содержащие подстроку (можно несколько)")
+    parser.add_argument('--repeat', type=int, default=3, help="запусков на сценарий")
+    parser.add_argument('--profile', type=int, default=10, metavar='N',
+                        help="показать N самых дорогих импортов (0 - без профиля)")
+    parser.add_argument('--json', metavar='FILE', help="сохранить результаты в JSON ('-' - stdout)")
+    args = parser.parse_args()
+
+    names = [name for name in SCENARIOS if not args.only or any(k in name for k in args.only)]
+    results = run_all(names, args.repeat, args.profile)
+
+    for entry in results:
+        if not entry['ok']:
+            print(f"{entry['scenario']:<16} пропущен: {entry.get('error')}")
+            continue
+        mark = "ПРЕВЫШЕН" if over_budget(entry) else "ok"
+        print(f"{entry['scenario']:<16} {entry['median'] * 1000:8.1f} мс  "
+              f"(бюджет {entry['budget'] * 1000:.0f} мс, {mark})")
+        for row in entry.get('imports_top', []):
+            print(f"    {row['cumulative_ms']:8.1f} мс  {row['module']}")
+
+    if args.json:
+        data = json.dumps({'benchmark': 'startup', 'python': sys.version.split()[0],
+                           'results': results}, indent=2, ensure_ascii=False)
+        if args.json == '-':
+            print(data)
+        else:
+            Path(args.json).write_text(data, encoding='utf-8')
+
+    return 1 if any(over_budget(entry) for entry in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
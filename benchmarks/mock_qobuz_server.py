@@ -0,0 +1,448 @@
+"""
+Локальный стенд Qobuz API для замеров без подписки
+Реализует эндпоинты, которые использует QobuzClient.api_call, и раздаёт
+синтетические FLAC/MP3 с настраиваемой задержкой и пропускной способностью.
+
+Запуск:
+    python -m benchmarks.mock_qobuz_server --port 8080 --latency 0.05 --bandwidth 20
+"""
+import argparse
+import hashlib
+import json
+import logging
+import re
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+logger = logging.getLogger(__name__)
+
+# Битрейты форматов (байт/с) для расчёта длительности синтетических треков
+FORMAT_INFO = {
+    5: {'ext': 'mp3', 'bit_depth': None, 'sampling_rate': 44.1, 'bytes_per_sec': 40000},
+    6: {'ext': 'flac', 'bit_depth': 16, 'sampling_rate': 44.1, 'bytes_per_sec': 110000},
+    7: {'ext': 'flac', 'bit_depth': 24, 'sampling_rate': 96, 'bytes_per_sec': 350000},
+    27: {'ext': 'flac', 'bit_depth': 24, 'sampling_rate': 192, 'bytes_per_sec': 700000},
+}
+
+# Синтетическая "обложка": маркеры JPEG SOI/APP0 ... EOI (600x600 ≈ 60 КБ)
+COVER_JPEG = b'\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00' + bytes(60 * 1024) + b'\xff\xd9'
+
+
+def make_flac_payload(size: int, sample_rate: int = 44100, bits: int = 16, channels: int = 2) -> bytes:
+    """
+    Синтетический FLAC: корректный заголовок STREAMINFO + "аудиоданные"
+    (кадры начинаются с синхрослова FLAC, содержимое - шум).
+    """
+    bytes_per_sec = sample_rate * channels * bits // 8 // 2  # ~2:1 сжатие
+    total_samples = max(1, (size * sample_rate) // max(1, bytes_per_sec))
+
+    streaminfo = struct.pack('>HH', 4096, 4096)                 # min/max block size
+    streaminfo += (0).to_bytes(3, 'big') * 2                     # min/max frame size (неизвестно)
+    packed = (sample_rate << 44) | ((channels - 1) << 41) | ((bits - 1) << 36) | total_samples
+    streaminfo += packed.to_bytes(8, 'big')
+    streaminfo += b'\x00' * 16                                   # MD5 не задан
+
+    header = b'fLaC'
+    header += bytes([0x80]) + len(streaminfo).to_bytes(3, 'big') + streaminfo  # последний блок
+
+    frame = b'\xff\xf8\x69\x08\x00\x17\x1e' + bytes(range(256)) * 16
+    body_size = max(0, size - len(header))
+    body = (frame * (body_size // len(frame) + 1))[:body_size]
+    return header + body
+
+
+def make_mp3_payload(size: int) -> bytes:
+    """Синтетический MP3: последовательность кадров MPEG1 Layer III 128 кбит/с 44.1 кГц"""
+    frame = b'\xff\xfb\x90\x64' + b'\x00' * 413  # 417 байт на кадр
+    return (frame * (size // len(frame) + 1))[:max(size, len(frame))]
+
+
+class MockCatalog:
+    """Синтетический каталог: один артист, N альбомов по M треков"""
+
+    def __init__(self, base_url: str, albums: int = 5, tracks_per_album: int = 10,
+                 track_size: int = 5 * 1024 * 1024):
+        self.base_url = base_url
+        self.albums = albums
+        self.tracks_per_album = tracks_per_album
+        self.track_size = track_size
+
+    def album_id(self, idx: int) -> str:
+        return f"mockalb{idx:04d}"
+
+    def track(self, album_idx: int, number: int, with_album: bool = False) -> Dict:
+        track_id = album_idx * 1000 + number
+        track = {
+            'id': track_id,
+            'title': f"Track {number}",
+            'track_number': number,
+            'duration': max(1, self.track_size // FORMAT_INFO[6]['bytes_per_sec']),
+            'isrc': f"MOCK{album_idx:04d}{number:04d}",
+            'performer': {'id': 1, 'name': "Mock Artist"},
+            'copyright': "(P) Mock Records",
+            'maximum_bit_depth': 24,
+            'maximum_sampling_rate': 96,
+        }
+        if with_album:
+            track['album'] = self.album(album_idx, with_tracks=False)
+        return track
+
+    def album(self, idx: int, with_tracks: bool = True) -> Dict:
+        album = {
+            'id': self.album_id(idx),
+            'title': f"Mock Album {idx}",
+            'artist': {'id': 1, 'name': "Mock Artist"},
+            'release_date_original': f"{2000 + idx % 25}-01-01",
+            'label': {'id': 1, 'name': "Mock Records"},
+            'genre': {'name': "Electronic"},
+            'upc': f"{idx:012d}",
+            'image': {'large': f"{self.base_url}/covers/{idx}_{{size}}.jpg"},
+            'maximum_bit_depth': 24,
+            'maximum_sampling_rate': 96,
+            'tracks_count': self.tracks_per_album,
+            'release_type': 'album',
+        }
+        if with_tracks:
+            album['tracks'] = {
+                'items': [self.track(idx, n) for n in range(1, self.tracks_per_album + 1)]
+            }
+        return album
+
+    def album_index(self, album_id: str) -> Optional[int]:
+        if not album_id.startswith("mockalb"):
+            return None
+        try:
+            idx = int(album_id[len("mockalb"):])
+        except ValueError:
+            return None
+        return idx if 0 <= idx < self.albums else None
+
+
+class MockQobuzServer:
+    """
+    HTTP-сервер, имитирующий Qobuz API, CDN и LRCLib.
+
+    Args:
+        host, port: адрес (port=0 - свободный порт)
+        latency: задержка перед ответом API, секунд
+        bandwidth: ограничение скорости отдачи файлов, байт/с (None - без ограничений)
+        albums, tracks_per_album, track_size: размер синтетического каталога
+        drop_after: обрывать соединение после стольких байт тела файла
+                    (только полные запросы без Range - докачка отдаётся целиком)
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 bandwidth: Optional[int] = None, albums: int = 5,
+                 tracks_per_album: int = 10, track_size: int = 5 * 1024 * 1024,
+                 send_content_length: bool = True, lyrics: bool = True,
+                 drop_after: Optional[int] = None):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.send_content_length = send_content_length
+        self.lyrics = lyrics
+        self.drop_after = drop_after
+        self.requests_count = {}
+        self._lock = threading.Lock()
+        self._payloads = {}
+        self._etags = {}
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.catalog = MockCatalog(self.root_url, albums, tracks_per_album, track_size)
+        self._thread = None
+
+    @property
+    def root_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self) -> str:
+        """Базовый адрес для QobuzClient(base_url=...)"""
+        return f"{self.root_url}/api.json/0.2/"
+
+    @property
+    def lyrics_url(self) -> str:
+        """Базовый адрес для LyricsSearcher.API_URL"""
+        return f"{self.root_url}/lrclib/api"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Mock Qobuz API запущен: {self.root_url}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def payload(self, fmt_id: int) -> bytes:
+        """Синтетический файл для формата (кешируется)"""
+        with self._lock:
+            data = self._payloads.get(fmt_id)
+            if data is None:
+                size = self.catalog.track_size
+                if FORMAT_INFO[fmt_id]['ext'] == 'mp3':
+                    data = make_mp3_payload(size)
+                else:
+                    sample_rate = int(FORMAT_INFO[fmt_id]['sampling_rate'] * 1000)
+                    data = make_flac_payload(size, sample_rate, FORMAT_INFO[fmt_id]['bit_depth'])
+                self._payloads[fmt_id] = data
+            return data
+
+    def payload_etag(self, fmt_id: int) -> str:
+        """ETag синтетического файла - хеш содержимого"""
+        data = self.payload(fmt_id)
+        with self._lock:
+            etag = self._etags.get(id(data))
+            if etag is None:
+                etag = self._etags[id(data)] = f'"{hashlib.md5(data).hexdigest()}"'
+            return etag
+
+    def _count(self, endpoint: str):
+        with self._lock:
+            self.requests_count[endpoint] = self.requests_count.get(endpoint, 0) + 1
+
+    def _api(self, endpoint: str, query: Dict) -> Tuple[int, Dict]:
+        """Обработка вызова API: возвращает (статус, JSON)"""
+        catalog = self.catalog
+        q = {k: v[0] for k, v in query.items()}
+
+        if endpoint == "user/login":
+            if not q.get('email') or not q.get('password'):
+                return 401, {'message': "Invalid credentials"}
+            return 200, {
+                'user_auth_token': "mock-token",
+                'user': {'credential': {'parameters': {'short_label': "Studio (mock)"}}},
+            }
+
+        if endpoint == "album/get":
+            idx = catalog.album_index(q.get('album_id', ''))
+            if idx is None:
+                return 404, {'message': "Album not found"}
+            return 200, catalog.album(idx)
+
+        if endpoint == "track/get":
+            try:
+                track_id = int(q.get('track_id', 0))
+            except ValueError:
+                return 404, {'message': "Track not found"}
+            album_idx, number = divmod(track_id, 1000)
+            if catalog.album_index(catalog.album_id(album_idx)) is None:
+                return 404, {'message': "Track not found"}
+            return 200, catalog.track(album_idx, number, with_album=True)
+
+        if endpoint == "playlist/get":
+            items = [
+                catalog.track(i % catalog.albums, i // catalog.albums + 1, with_album=True)
+                for i in range(catalog.albums * catalog.tracks_per_album)
+            ]
+            offset = int(q.get('offset', 0))
+            limit = int(q.get('limit', 500))
+            return 200, {
+                'id': q.get('playlist_id'),
+                'name': "Mock Playlist",
+                'tracks_count': len(items),
+                'tracks': {'items': items[offset:offset + limit], 'total': len(items)},
+            }
+
+        if endpoint in ("artist/get", "label/get"):
+            albums = [catalog.album(i, with_tracks=False) for i in range(catalog.albums)]
+            offset = int(q.get('offset', 0))
+            limit = int(q.get('limit', 500))
+            return 200, {
+                'id': q.get('artist_id') or q.get('label_id'),
+                'name': "Mock Artist" if endpoint == "artist/get" else "Mock Records",
+                'albums_count': len(albums),
+                'albums': {'items': albums[offset:offset + limit], 'total': len(albums)},
+            }
+
+        if endpoint == "track/getFileUrl":
+            try:
+                fmt_id = int(q.get('format_id', 6))
+                track_id = int(q.get('track_id', 0))
+            except ValueError:
+                return 400, {'message': "Invalid request"}
+            if fmt_id not in FORMAT_INFO or not q.get('request_sig'):
+                return 400, {'message': "Invalid request signature"}
+            info = FORMAT_INFO[fmt_id]
+            return 200, {
+                'track_id': track_id,
+                'format_id': fmt_id,
+                'bit_depth': info['bit_depth'],
+                'sampling_rate': info['sampling_rate'],
+                'mime_type': 'audio/mpeg' if info['ext'] == 'mp3' else 'audio/flac',
+                'url': f"{self.root_url}/files/{track_id}.{info['ext']}?fmt={fmt_id}",
+            }
+
+        return 404, {'message': f"Unknown endpoint: {endpoint}"}
+
+    def _lyrics(self, query: Dict) -> list:
+        if not self.lyrics:
+            return []
+        q = {k: v[0] for k, v in query.items()}
+        lrc = "\n".join(f"[00:{i * 4:02d}.00]Line {i}" for i in range(15))
+        return [{
+            'id': 1,
+            'trackName': q.get('track_name', ''),
+            'artistName': q.get('artist_name', ''),
+            'albumName': q.get('album_name', ''),
+            'duration': 0,
+            'instrumental': False,
+            'plainLyrics': "\n".join(f"Line {i}" for i in range(15)),
+            'syncedLyrics': lrc,
+        }]
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _send_json(self, status: int, data):
+                body = json.dumps(data).encode('utf-8')
+                # Условные запросы: ETag - хеш тела
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                if status == 200 and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                if status == 200:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_file(self, data: bytes, content_type: str, etag: str = None):
+                # Докачка: поддерживается только "Range: bytes=N-";
+                # If-Range с другим ETag - файл целиком
+                match = re.fullmatch(r'bytes=(\d+)-', self.headers.get('Range', ''))
+                if_range = self.headers.get('If-Range')
+                if match and if_range and if_range != etag:
+                    match = None
+                if match:
+                    start = int(match.group(1))
+                    if start >= len(data):
+                        self.send_response(416)
+                        self.send_header('Content-Range', f"bytes */{len(data)}")
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header('Content-Range', f"bytes {start}-{len(data) - 1}/{len(data)}")
+                    data = data[start:]
+                else:
+                    self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                if etag:
+                    self.send_header('ETag', etag)
+                if server.send_content_length:
+                    self.send_header('Content-Length', str(len(data)))
+                else:
+                    self.send_header('Connection', 'close')
+                    self.close_connection = True
+                self.end_headers()
+
+                # Обрыв посреди тела: заголовки обещают весь файл, отдаём только начало
+                if server.drop_after and not match and len(data) > server.drop_after:
+                    server._count("dropped")
+                    data = data[:server.drop_after]
+                    self.close_connection = True
+
+                view = memoryview(data)
+                chunk = 64 * 1024
+                started = time.perf_counter()
+                for pos in range(0, len(data), chunk):
+                    self.wfile.write(view[pos:pos + chunk])
+                    if server.bandwidth:
+                        # Выравниваем отдачу по заданной скорости
+                        expected = (pos + chunk) / server.bandwidth
+                        delay = expected - (time.perf_counter() - started)
+                        if delay > 0:
+                            time.sleep(delay)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                path = parsed.path
+                query = parse_qs(parsed.query)
+
+                try:
+                    if path.startswith("/api.json/0.2/"):
+                        endpoint = path[len("/api.json/0.2/"):]
+                        server._count(endpoint)
+                        if server.latency:
+                            time.sleep(server.latency)
+                        status, data = server._api(endpoint, query)
+                        self._send_json(status, data)
+                    elif path.startswith("/files/"):
+                        server._count("files")
+                        fmt_id = int(query.get('fmt', ['6'])[0])
+                        info = FORMAT_INFO.get(fmt_id, FORMAT_INFO[6])
+                        content_type = 'audio/mpeg' if info['ext'] == 'mp3' else 'audio/flac'
+                        self._send_file(server.payload(fmt_id), content_type, server.payload_etag(fmt_id))
+                    elif path.startswith("/covers/"):
+                        server._count("covers")
+                        self._send_file(COVER_JPEG, 'image/jpeg')
+                    elif path == "/lrclib/api/search":
+                        server._count("lyrics")
+                        if server.latency:
+                            time.sleep(server.latency)
+                        self._send_json(200, server._lyrics(query))
+                    else:
+                        self._send_json(404, {'message': "Not found"})
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный стенд Qobuz API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help="задержка API, секунд")
+    parser.add_argument('--bandwidth', type=float, default=0.0, help="скорость отдачи файлов, МБ/с (0 - без ограничений)")
+    parser.add_argument('--albums', type=int, default=5)
+    parser.add_argument('--tracks', type=int, default=10, help="треков в альбоме")
+    parser.add_argument('--track-size', type=float, default=5.0, help="размер трека, МБ")
+    parser.add_argument('--drop-after', type=float, default=0.0,
+                        help="обрывать скачивание файла после стольких МБ (0 - не обрывать)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    server = MockQobuzServer(
+        args.host, args.port, args.latency,
+        int(args.bandwidth * 1024 * 1024) or None,
+        args.albums, args.tracks, int(args.track_size * 1024 * 1024),
+        drop_after=int(args.drop_after * 1024 * 1024) or None,
+    )
+    print(f"API: {server.api_url}")
+    print(f"LRCLib: {server.lyrics_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""
+Qobuz GUI Downloader - консольный режим
+Скачивание без графического интерфейса (сервер, cron, скрипты).
+PyQt6 не импортируется.
+
+Примеры:
+    python cli.py https://play.qobuz.com/album/xxxx https://play.qobuz.com/track/yyyy
+    python cli.py links.txt --workers 4 --output /srv/music
+    cat links.txt | python cli.py -
+    python cli.py --daemon --inbox /srv/qobuz-inbox
+    python cli.py --daemon --api 127.0.0.1:8765
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+from pathlib import Path
+
+from core.config import ConfigManager
+from core.log_setup import setup_logging_from_settings
+
+
+logger = logging.getLogger("cli")
+
+# Период опроса папки входящих ссылок в режиме демона, секунд
+INBOX_POLL_INTERVAL = 2.0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="Скачивание с Qobuz без графического интерфейса",
+    )
+    parser.add_argument('sources', nargs='*',
+                        help="ссылки Qobuz или файлы со ссылками; '-' - читать из stdin")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="число одновременных заданий (по умолчанию из настроек)")
+    parser.add_argument('-o', '--output', help="папка для скачивания (вместо настроек)")
+    parser.add_argument('-q', '--quality', type=int, choices=[0, 1, 2, 3],
+                        help="качество: 0 - MP3 320, 1 - CD, 2 - 24/96, 3 - 24/192")
+    parser.add_argument('--email', default=os.environ.get('QOBUZ_EMAIL'),
+                        help="email Qobuz (или QOBUZ_EMAIL; по умолчанию - сохранённые данные)")
+    parser.add_argument('--password', default=os.environ.get('QOBUZ_PASSWORD'),
+                        help="пароль Qobuz (или QOBUZ_PASSWORD)")
+    parser.add_argument('--daemon', action='store_true',
+                        help="работать постоянно: очередь сохраняется в config/daemon_queue.json, "
+                             "новые ссылки - из stdin и папки --inbox")
+    parser.add_argument('--inbox', help="папка, из которой демон забирает файлы *.txt со ссылками")
+    parser.add_argument('--api', nargs='?', const='', metavar='[HOST:]PORT',
+                        help="запустить HTTP API управления (по умолчанию адрес из настроек)")
+    parser.add_argument('--api-token', default=os.environ.get('QOBUZ_API_TOKEN'),
+                        help="токен доступа к API (или QOBUZ_API_TOKEN)")
+    parser.add_argument('--log-file', help="писать лог в файл (с ротацией по настройкам log_*)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="подробный лог")
+    parser.add_argument('--quiet', action='store_true', help="только ошибки")
+    return parser.parse_args(argv)
+
+
+def setup_logging(args, settings):
+    """Лог в stderr и (с --log-file) в файл; запись - в фоновом потоке"""
+    level = logging.INFO
+    if args.verbose:
+        level = logging.DEBUG
+    elif args.quiet:
+        level = logging.ERROR
+    setup_logging_from_settings(dict(settings, log_file=args.log_file), level=level)
+
+
+def read_sources(args):
+    """Ссылки из аргументов и stdin ('-')"""
+    sources = []
+    for source in args.sources:
+        if source == '-':
+            sources.extend(line.strip() for line in sys.stdin
+                           if line.strip() and not line.strip().startswith('#'))
+        else:
+            sources.append(source)
+    return sources
+
+
+def start_api(engine, settings, args):
+    """HTTP API управления поверх движка"""
+    from core.control_api import ControlApiServer
+
+    host = settings.get('api_host', '127.0.0.1')
+    port = settings.get('api_port', 8765)
+    if args.api:
+        address = args.api
+        if ':' in address:
+            host, address = address.rsplit(':', 1)
+        port = int(address)
+    server = ControlApiServer(engine, host=host, port=port,
+                              token=args.api_token or settings.get('api_token') or None)
+    server.start()
+    return server
+
+
+def login(config, args):
+    """Авторизация: аргументы/переменные окружения или сохранённые данные"""
+    from core.qobuz_api import get_qobuz_client
+
+    email, password = args.email, args.password
+    if not (email and password):
+        email, password = config.load_credentials()
+    if not (email and password):
+        logger.error("Нет учетных данных: укажите --email/--password (QOBUZ_EMAIL/QOBUZ_PASSWORD) "
+                     "или войдите один раз через GUI")
+        return None
+
+    client = get_qobuz_client(email, password)
+    logger.info(f"✓ Авторизован: {client.label}")
+    return client
+
+
+def watch_stdin(engine, stop_event):
+    """Демон: каждая строка stdin - новая ссылка (или файл со ссылками)"""
+    for line in sys.stdin:
+        if stop_event.is_set():
+            break
+        line = line.strip()
+        if line and not line.startswith('#'):
+            jobs = engine.submit([line])
+            logger.info(f"➕ В очереди: {len(jobs)}")
+
+
+def watch_inbox(engine, inbox: Path, stop_event):
+    """Демон: забирает файлы *.txt из папки и переименовывает обработанные в *.done"""
+    inbox.mkdir(parents=True, exist_ok=True)
+    while not stop_event.is_set():
+        for path in sorted(inbox.glob('*.txt')):
+            try:
+                jobs = engine.submit([str(path)])
+                path.replace(path.with_suffix('.done'))
+                logger.info(f"➕ {path.name}: в очереди {len(jobs)}")
+            except OSError as e:
+                logger.error(f"Не удалось обработать {path}: {e}")
+        stop_event.wait(INBOX_POLL_INTERVAL)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    config = ConfigManager()
+    settings = config.load_settings()
+    setup_logging(args, settings)
+    if args.output:
+        settings['download_folder'] = args.output
+    if args.quality is not None:
+        settings['quality_index'] = args.quality
+
+    sources = read_sources(args)
+    if not sources and not args.daemon:
+        logger.error("Не указаны ссылки (см. --help)")
+        return 2
+
+    try:
+        client = login(config, args)
+    except Exception as e:
+        logger.error(f"Авторизация не удалась: {e}")
+        return 1
+    if not client:
+        return 1
+
+    # Движок импортируется после авторизации: скачивание тянет mutagen и поиск текстов
+    from core.engine import DownloadEngine
+    from core.job_queue import JobQueue, JOB_DONE
+
+    def log_job(job_id, message):
+        for line in message.splitlines():
+            if line.strip():
+                logger.info(f"[{job_id[:6]}] {line.strip()}")
+
+    queue = JobQueue(config.config_dir / "daemon_queue.json") if args.daemon else JobQueue()
+    if args.daemon:
+        restored = queue.load()
+        if restored:
+            logger.info(f"📋 Восстановлено заданий: {restored}")
+
+    engine = DownloadEngine(client, settings, queue=queue, workers=args.workers,
+                            log_callback=log_job)
+
+    stop_event = threading.Event()
+
+    def handle_signal(signum, frame):
+        logger.info("⏹ Остановка...")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, handle_signal)
+
+    api_server = None
+    if args.api is not None or (args.daemon and settings.get('api_enable', False)):
+        try:
+            api_server = start_api(engine, settings, args)
+        except (OSError, ValueError) as e:
+            logger.error(f"Не удалось запустить API управления: {e}")
+            return 1
+
+    if sources:
+        jobs = engine.submit(sources)
+        logger.info(f"➕ В очереди: {len(jobs)}")
+    engine.start()
+
+    if args.daemon:
+        if not sys.stdin.isatty() and '-' not in args.sources:
+            threading.Thread(target=watch_stdin, args=(engine, stop_event),
+                             name="stdin", daemon=True).start()
+        if args.inbox:
+            threading.Thread(target=watch_inbox, args=(engine, Path(args.inbox), stop_event),
+                             name="inbox", daemon=True).start()
+        logger.info("Демон запущен")
+        while not stop_event.is_set():
+            stop_event.wait(1.0)
+        if api_server:
+            api_server.stop()
+        engine.shutdown()
+        return 0
+
+    # Разовый запуск: ждём, пока очередь опустеет (с реакцией на Ctrl+C)
+    while not stop_event.is_set() and not engine.wait(timeout=0.5):
+        pass
+    if api_server:
+        api_server.stop()
+    if stop_event.is_set():
+        engine.shutdown()
+        return 130
+
+    jobs = queue.jobs()
+    failed = [job for job in jobs if job.status != JOB_DONE]
+    logger.info(f"Готово: {len(jobs) - len(failed)}/{len(jobs)}")
+    for job in failed:
+        logger.error(f"✗ {job.url}: {job.message or job.status}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
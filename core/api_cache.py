@@ -0,0 +1,191 @@
+"""
+Модуль кеша ответов API метаданных
+Ответы album/get, track/get, artist/get, playlist/get хранятся в SQLite
+(config/api_cache.sqlite) со сроком жизни по типу запроса. Просроченная запись
+с ETag/Last-Modified проверяется условным запросом (304 - продлеваем без тела).
+Размер ограничен: при превышении удаляются давно не использованные записи.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAME = 'api_cache.sqlite'
+
+# Срок жизни записей по типу запроса, секунд. getFileUrl не кешируется:
+# ссылка подписана и живёт недолго
+CACHE_TTL = {
+    'album/get': 7 * 24 * 3600,
+    'track/get': 7 * 24 * 3600,
+    'artist/get': 24 * 3600,      # новые релизы
+    'label/get': 24 * 3600,
+    'playlist/get': 3600,         # плейлисты меняются чаще всего
+}
+
+DEFAULT_MAX_MB = 64
+DEFAULT_MAX_ENTRIES = 20000
+# Проверка размера - раз в столько записей
+PRUNE_EVERY = 200
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+class ResponseCache:
+    """
+    Потокобезопасный кеш ответов API в SQLite.
+
+    Args:
+        path: файл базы (':memory:' - в памяти)
+        max_bytes: предельный суммарный размер тел ответов
+        max_entries: предельное число записей
+        ttl: сроки жизни по типу запроса (по умолчанию CACHE_TTL)
+    """
+
+    def __init__(self, path, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, ttl: Dict[str, int] = None):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = dict(CACHE_TTL if ttl is None else ttl)
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                body TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+
+    def cacheable(self, endpoint: str) -> bool:
+        return self.ttl.get(endpoint, 0) > 0
+
+    @staticmethod
+    def make_key(scope: str, endpoint: str, params: Dict) -> str:
+        return f"{scope}|{endpoint}|{json.dumps(params, sort_keys=True, default=str)}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Запись кеша: {'data', 'fresh', 'etag', 'last_modified'} или None.
+        Просроченная запись тоже возвращается (fresh=False) - для условного запроса.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, etag, last_modified, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        body, etag, last_modified, expires_at = row
+        fresh = expires_at > now
+        if fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return {'data': json.loads(body), 'fresh': fresh, 'etag': etag, 'last_modified': last_modified}
+
+    def put(self, key: str, endpoint: str, data, etag: str = None, last_modified: str = None):
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, body, etag, last_modified, now + self.ttl.get(endpoint, 0),
+                 now, len(body.encode('utf-8')))
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._prune()
+
+    def refresh(self, key: str, endpoint: str):
+        """Сервер ответил 304 - продлеваем срок жизни записи"""
+        now = time.time()
+        with self._lock:
+            self._db.execute("UPDATE responses SET expires_at = ?, accessed_at = ? WHERE key = ?",
+                             (now + self.ttl.get(endpoint, 0), now, key))
+        self.revalidated += 1
+
+    def prune(self):
+        with self._lock:
+            self._prune()
+
+    def _prune(self):
+        """Удаление давно не использованных записей сверх лимитов (под блокировкой)"""
+        count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        removed = 0
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            removed += 1
+        logger.debug(f"Кеш API: удалено записей {removed}, осталось {count} ({total // 1024} КБ)")
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            count, total = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {'entries': count, 'bytes': total, 'hits': self.hits,
+                'misses': self.misses, 'revalidated': self.revalidated}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def get_default_cache() -> Optional[ResponseCache]:
+    """
+    Общий кеш приложения (config/api_cache.sqlite) по настройкам
+    api_cache_enable/api_cache_max_mb; None - кеш выключен или недоступен
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            from core.config import ConfigManager
+
+            config = ConfigManager()
+            settings = config.load_settings()
+            if not settings.get('api_cache_enable', True):
+                return None
+            try:
+                _default_cache = ResponseCache(
+                    config.config_dir / CACHE_NAME,
+                    max_bytes=int(settings.get('api_cache_max_mb', DEFAULT_MAX_MB) * 1024 * 1024),
+                )
+            except sqlite3.Error as e:
+                logger.warning(f"Кеш API недоступен: {e}")
+                return None
+        return _default_cache
@@ -0,0 +1,98 @@
+"""
+Модуль кооперативной отмены и паузы скачивания
+Токен проверяется в цикле чтения download_file и между этапами трека
+(текст, теги). Ожидание паузы - на событии, без опроса: pause/resume/cancel
+из другого потока будят ожидающий поток сразу.
+"""
+import logging
+import threading
+from typing import Callable, List
+
+
+logger = logging.getLogger(__name__)
+
+
+class CancelledError(InterruptedError):
+    """Скачивание остановлено через CancelToken"""
+
+    def __init__(self, message: str = "Скачивание отменено"):
+        super().__init__(message)
+
+
+class CancelToken:
+    """
+    Флаги паузы и остановки задания.
+
+    Управляющий поток вызывает pause()/resume()/cancel(),
+    рабочий - checkpoint() в точках, где остановка безопасна.
+
+    Обработчики add_callback вызываются при cancel() из управляющего потока -
+    например, закрытие HTTP-ответа, чтобы прервать блокирующее чтение.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._paused = False
+        self._cancelled = False
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def is_paused(self) -> bool:
+        return self._paused
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancelled
+
+    # --- Управляющий поток ---
+
+    def pause(self):
+        with self._cond:
+            self._paused = True
+            self._cond.notify_all()
+
+    def resume(self):
+        with self._cond:
+            self._paused = False
+            self._cond.notify_all()
+
+    def cancel(self):
+        with self._cond:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks = list(self._callbacks)
+            self._cond.notify_all()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug(f"Ошибка в обработчике отмены: {e}")
+
+    def add_callback(self, callback: Callable[[], None]):
+        """Регистрация обработчика отмены (сразу вызывается, если уже отменено)"""
+        with self._cond:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]):
+        with self._cond:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    # --- Рабочий поток ---
+
+    def checkpoint(self):
+        """
+        Точка остановки: ждёт снятия паузы, при отмене бросает CancelledError
+
+        Raises:
+            CancelledError: задание остановлено
+        """
+        if self._paused and not self._cancelled:
+            with self._cond:
+                self._cond.wait_for(lambda: not self._paused or self._cancelled)
+        if self._cancelled:
+            raise CancelledError()
@@ -0,0 +1,196 @@
+"""
+Модуль конфигурации приложения
+Учетные данные и настройки в папке config/ рядом с программой.
+Не зависит от PyQt6 - используется и GUI, и консольным режимом (cli.py).
+"""
+import sys
+import json
+import base64
+import logging
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigManager:
+    """Менеджер конфигурации приложения"""
+    
+    def __init__(self):
+        # Определяем папку программы (работает и для .py и для .exe)
+        if getattr(sys, 'frozen', False):
+            # Если запущен как EXE (PyInstaller)
+            app_dir = Path(sys.executable).parent
+        else:
+            # Если запущен как скрипт .py (папка проекта - на уровень выше core/)
+            app_dir = Path(__file__).parent.parent
+        
+        self.config_dir = app_dir / "config"
+        self.config_dir.mkdir(exist_ok=True)
+        
+        self.credentials_file = self.config_dir / "credentials.json"
+        self.settings_file = self.config_dir / "settings.json"
+    
+    def load_credentials(self):
+        """Загрузка учетных данных"""
+        if not self.credentials_file.exists():
+            return None, None
+        
+        try:
+            with open(self.credentials_file, 'r') as f:
+                data = json.load(f)
+                email = data.get('email')
+                encrypted_password = data.get('password')
+                
+                if email and encrypted_password:
+                    # Расшифровываем пароль
+                    password = base64.b64decode(encrypted_password.encode()).decode()
+                    return email, password
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке учетных данных: {e}")
+        
+        return None, None
+    
+    def save_credentials(self, email, password):
+        """Сохранение учетных данных"""
+        try:
+            # Шифруем пароль
+            encrypted_password = base64.b64encode(password.encode()).decode()
+            
+            credentials = {
+                "email": email,
+                "password": encrypted_password
+            }
+            
+            with open(self.credentials_file, 'w') as f:
+                json.dump(credentials, f, indent=2)
+            
+            logger.info("✓ Учетные данные сохранены")
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении учетных данных: {e}")
+            return False
+    
+    def delete_credentials(self):
+        """Удаление учетных данных"""
+        try:
+            if self.credentials_file.exists():
+                self.credentials_file.unlink()
+                logger.info("✓ Учетные данные удалены")
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при удалении учетных данных: {e}")
+            return False
+    
+    def load_settings(self):
+        """Загрузка настроек"""
+        if not self.settings_file.exists():
+            return self.get_default_settings()
+        
+        try:
+            with open(self.settings_file, 'r', encoding='utf-8') as f:
+                settings = json.load(f)
+                # Дополняем недостающие значения по умолчанию
+                default = self.get_default_settings()
+                for key, value in default.items():
+                    if key not in settings:
+                        settings[key] = value
+                return settings
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке настроек: {e}")
+            return self.get_default_settings()
+    
+    def save_settings(self, settings):
+        """Сохранение настроек"""
+        try:
+            with open(self.settings_file, 'w', encoding='utf-8') as f:
+                json.dump(settings, f, indent=2, ensure_ascii=False)
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении настроек: {e}")
+            return False
+    
+    def get_default_settings(self):
+        """Настройки по умолчанию"""
+        downloads_folder = str(Path.home() / "Music" / "Qobuz Downloads")
+        
+        return {
+            # Скачивание
+            'download_folder': downloads_folder,
+            'quality_index': 1,  # FLAC 16/44.1
+            'download_cover': True,
+            'create_playlist': False,
+            'max_parallel_downloads': 2,
+            
+            # Дискография артиста: выбор издания релиза (core/releases.py)
+            'artist_release_policy': 'quality',  # 'quality' или 'tracks'
+            'artist_prefer_explicit': True,
+            'artist_skip_covered': True,  # пропуск изданий, чьи треки уже скачаны
+            
+            # Именование
+            'folder_template': '{artist} - {album} ({year})',
+            'file_template': '{tracknumber}. {artist} - {title}',
+            
+            # Метаданные - основные
+            'tag_title': True,
+            'tag_artist': True,
+            'tag_album': True,
+            'tag_tracknumber': True,
+            'tag_year': True,
+            'tag_genre': True,
+            
+            # Метаданные - расширенные
+            'tag_upc': True,
+            'tag_isrc': True,
+            'tag_copyright': True,
+            'tag_label': True,
+            'tag_release_type': True,
+            'tag_explicit': True,
+            'tag_composer': True,
+            
+            # Тексты песен
+            'lyrics_enable': True,
+            'lyrics_save_lrc': True,
+            'lyrics_save_srt': False,
+            'lyrics_save_txt': False,
+            'lyrics_prefer_synced': True,
+            'lyrics_fallback': True,
+            
+            # Проверка целостности скачанных файлов
+            'verify_downloads': True,
+            'verify_workers': 2,
+            'verify_retries': 1,
+            'skip_existing_verified': True,
+            
+            # Повтор записи (ISRC) из другого релиза: 'copy' (копия/reflink с тегами
+            # этого релиза), 'hardlink'/'symlink' (теги общие с исходным файлом),
+            # 'm3u' (только ссылка в плейлисте) или 'off' - скачивать заново
+            'isrc_dedup': 'copy',
+            
+            # Место на диске (core/diskspace.py): резерв под задание по оценке размера,
+            # неприкосновенный запас и предвыделение места под файлы
+            'disk_space_check': True,
+            'disk_min_free_mb': 500,
+            'disk_preallocate': True,
+            
+            # Локальный HTTP API управления очередью (core/control_api.py)
+            'api_enable': False,
+            'api_host': '127.0.0.1',
+            'api_port': 8765,
+            'api_token': '',
+            
+            # Кеш ответов API метаданных (config/api_cache.sqlite)
+            'api_cache_enable': True,
+            'api_cache_max_mb': 64,
+            
+            # Диагностика: файл замеров по этапам (.jsonl или .json), пусто - выключено
+            'trace_file': '',
+            
+            # Лог-файл (core/log_setup.py): ротация по размеру или по времени
+            # (log_rotate_when: 'midnight', 'H', 'W0'...), log_json - JSON Lines
+            'log_file': 'qobuz_downloader.log',
+            'log_max_mb': 10,
+            'log_backup_count': 5,
+            'log_rotate_when': '',
+            'log_json': False,
+        }
@@ -0,0 +1,360 @@
+"""
+Модуль локального HTTP API управления очередью
+Постановка ссылок, список заданий с прогрессом, пауза/продолжение/отмена.
+Изменения приходят потоком server-sent events (/api/events) или long-poll
+(/api/events?format=json&since=N) - опрашивать список заданий не нужно.
+
+Контроллер - объект с атрибутом queue (JobQueue) и методами submit(sources),
+pause(job_id=None), resume(job_id=None), cancel(job_id), job_progress(job_id).
+Так устроен DownloadEngine (консольный режим) и мост главного окна GUI.
+
+Эндпоинты:
+    GET  /api/jobs                    список заданий
+    POST /api/jobs                    {"urls": [...]} - постановка в очередь
+    GET  /api/jobs/<id>               одно задание
+    POST /api/jobs/<id>/pause|resume|cancel
+    POST /api/pause, /api/resume      вся очередь
+    GET  /api/events                  SSE; ?format=json&since=N&timeout=S - long-poll
+
+Защита от запросов со страниц в браузере (CSRF, DNS rebinding): токен обязателен
+(если не задан - создаётся случайный при запуске), тело POST - только
+application/json, Host и Origin - только адрес, на котором слушает сервер.
+"""
+import hmac
+import ipaddress
+import json
+import logging
+import secrets
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Период событий прогресса по байтам, секунд
+PROGRESS_EVENT_INTERVAL = 1.0
+# Сколько последних событий хранится для long-poll и переподключения SSE
+EVENT_BACKLOG = 1000
+# Максимальное ожидание long-poll, секунд
+LONG_POLL_TIMEOUT = 30.0
+# Интервал комментариев keep-alive в потоке SSE, секунд
+SSE_KEEPALIVE = 15.0
+
+
+class EventBus:
+    """Нумерованные события с ожиданием новых (для SSE и long-poll)"""
+
+    def __init__(self, backlog: int = EVENT_BACKLOG):
+        self._events = deque(maxlen=backlog)
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def publish(self, event_type: str, data: Dict):
+        with self._cond:
+            self._seq += 1
+            self._events.append((self._seq, event_type, data))
+            self._cond.notify_all()
+
+    def wait_since(self, since: int, timeout: float) -> List[Tuple[int, str, Dict]]:
+        """События с номером больше since; ждёт до timeout секунд, если их нет"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > since, timeout)
+            return [event for event in self._events if event[0] > since]
+
+
+class ControlApiServer:
+    """
+    HTTP-сервер API управления.
+
+    Args:
+        controller: DownloadEngine или совместимый объект
+        host: адрес (по умолчанию только локальный)
+        port: порт (0 - свободный)
+        token: запросы должны передавать его в "Authorization: Bearer <token>"
+               или ?token=<token>; если не задан - случайный (см. атрибут token)
+    """
+
+    def __init__(self, controller, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 token: Optional[str] = None):
+        self.controller = controller
+        self.token = token or secrets.token_urlsafe(24)
+        self.token_generated = not token
+        self.events = EventBus()
+        self._stop = threading.Event()
+
+        handler = type('ControlApiHandler', (_Handler,), {'api': self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._threads = []
+
+        controller.queue.add_listener(self._on_job_changed)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.httpd.server_address[:2]
+
+    @property
+    def url(self) -> str:
+        host, port = self.address
+        return f"http://{host}:{port}"
+
+    @property
+    def allowed_hosts(self) -> Optional[set]:
+        """
+        Допустимые значения заголовка Host (адрес:порт сервера);
+        None - сервер слушает не только loopback, имя хоста не проверяется
+        """
+        host, port = self.address
+        try:
+            loopback = ipaddress.ip_address(host).is_loopback
+        except ValueError:
+            loopback = host == 'localhost'
+        if not loopback:
+            return None
+        names = {host, 'localhost', '127.0.0.1', '[::1]'}
+        return {f"{name}:{port}" for name in names}
+
+    def start(self):
+        for target, name in ((self.httpd.serve_forever, 'control-api'),
+                             (self._progress_loop, 'control-api-progress')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if self.token_generated:
+            logger.info(f"API управления: {self.url} (токен: {self.token})")
+        else:
+            logger.info(f"API управления: {self.url}")
+
+    def stop(self):
+        self._stop.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    # --- Данные ---
+
+    def job_data(self, job) -> Dict:
+        data = job.to_dict()
+        live = self.controller.job_progress(job.id)
+        if live:
+            data['live'] = live
+        return data
+
+    def jobs_data(self) -> List[Dict]:
+        return [self.job_data(job) for job in self.controller.queue.jobs()]
+
+    # --- События ---
+
+    def _on_job_changed(self, job):
+        self.events.publish('job', job.to_dict())
+
+    def _progress_loop(self):
+        """Периодические события прогресса по байтам для работающих заданий"""
+        while not self._stop.wait(PROGRESS_EVENT_INTERVAL):
+            progress = {}
+            for job in self.controller.queue.jobs():
+                live = self.controller.job_progress(job.id)
+                if live:
+                    progress[job.id] = live
+            if progress:
+                self.events.publish('progress', {'jobs': progress, 'time': time.time()})
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Обработчик запросов (api подставляется в подклассе сервера)"""
+
+    api: ControlApiServer = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.debug("API %s - " + format, self.address_string(), *args)
+
+    # --- Ответы ---
+
+    def send_json(self, data, status: int = 200):
+        body = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status: int, message: str):
+        self.send_json({'error': message}, status)
+
+    def read_json(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def authorized(self, query: Dict) -> bool:
+        token = self.api.token.encode('utf-8')
+        header = self.headers.get('Authorization', '')
+        if header.startswith('Bearer ') and hmac.compare_digest(header[7:].encode('utf-8'), token):
+            return True
+        value = query.get('token', [''])[0]
+        return bool(value) and hmac.compare_digest(value.encode('utf-8'), token)
+
+    def same_origin(self) -> bool:
+        """Host - адрес сервера (не чужое имя, указывающее на 127.0.0.1), Origin - тот же хост"""
+        host = self.headers.get('Host', '')
+        allowed = self.api.allowed_hosts
+        if allowed is not None and host not in allowed:
+            return False
+        origin = self.headers.get('Origin')
+        if origin is None:
+            return True
+        parsed = urlparse(origin)
+        return parsed.scheme == 'http' and parsed.netloc == host
+
+    def json_body(self) -> bool:
+        """Тело запроса пустое или application/json (формы и text/plain браузера - нет)"""
+        if not int(self.headers.get('Content-Length') or 0):
+            return True
+        content_type = self.headers.get('Content-Type', '')
+        return content_type.split(';', 1)[0].strip().lower() == 'application/json'
+
+    # --- Маршрутизация ---
+
+    def do_GET(self):
+        self.route('GET')
+
+    def do_POST(self):
+        self.route('POST')
+
+    def do_DELETE(self):
+        self.route('DELETE')
+
+    def route(self, method: str):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        parts = [part for part in parsed.path.split('/') if part]
+
+        # Отказ до чтения тела - соединение закрывается, чтобы тело не приняли за запрос
+        if not self.same_origin():
+            self.close_connection = True
+            self.send_error_json(403, "forbidden origin")
+            return
+        if not self.authorized(query):
+            self.close_connection = True
+            self.send_error_json(401, "unauthorized")
+            return
+        if method != 'GET' and not self.json_body():
+            self.close_connection = True
+            self.send_error_json(415, "expected application/json")
+            return
+        if len(parts) < 2 or parts[0] != 'api':
+            self.send_error_json(404, "not found")
+            return
+
+        controller = self.api.controller
+        try:
+            resource = parts[1]
+            if resource == 'jobs' and len(parts) == 2:
+                if method == 'GET':
+                    self.send_json({'jobs': self.api.jobs_data(), 'seq': self.api.events.last_seq})
+                elif method == 'POST':
+                    self.submit_jobs()
+                else:
+                    self.send_error_json(405, "method not allowed")
+
+            elif resource == 'jobs' and len(parts) in (3, 4):
+                job = controller.queue.get(parts[2])
+                if not job:
+                    self.send_error_json(404, "job not found")
+                elif len(parts) == 3 and method == 'GET':
+                    self.send_json(self.api.job_data(job))
+                elif len(parts) == 3 and method == 'DELETE' or \
+                        len(parts) == 4 and method == 'POST' and parts[3] == 'cancel':
+                    self.send_json({'ok': bool(controller.cancel(job.id))})
+                elif len(parts) == 4 and method == 'POST' and parts[3] in ('pause', 'resume'):
+                    getattr(controller, parts[3])(job.id)
+                    self.send_json({'ok': True})
+                else:
+                    self.send_error_json(404, "not found")
+
+            elif resource in ('pause', 'resume') and method == 'POST':
+                getattr(controller, resource)()
+                self.send_json({'ok': True})
+
+            elif resource == 'events' and method == 'GET':
+                if query.get('format', [''])[0] == 'json':
+                    self.long_poll(query)
+                else:
+                    self.stream_events()
+
+            else:
+                self.send_error_json(404, "not found")
+        except (ValueError, KeyError) as e:
+            self.send_error_json(400, str(e))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            logger.exception("Ошибка API управления")
+            self.send_error_json(500, str(e))
+
+    # --- Обработчики ---
+
+    def submit_jobs(self):
+        data = self.read_json()
+        urls = data.get('urls') or ([data['url']] if data.get('url') else [])
+        if not isinstance(urls, list) or not urls:
+            self.send_error_json(400, "expected {\"urls\": [...]}")
+            return
+        jobs = self.api.controller.submit([str(url) for url in urls])
+        if jobs is None:
+            # Контроллер ставит ссылки асинхронно (GUI) - задания придут событиями
+            self.send_json({'accepted': len(urls)}, 202)
+        else:
+            self.send_json({'jobs': [job.to_dict() for job in jobs]}, 201)
+
+    def long_poll(self, query: Dict):
+        since = int(query.get('since', ['0'])[0])
+        timeout = min(float(query.get('timeout', [LONG_POLL_TIMEOUT])[0]), LONG_POLL_TIMEOUT)
+        events = self.api.events.wait_since(since, timeout)
+        self.send_json({
+            'seq': events[-1][0] if events else max(since, 0),
+            'events': [{'seq': seq, 'type': event_type, 'data': data}
+                       for seq, event_type, data in events],
+        })
+
+    def stream_events(self):
+        """Поток server-sent events (поддерживает Last-Event-ID при переподключении)"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        last_id = self.headers.get('Last-Event-ID')
+        since = int(last_id) if last_id and last_id.isdigit() else self.api.events.last_seq
+
+        # Начальное состояние - чтобы клиенту не нужен был отдельный GET /api/jobs
+        if last_id is None:
+            self.write_event(since, 'snapshot', {'jobs': self.api.jobs_data()})
+
+        while not self.api._stop.is_set():
+            events = self.api.events.wait_since(since, SSE_KEEPALIVE)
+            if not events:
+                self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+                continue
+            for seq, event_type, data in events:
+                self.write_event(seq, event_type, data)
+                since = seq
+
+    def write_event(self, seq: int, event_type: str, data: Dict):
+        payload = json.dumps(data, ensure_ascii=False, default=str)
+        self.wfile.write(f"id: {seq}\nevent: {event_type}\ndata: {payload}\n\n".encode('utf-8'))
+        self.wfile.flush()
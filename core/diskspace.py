@@ -0,0 +1,279 @@
+"""
+Модуль учёта места на диске
+Размер задания оценивается по длительности треков и потоку данных формата
+(при постановке в очередь - для допуска планировщиком), место резервируется
+в папке загрузок до начала скачивания (общий учёт для параллельных заданий)
+и проверяется перед каждым файлом по content-length с учётом чужих резервов.
+Под файл место выделяется заранее (fallocate) - меньше фрагментации больших FLAC.
+"""
+import errno
+import logging
+import shutil
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from core.quality import negotiate_format, available_format, QUALITY_MAP, FORMAT_RANK
+
+
+logger = logging.getLogger(__name__)
+
+# Средний поток данных формата, байт/с (с запасом: FLAC сжимается по-разному)
+FORMAT_BYTES_PER_SEC = {
+    5: 40_000,     # MP3 320
+    6: 120_000,    # FLAC 16/44.1
+    7: 380_000,    # FLAC 24/96
+    27: 760_000,   # FLAC 24/192
+}
+# Обложка и теги в каждом файле
+TRACK_OVERHEAD = 512 * 1024
+# Длительность трека, если в метаданных её нет
+DEFAULT_DURATION = 300
+
+DEFAULT_MIN_FREE_MB = 500
+
+# fallocate(2): выделить блоки, не меняя размер файла. Размер .part -
+# позиция докачки, поэтому posix_fallocate (увеличивает размер) не подходит
+FALLOC_FL_KEEP_SIZE = 0x01
+
+_fallocate = None
+_spaces = {}
+_spaces_lock = threading.Lock()
+
+
+def format_size(size: int) -> str:
+    """Размер в МБ или ГБ"""
+    if abs(size) >= 1024 ** 3:
+        return f"{size / 1024 ** 3:.1f} ГБ"
+    return f"{size / 1024 ** 2:.0f} МБ"
+
+
+class InsufficientSpaceError(OSError):
+    """Места на диске не хватит для задания или файла"""
+
+    def __init__(self, needed: int, available: int, path=None):
+        super().__init__(
+            errno.ENOSPC,
+            f"Недостаточно места на диске: нужно {format_size(needed)}, "
+            f"доступно {format_size(max(0, available))}",
+            str(path) if path else None
+        )
+        self.needed = needed
+        self.available = available
+
+
+# --- Оценка размера ---
+
+def estimate_track_bytes(track_meta: Dict, format_id: int) -> int:
+    """Оценка размера файла трека: длительность × поток данных формата"""
+    duration = track_meta.get('duration') or DEFAULT_DURATION
+    return int(duration * FORMAT_BYTES_PER_SEC.get(format_id, FORMAT_BYTES_PER_SEC[6])) + TRACK_OVERHEAD
+
+
+def estimate_tracks_bytes(tracks: Iterable[Dict], quality_index: int, album_meta: Dict = None) -> int:
+    """Оценка размера треков в согласованном формате (см. negotiate_format)"""
+    total = 0
+    for track in tracks:
+        album = album_meta or track.get('album')
+        total += estimate_track_bytes(track, negotiate_format(quality_index, track, album))
+    return total
+
+
+def estimate_album_bytes(album: Dict, quality_index: int) -> int:
+    """Оценка размера альбома по сведениям из списка альбомов (duration, tracks_count)"""
+    format_id = QUALITY_MAP.get(quality_index, 6)
+    available = available_format(album)
+    if format_id != 5 and available is not None and FORMAT_RANK[available] < FORMAT_RANK[format_id]:
+        format_id = available
+    tracks_count = album.get('tracks_count') or 1
+    duration = album.get('duration') or DEFAULT_DURATION * tracks_count
+    return int(duration * FORMAT_BYTES_PER_SEC[format_id]) + TRACK_OVERHEAD * tracks_count
+
+
+def estimate_item_bytes(client, content_type: str, content_id: str, quality_index: int) -> Optional[int]:
+    """
+    Оценка размера задания по ссылке (альбом, трек, плейлист) для допуска в очереди;
+    None - не оценить (артист и лейбл - слишком много запросов, ошибка API)
+    """
+    try:
+        if content_type == 'album':
+            return estimate_album_bytes(client.get_album_meta(content_id), quality_index)
+        if content_type == 'track':
+            return estimate_tracks_bytes([client.get_track_meta(content_id)], quality_index)
+        if content_type == 'playlist':
+            return estimate_album_bytes(client.get_playlist_meta(content_id), quality_index)
+    except Exception as e:
+        logger.debug(f"Не удалось оценить размер {content_type} {content_id}: {e}")
+    return None
+
+
+# --- Свободное место и резервирование ---
+
+def free_space(path: Path) -> int:
+    """Свободное место на диске с path (папки может ещё не быть - берётся ближайшая существующая)"""
+    path = Path(path).resolve()
+    while not path.exists() and path.parent != path:
+        path = path.parent
+    return shutil.disk_usage(path).free
+
+
+class Reservation:
+    """Зарезервированное заданием место; записанное вычитается (consume)"""
+
+    def __init__(self, space: 'DiskSpace', size: int):
+        self.space = space
+        self.size = size
+
+    def consume(self, size: int):
+        """Записано size байт - они уже учтены в свободном месте диска"""
+        with self.space._lock:
+            self.size = max(0, self.size - size)
+
+    def release(self):
+        self.space._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class DiskSpace:
+    """
+    Учёт места в папке загрузок: свободное место минус резервы
+    работающих заданий минус неприкосновенный запас (min_free).
+    """
+
+    def __init__(self, root: Path, min_free: int = DEFAULT_MIN_FREE_MB * 1024 * 1024):
+        self.root = Path(root)
+        self.min_free = min_free
+        self._lock = threading.Lock()
+        self._reservations = []
+
+    def reserved(self) -> int:
+        with self._lock:
+            return sum(r.size for r in self._reservations)
+
+    def available(self) -> int:
+        """Сколько ещё можно зарезервировать"""
+        return free_space(self.root) - self.reserved() - self.min_free
+
+    def reserve(self, size: int) -> Reservation:
+        """
+        Raises:
+            InsufficientSpaceError: места не хватит
+        """
+        with self._lock:
+            available = free_space(self.root) - sum(r.size for r in self._reservations) - self.min_free
+            if size > available:
+                raise InsufficientSpaceError(size, available, self.root)
+            reservation = Reservation(self, size)
+            self._reservations.append(reservation)
+            return reservation
+
+    def check(self, size: int, path: Path = None, reservation: Reservation = None):
+        """
+        Проверка перед записью файла: свободное место минус резервы других
+        заданий (свой резерв reservation уже включает этот файл)
+
+        Raises:
+            InsufficientSpaceError: места не хватит
+        """
+        with self._lock:
+            others = sum(r.size for r in self._reservations if r is not reservation)
+        available = free_space(path.parent if path else self.root) - others - self.min_free
+        if size > available:
+            raise InsufficientSpaceError(size, available, path)
+
+    def _release(self, reservation: Reservation):
+        with self._lock:
+            if reservation in self._reservations:
+                self._reservations.remove(reservation)
+
+
+def get_disk_space(settings: Dict) -> DiskSpace:
+    """Общий учёт места папки загрузок (параллельные задания резервируют в одном объекте)"""
+    root = Path(settings.get('download_folder', './downloads'))
+    key = str(root.resolve())
+    with _spaces_lock:
+        space = _spaces.get(key)
+        if space is None:
+            space = _spaces[key] = DiskSpace(root)
+        space.min_free = int(settings.get('disk_min_free_mb', DEFAULT_MIN_FREE_MB) * 1024 * 1024)
+        return space
+
+
+def check_admission(settings: Optional[Dict], job=None) -> Optional[str]:
+    """
+    Проверка планировщика перед запуском задания: оценка его размера
+    (job.estimated_bytes, если известна) против места за вычетом резервов
+    работающих заданий и запаса
+
+    Returns:
+        причина не запускать или None
+    """
+    if not settings or not settings.get('disk_space_check', True):
+        return None
+    space = get_disk_space(settings)
+    try:
+        available = space.available()
+    except OSError as e:
+        logger.debug(f"Не удалось определить свободное место: {e}")
+        return None
+    needed = getattr(job, 'estimated_bytes', None) or 0
+    if needed:
+        if needed <= available:
+            return None
+        return (f"Недостаточно места на диске: задание ~{format_size(needed)}, "
+                f"доступно {format_size(max(0, available))}")
+    if available > 0:
+        return None
+    return (f"Недостаточно места на диске: свободно {format_size(free_space(space.root))}, "
+            f"запас {format_size(space.min_free)}")
+
+
+# --- Предвыделение ---
+
+def _load_fallocate():
+    """fallocate из libc (только Linux); None - недоступен"""
+    global _fallocate
+    if _fallocate is None:
+        _fallocate = False
+        if sys.platform.startswith('linux'):
+            # ctypes - только при первом скачивании, не при запуске приложения
+            import ctypes
+            import ctypes.util
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+                func = libc.fallocate
+                func.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64]
+                func.restype = ctypes.c_int
+                _fallocate = func
+            except (OSError, AttributeError) as e:
+                logger.debug(f"fallocate недоступен: {e}")
+    return _fallocate or None
+
+
+def preallocate(fd: int, offset: int, length: int) -> bool:
+    """
+    Выделение места под length байт с offset без изменения размера файла
+
+    Returns:
+        True если место выделено (False - не поддерживается ОС или ФС)
+
+    Raises:
+        InsufficientSpaceError: на диске нет места
+    """
+    func = _load_fallocate()
+    if func is None or length <= 0:
+        return False
+    if func(fd, FALLOC_FL_KEEP_SIZE, offset, length) == 0:
+        return True
+    import ctypes
+    err = ctypes.get_errno()
+    if err == errno.ENOSPC:
+        raise InsufficientSpaceError(length, 0)
+    # EOPNOTSUPP (FAT, сетевые ФС) и прочее - просто пишем без предвыделения
+    return False
@@ -1,53 +1,153 @@
 """
 Модуль для скачивания музыки с Qobuz
 """
+import errno
+import json
 import os
 import re
-import string
+import shutil
+import sys
+import uuid
 import requests
 import logging
 from pathlib import Path
 from typing import Dict, Callable, Optional
 from core.metadata import MetadataWriter
 from core.lyrics_search import LyricsSearcher
+from core.lrc import parse_lrc
+from core.progress import JobProgress, QueueProgress
+from core.transfer import stream_to_file
+from core.cancel import CancelToken, CancelledError
+from core.singleflight import SingleFlight
+from core.releases import ReleasePolicy, group_releases
+from core.quality import (QUALITY_MAP, FORMAT_RANK, FORMAT_NAMES, negotiate_format,
+                          fallback_formats, file_extension)
+from core.manifest import get_manifest
+from core.naming import (sanitize_filename, compile_folder_template, compile_file_template,
+                         resolve_collisions, TemplateError,
+                         DEFAULT_FOLDER_TEMPLATE, DEFAULT_FILE_TEMPLATE)
+from core.diskspace import (get_disk_space, estimate_tracks_bytes, estimate_album_bytes,
+                            free_space, format_size, preallocate, InsufficientSpaceError)
+from core.verify import Verifier, IncompleteDownloadError, verify_file
+from core.tracing import (Tracer, STAGE_URL_RESOLVE, STAGE_FIRST_BYTE, STAGE_TRANSFER,
+                          STAGE_LYRICS, STAGE_TAGS, STAGE_SIDECARS, STAGE_VERIFY,
+                          OUTCOME_ERROR, OUTCOME_SKIPPED)
 
 
 logger = logging.getLogger(__name__)
 
+# Одна обложка альбома запрашивается всеми заданиями с его треками - скачиваем один раз
+_cover_flight = SingleFlight()
 
-class PartialFormatter(string.Formatter):
-    """Форматтер для шаблонов с пропущенными значениями"""
-    
-    def __init__(self, missing="", bad_fmt=""):
-        self.missing, self.bad_fmt = missing, bad_fmt
-    
-    def get_field(self, field_name, args, kwargs):
+# Суффикс недокачанного файла: при следующем запуске он докачивается (Range).
+# В имени - format_id (потоки разных форматов не смешиваются), рядом - сведения
+# о потоке (ETag, Last-Modified, размер): докачка только того же файла (If-Range)
+PART_SUFFIX = '.part'
+PART_INFO_SUFFIX = '.json'
+
+# Папка сборки файлов внутри папки загрузок (та же ФС - перенос на место атомарный).
+# Трек скачивается, тегируется и обрастает текстами здесь, в папку альбома
+# попадает готовым: сканеры медиатеки видят его один раз
+STAGING_DIR = '.qobuz_staging'
+
+# Повтор записи (ISRC), уже скачанной в другом релизе: копия с тегами этого
+# релиза (reflink, если ФС умеет), жёсткая или символическая ссылка (теги общие
+# с исходным файлом) или только ссылка в M3U
+DEDUP_MODES = ('off', 'copy', 'hardlink', 'symlink', 'm3u')
+DEFAULT_DEDUP_MODE = 'copy'
+# Файлы текстов рядом с треком - связываются вместе с аудио
+SIDECAR_SUFFIXES = ('.lrc', '.srt', '.txt')
+
+# ioctl FICLONE (Linux): копия, разделяющая блоки с исходным файлом (btrfs, XFS)
+FICLONE = 0x40049409
+
+
+def part_path_for(staged_path: Path, format_id: int) -> Path:
+    """Путь недокачанного файла: <имя>.<format_id>.part"""
+    return staged_path.with_name(f"{staged_path.name}.{format_id}{PART_SUFFIX}")
+
+
+def part_info_path(part_path: Path) -> Path:
+    return part_path.with_name(part_path.name + PART_INFO_SUFFIX)
+
+
+def read_part_info(part_path: Path) -> Optional[Dict]:
+    """Сведения о потоке недокачанного файла (None - нет или повреждены)"""
+    try:
+        info = json.loads(part_info_path(part_path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    return info if isinstance(info, dict) else None
+
+
+def discard_part(part_path: Path):
+    """Удаление недокачанного файла вместе со сведениями о потоке"""
+    for path in (part_path, part_info_path(part_path)):
         try:
-            val = super().get_field(field_name, args, kwargs)
-        except (KeyError, AttributeError):
-            val = None, field_name
-        return val
-    
-    def format_field(self, value, spec):
-        if not value:
-            return self.missing
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def content_range_total(header: Optional[str]) -> Optional[int]:
+    """Полный размер из Content-Range ("bytes 0-99/100", "bytes */100")"""
+    total = (header or '').rpartition('/')[2]
+    return int(total) if total.isdigit() else None
+
+
+def stream_validator(info: Optional[Dict]) -> Optional[str]:
+    """Значение для If-Range: сильный ETag или Last-Modified"""
+    if not info:
+        return None
+    etag = info.get('etag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return info.get('last_modified')
+
+
+def same_stream(info: Dict, response) -> bool:
+    """Ответ 206 - продолжение того же файла, что в .part (ETag и полный размер)"""
+    etag = response.headers.get('etag')
+    if etag and info.get('etag') and etag != info['etag']:
+        return False
+    total = content_range_total(response.headers.get('content-range'))
+    return not (total and info.get('total') and total != info['total'])
+
+
+def clone_file(source: Path, target: Path) -> str:
+    """
+    Копия файла: reflink (блоки общие до первой записи, место не занимается),
+    если ФС поддерживает, иначе обычное копирование
+
+    Returns:
+        'reflink' или 'copy'
+    """
+    if sys.platform.startswith('linux'):
+        import fcntl
         try:
-            return super().format_field(value, spec)
-        except ValueError:
-            if self.bad_fmt:
-                return self.bad_fmt
-            raise
+            with open(source, 'rb') as src, open(target, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return 'reflink'
+        except OSError as e:
+            logger.debug(f"reflink невозможен ({e}), копируем")
+    shutil.copyfile(source, target)
+    return 'copy'
 
 
-def sanitize_filename(filename: str) -> str:
-    """Очистка имени файла от недопустимых символов"""
-    # Заменяем недопустимые символы для Windows
-    invalid_chars = r'<>:"/\|?*'
-    for char in invalid_chars:
-        filename = filename.replace(char, '_')
-    # Удаляем точки в конце (Windows не любит)
-    filename = filename.rstrip('.')
-    return filename
+def move_into_place(src: Path, dst: Path):
+    """
+    Атомарный перенос файла на место. Если папка назначения на другой ФС
+    (символическая ссылка на другой диск) - копия рядом и переименование.
+    """
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        tmp_path = dst.with_name(f".{dst.name}.tmp")
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+        os.unlink(src)
 
 
 def get_url_info(url: str):
@@ -69,29 +169,34 @@ def get_url_info(url: str):
 class QobuzDownloader:
     """Класс для скачивания с Qobuz"""
     
-    # Соответствие индекса качества и format_id
-    QUALITY_MAP = {
-        0: 5,   # MP3 320
-        1: 6,   # FLAC 16/44.1
-        2: 7,   # FLAC 24/96
-        3: 27,  # FLAC 24/192
-    }
+    # Соответствие индекса качества и format_id (core/quality.py)
+    QUALITY_MAP = QUALITY_MAP
+    
+    # Максимальный размер обложки, которую держим в памяти
+    MAX_COVER_SIZE = 16 * 1024 * 1024
     
     def __init__(self, qobuz_client, settings: Dict, 
                  progress_callback: Callable = None,
-                 log_callback: Callable = None):
+                 log_callback: Callable = None,
+                 throughput_callback: Callable = None,
+                 queue_progress: QueueProgress = None,
+                 cancel_token: CancelToken = None):
         """
         Args:
             qobuz_client: клиент Qobuz API
             settings: настройки приложения
             progress_callback: функция для обновления прогресса
             log_callback: функция для логирования
+            throughput_callback: функция для событий прогресса по байтам (скорость, ETA)
+            queue_progress: сводный прогресс очереди заданий
+            cancel_token: пауза/остановка задания из управляющего потока
         """
         self.client = qobuz_client
         self.settings = settings
         self.progress_callback = progress_callback
         self.log_callback = log_callback
-        self._download_thread = None  # Ссылка на поток для проверки паузы
+        self.progress = JobProgress(throughput_callback, queue_progress)
+        self.cancel_token = cancel_token or CancelToken()
         
         # Логирование настроек для отладки
         self.log(f"🔧 Настройки загружены:")
@@ -101,19 +206,40 @@ class QobuzDownloader:
         
         self.metadata_writer = MetadataWriter(settings)
         self.lyrics_searcher = LyricsSearcher()
-        self.formatter = PartialFormatter()
+        
+        # Шаблоны именования разбираются один раз (и кешируются до изменения текста)
+        self.folder_template = self.compile_template('folder_template', compile_folder_template,
+                                                     DEFAULT_FOLDER_TEMPLATE)
+        self.file_template = self.compile_template('file_template', compile_file_template,
+                                                   DEFAULT_FILE_TEMPLATE)
+        # Имена с разрешёнными совпадениями: ID трека текущего альбома/плейлиста -> имя,
+        # ID альбома дискографии -> папка
+        self.track_names = {}
+        self.album_folders = {}
+        
+        # Замеры по этапам (trace_file: .jsonl - поток JSON Lines, .json - trace-файл)
+        self.tracer = Tracer(self.settings.get('trace_file') or None)
+        
+        # Проверка целостности: фоновый пул и манифест папки загрузок
+        self.manifest = get_manifest(Path(self.settings.get('download_folder', './downloads')))
+        self.verifier = None
+        self._pending_verification = []
+        
+        # Сборка файлов задания: <папка загрузок>/.qobuz_staging/<задание>/
+        self.staging_root = Path(self.settings.get('download_folder', './downloads')) / STAGING_DIR
+        self.staging_dir = None
+        
+        # Место на диске: резерв под текущий альбом/плейлист (общий учёт для всех заданий)
+        self.disk_space = get_disk_space(self.settings)
+        self.reservation = None
         
         self.session = requests.Session()
     
     def check_pause(self):
-        """Проверка паузы скачивания"""
-        import time
-        if self._download_thread and hasattr(self._download_thread, '_is_paused'):
-            while self._download_thread._is_paused and self._download_thread._is_running:
-                time.sleep(0.1)
-            # Если отменили - выходим
-            if not self._download_thread._is_running:
-                raise InterruptedError("Скачивание отменено")
+        """
+        Проверка паузы/остановки: на паузе ждёт, при остановке бросает CancelledError
+        """
+        self.cancel_token.checkpoint()
     
     def log(self, message: str):
         """Вывод сообщения в лог"""
@@ -132,7 +258,7 @@ class QobuzDownloader:
         
         Args:
             folder: папка где находятся треки
-            track_files: список имён файлов треков
+            track_files: пути файлов треков (могут лежать в других папках)
             playlist_name: имя плейлиста (без расширения)
         """
         if not self.settings.get('create_playlist', False):
@@ -146,7 +272,7 @@ class QobuzDownloader:
                 for track_file in track_files:
                     if track_file.exists():
                         # Относительный путь к файлу
-                        f.write(f"{track_file.name}\n")
+                        f.write(f"{Path(os.path.relpath(track_file, folder)).as_posix()}\n")
             
             self.log(f"📝 M3U плейлист создан: {m3u_path.name}")
         except Exception as e:
@@ -170,6 +296,8 @@ class QobuzDownloader:
                 return False
             
             self.log(f"📥 Определен тип: {url_type}, ID: {url_id}")
+            # Папка сборки по ссылке: после перезапуска задание найдёт свои .part и докачает
+            self.staging_dir = self.staging_root / sanitize_filename(f"{url_type}-{url_id}")
             
             if url_type == "track":
                 return self.download_track_by_id(url_id)
@@ -182,17 +310,48 @@ class QobuzDownloader:
             else:
                 self.log(f"✗ Тип {url_type} пока не поддерживается")
                 return False
-                
+        
+        except CancelledError:
+            self.log("⏹ Скачивание остановлено")
+            return False
+        except InsufficientSpaceError as e:
+            self.log(f"💾 {e.strerror}")
+            return False
         except Exception as e:
             self.log(f"✗ Ошибка: {str(e)}")
             logger.exception("Ошибка при скачивании")
             return False
+        finally:
+            self.finish()
+    
+    def finish(self):
+        """Завершение задания: сохранение манифеста, остановка проверки, экспорт замеров"""
+        self.progress.close()
+        self.release_space()
+        self.cleanup_staging()
+        self.manifest.save()
+        if self.verifier:
+            self.verifier.shutdown(wait=False)
+            self.verifier = None
+        self.export_trace()
+    
+    def export_trace(self):
+        """Сводка замеров в лог-файл и экспорт trace (если задан trace_file)"""
+        for stage in self.tracer.summary():
+            logger.info(
+                f"⏱ {stage['stage']}: {stage['count']} шт., {stage['total_ms']:.0f} мс "
+                f"(макс. {stage['max_ms']:.0f} мс), {stage['bytes']} байт, ошибок: {stage['errors']}"
+            )
+        path = self.tracer.export()
+        if path:
+            logger.info(f"⏱ Trace сохранён: {path}")
     
-    def download_album(self, album_id: str) -> bool:
-        """Скачивание альбома"""
+    def download_album(self, album_id: str, album_meta: Dict = None) -> bool:
+        """Скачивание альбома (album_meta - если метаданные уже получены)"""
         try:
-            self.log(f"📀 Получение информации об альбоме...")
-            album_meta = self.client.get_album_meta(album_id)
+            if album_meta is None:
+                self.log(f"📀 Получение информации об альбоме...")
+                album_meta = self.client.get_album_meta(album_id)
             
             album_title = album_meta['title']
             artist_name = album_meta['artist']['name']
@@ -200,6 +359,9 @@ class QobuzDownloader:
             
             self.log(f"📀 Альбом: {artist_name} - {album_title}")
             self.log(f"📀 Треков: {tracks_count}")
+            self.progress.add_tracks(tracks_count)
+            self.reserve_space(album_meta['tracks']['items'], album_meta)
+            self.plan_track_names(album_meta['tracks']['items'], album_meta)
             
             # Создаем папку для альбома
             album_folder = self.get_album_folder(album_meta)
@@ -211,8 +373,9 @@ class QobuzDownloader:
             if self.settings.get('download_cover', True):
                 cover_data = self.download_cover(album_meta.get('image', {}).get('large'))
                 if cover_data:
-                    cover_path = album_folder / "cover.jpg"
-                    cover_path.write_bytes(cover_data)
+                    staged_cover = self.staging_path("cover.jpg")
+                    staged_cover.write_bytes(cover_data)
+                    move_into_place(staged_cover, album_folder / "cover.jpg")
                     self.log("✓ Обложка сохранена")
             
             # Скачиваем треки
@@ -231,6 +394,8 @@ class QobuzDownloader:
                 if track_file:
                     downloaded_files.append(track_file)
             
+            self.drain_verification()
+            
             # Создаём M3U плейлист если включено
             if downloaded_files:
                 self.create_m3u_playlist(
@@ -243,16 +408,22 @@ class QobuzDownloader:
             self.log(f"\n✓ Альбом скачан успешно!")
             return True
             
+        except (CancelledError, InsufficientSpaceError):
+            raise
         except Exception as e:
             self.log(f"✗ Ошибка при скачивании альбома: {str(e)}")
             logger.exception("Ошибка при скачивании альбома")
             return False
+        finally:
+            self.release_space()
     
     def download_track_by_id(self, track_id: str) -> bool:
         """Скачивание одного трека по ID"""
         try:
             self.log(f"🎵 Получение информации о треке...")
             track_meta = self.client.get_track_meta(track_id)
+            self.progress.add_tracks(1)
+            self.reserve_space([track_meta])
             
             # Получаем информацию об альбоме для папки
             album_meta = track_meta.get('album', {})
@@ -271,15 +442,20 @@ class QobuzDownloader:
                 cover_data = self.download_cover(album_meta.get('image', {}).get('large'))
             
             self.download_track(track_meta, folder, album_meta, cover_data)
+            self.drain_verification()
             
             self.update_progress(100)
             self.log(f"\n✓ Трек скачан успешно!")
             return True
             
+        except (CancelledError, InsufficientSpaceError):
+            raise
         except Exception as e:
             self.log(f"✗ Ошибка при скачивании трека: {str(e)}")
             logger.exception("Ошибка при скачивании трека")
             return False
+        finally:
+            self.release_space()
     
     def download_playlist(self, playlist_id: str) -> bool:
         """Скачивание плейлиста"""
@@ -292,6 +468,9 @@ class QobuzDownloader:
             
             self.log(f"📋 Плейлист: {playlist_title}")
             self.log(f"📋 Треков: {tracks_count}")
+            self.progress.add_tracks(tracks_count)
+            self.reserve_space(playlist_meta['tracks']['items'])
+            self.plan_track_names(playlist_meta['tracks']['items'])
             
             # Создаем папку для плейлиста
             base_folder = Path(self.settings.get('download_folder', './downloads'))
@@ -319,6 +498,8 @@ class QobuzDownloader:
                 if track_file:
                     downloaded_files.append(track_file)
             
+            self.drain_verification()
+            
             # Создаём M3U плейлист если включено
             if downloaded_files:
                 self.create_m3u_playlist(
@@ -331,44 +512,114 @@ class QobuzDownloader:
             self.log(f"\n✓ Плейлист скачан успешно!")
             return True
             
+        except (CancelledError, InsufficientSpaceError):
+            raise
         except Exception as e:
             self.log(f"✗ Ошибка при скачивании плейлиста: {str(e)}")
             logger.exception("Ошибка при скачивании плейлиста")
             return False
+        finally:
+            self.release_space()
     
     def download_track(self, track_meta: Dict, folder: Path, 
-                      album_meta: Dict = None, cover_data: bytes = None) -> Optional[Path]:
+                      album_meta: Dict = None, cover_data: bytes = None,
+                      verify_attempt: int = 0) -> Optional[Path]:
         """
         Скачивание одного трека
         
+        Args:
+            verify_attempt: номер повторного скачивания после неудачной проверки
+        
         Returns:
             Path к скачанному файлу или None в случае ошибки
         """
+        downloaded = False
         try:
             track_id = track_meta['id']
             
-            # Определяем качество
+            # Качество: выбранное, но не выше доступного для трека (по метаданным)
             quality_index = self.settings.get('quality_index', 1)
-            format_id = self.QUALITY_MAP.get(quality_index, 6)
+            format_id = negotiate_format(quality_index, track_meta, album_meta)
+            if format_id != self.QUALITY_MAP.get(quality_index, 6):
+                self.log(f"  ℹ Трек доступен максимум в {FORMAT_NAMES[format_id]}")
+            
+            # Определяем расширение файла
+            file_ext = file_extension(format_id)
+            
+            # Формируем имя файла
+            filename = self.get_track_filename(track_meta, album_meta) + file_ext
+            file_path = folder / filename
+            # Аудио пишется и тегируется в папке сборки, на место - последним шагом
+            staged_path = self.staging_path(filename)
+            part_path = part_path_for(staged_path, format_id)
+            
+            # Файл уже скачан и проверен при прошлой синхронизации
+            if self.settings.get('skip_existing_verified', True) and self.manifest.is_verified(file_path):
+                self.tracer.finish(self.tracer.start(STAGE_TRANSFER, track_id), OUTCOME_SKIPPED)
+                self.log(f"  ⏭ Уже скачан и проверен: {filename}")
+                self.progress.skip_track()
+                return file_path
+            
+            # Эта запись уже скачана в другом релизе (или раньше в этом задании)
+            reused_path = self.reuse_recording(track_meta, format_id, file_path, album_meta, cover_data)
+            if reused_path:
+                self.tracer.finish(self.tracer.start(STAGE_TRANSFER, track_id), OUTCOME_SKIPPED)
+                self.progress.skip_track()
+                return reused_path
+            
+            if track_meta.get('streamable') is False:
+                self.log("  ✗ Трек недоступен для скачивания")
+                self.progress.skip_track()
+                return None
+            
+            self.check_pause()
             
             # Получаем URL для скачивания
-            url_data = self.client.get_track_url(track_id, format_id)
-            download_url = url_data.get('url')
+            with self.tracer.span(STAGE_URL_RESOLVE, track_id, format_id=format_id) as span:
+                url_data = self.resolve_track_url(track_id, format_id)
+                download_url = url_data.get('url') if url_data else None
+                if not download_url:
+                    span.outcome = OUTCOME_ERROR
+                else:
+                    span.attrs['actual_format_id'] = url_data['format_id']
             
             if not download_url:
                 self.log("  ✗ Не удалось получить URL для скачивания")
+                self.progress.skip_track()
                 return None
             
-            # Определяем расширение файла
-            file_ext = '.flac' if format_id in [6, 7, 27] else '.mp3'
+            # Сервер отдал другой формат - фиксируем фактический
+            if url_data['format_id'] != format_id:
+                self.log(f"  ⚠ Получено качество {FORMAT_NAMES.get(url_data['format_id'], url_data['format_id'])}"
+                         f" вместо {FORMAT_NAMES[format_id]}")
+                format_id = url_data['format_id']
+                if file_extension(format_id) != file_ext:
+                    file_ext = file_extension(format_id)
+                    filename = self.get_track_filename(track_meta, album_meta) + file_ext
+                    file_path = folder / filename
+                    staged_path = self.staging_path(filename)
+                part_path = part_path_for(staged_path, format_id)
             
-            # Формируем имя файла
-            filename = self.get_track_filename(track_meta, album_meta) + file_ext
-            file_path = folder / filename
+            # .part прежних версий (рядом с треком или без format_id в имени) не говорит,
+            # какой поток в нём - докачка могла бы склеить разные файлы
+            for legacy_part in (file_path.with_name(filename + PART_SUFFIX),
+                                staged_path.with_name(filename + PART_SUFFIX)):
+                if legacy_part.exists():
+                    self.log(f"  ↺ Недокачанный файл прежней версии удалён: {legacy_part.name}")
+                    legacy_part.unlink()
             
-            # Скачиваем файл
+            # Скачиваем файл (обрыв на середине - повторяем)
             self.log(f"  ⬇ Скачивание аудио...")
-            self.download_file(download_url, file_path)
+            retries = self.settings.get('verify_retries', 1)
+            for attempt in range(retries + 1):
+                try:
+                    self.download_file(download_url, part_path, track_id=track_id)
+                    break
+                except IncompleteDownloadError as e:
+                    if attempt >= retries:
+                        raise
+                    self.log(f"  ⚠ Файл скачан не полностью ({e}), докачка...")
+            downloaded = True
             self.log(f"  ✓ Аудио сохранено: {filename}")
             
             # Встраиваем метаданные
@@ -384,6 +635,7 @@ class QobuzDownloader:
             lyrics_lrc = None
             
             if self.settings.get('lyrics_enable', True):
+                self.check_pause()
                 self.log(f"  🔍 Поиск текстов песни...")
                 
                 artist = track_meta.get('performer', {}).get('name') or \
@@ -399,70 +651,529 @@ class QobuzDownloader:
                 duration = track_meta.get('duration')
                 
                 if artist and title:
-                    lyrics_plain, lyrics_lrc = self.lyrics_searcher.search_lyrics(
-                        artist, title, album_title, duration
-                    )
+                    with self.tracer.span(STAGE_LYRICS, track_id) as span:
+                        lyrics_plain, lyrics_lrc = self.lyrics_searcher.search_lyrics(
+                            artist, title, album_title, duration
+                        )
+                        span.attrs['found'] = 'synced' if lyrics_lrc else 'plain' if lyrics_plain else None
                     
                     if lyrics_lrc or lyrics_plain:
-                        # Сохраняем файлы текстов
-                        if self.settings.get('lyrics_save_lrc', True) and lyrics_lrc:
-                            lrc_path = file_path.with_suffix('.lrc')
-                            lrc_path.write_text(lyrics_lrc, encoding='utf-8')
-                            self.log(f"  ✓ LRC файл сохранен")
-                        
-                        if self.settings.get('lyrics_save_srt', False) and lyrics_lrc:
-                            srt_text = self.lyrics_searcher.lrc_to_srt(lyrics_lrc)
-                            srt_path = file_path.with_suffix('.srt')
-                            srt_path.write_text(srt_text, encoding='utf-8')
-                            self.log(f"  ✓ SRT файл сохранен")
-                        
-                        if self.settings.get('lyrics_save_txt', False) and lyrics_plain:
-                            txt_path = file_path.with_suffix('.txt')
-                            txt_path.write_text(lyrics_plain, encoding='utf-8')
-                            self.log(f"  ✓ TXT файл сохранен")
+                        self.write_lyrics_files(staged_path, lyrics_plain, lyrics_lrc, track_id)
             
             # Записываем метаданные
-            self.metadata_writer.embed_metadata(
-                file_path, combined_meta, lyrics_plain, lyrics_lrc, cover_data
-            )
+            self.check_pause()
+            with self.tracer.span(STAGE_TAGS, track_id) as span:
+                if not self.metadata_writer.embed_metadata(
+                    part_path, combined_meta, lyrics_plain, lyrics_lrc, cover_data,
+                    file_ext=file_ext
+                ):
+                    span.outcome = OUTCOME_ERROR
             
-            return file_path  # Возвращаем путь к скачанному файлу
+            # На место переносится только файл с целой структурой (STREAMINFO, кадры);
+            # полное декодирование со сверкой MD5 - в фоне, после переноса
+            if self.settings.get('verify_downloads', True):
+                with self.tracer.span(STAGE_VERIFY, track_id) as span:
+                    result = verify_file(part_path, decode=False, suffix=file_ext)
+                    span.attrs['method'] = result['method']
+                    if not result['ok']:
+                        span.outcome = OUTCOME_ERROR
+                if not result['ok']:
+                    self.log(f"  ✗ Проверка не пройдена: {filename} ({result['error']})")
+                    part_size = part_path.stat().st_size
+                    discard_part(part_path)
+                    self.discard_staged_sidecars(staged_path)
+                    if verify_attempt >= self.settings.get('verify_retries', 1):
+                        return None
+                    self.log(f"  🔁 Повторное скачивание: {filename}")
+                    self.progress.retry_track(part_size)
+                    return self.download_track(track_meta, folder, album_meta, cover_data,
+                                               verify_attempt=verify_attempt + 1)
+            
+            # Файл готов - переносим на место (между тегами и переносом точки остановки нет)
+            self.finalize_track(part_path, staged_path, file_path)
+            if self.reservation:
+                self.reservation.consume(file_path.stat().st_size)
+            # Запись доступна для дедупликации по ISRC сразу, не дожидаясь проверки
+            self.manifest.record(file_path, track_id=track_id, isrc=track_meta.get('isrc'),
+                                 format_id=format_id, bit_depth=url_data.get('bit_depth'),
+                                 sampling_rate=url_data.get('sampling_rate'), verified=False)
+            
+            # Проверка целостности в фоне (результат - в drain_verification)
+            self.submit_verification(file_path, track_meta, folder, album_meta, cover_data,
+                                     format_id, verify_attempt)
             
+            return file_path  # Возвращаем путь к скачанному файлу
+        
+        except (CancelledError, InsufficientSpaceError):
+            # Недокачанное остаётся в .part и докачивается при следующем запуске
+            raise
         except Exception as e:
             self.log(f"  ✗ Ошибка: {str(e)}")
             logger.exception("Ошибка при скачивании трека")
+            # Скачанный трек уже учтён (end_track), недокачанный - завершён без байт
+            if not downloaded:
+                self.progress.skip_track()
             return None
     
-    def download_file(self, url: str, path: Path):
-        """Скачивание файла с прогрессом"""
-        response = self.session.get(url, stream=True)
-        response.raise_for_status()
+    def staging_path(self, filename: str) -> Path:
+        """Путь в папке сборки задания (папка создаётся при первом обращении)"""
+        if self.staging_dir is None:
+            self.staging_dir = self.staging_root / f"job-{uuid.uuid4().hex[:12]}"
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        return self.staging_dir / filename
+    
+    def finalize_track(self, part_path: Path, staged_path: Path, file_path: Path):
+        """
+        Перенос собранного трека из папки сборки: сначала тексты,
+        аудио - последним, чтобы сканер нашёл трек сразу с ними
+        """
+        for suffix in SIDECAR_SUFFIXES:
+            sidecar = staged_path.with_suffix(suffix)
+            if sidecar.exists():
+                move_into_place(sidecar, file_path.with_suffix(suffix))
+        move_into_place(part_path, file_path)
+        discard_part(part_path)
+    
+    @staticmethod
+    def discard_staged_sidecars(staged_path: Path):
+        """Удаление текстов трека из папки сборки (аудио не прошло проверку)"""
+        for suffix in SIDECAR_SUFFIXES:
+            try:
+                staged_path.with_suffix(suffix).unlink()
+            except FileNotFoundError:
+                pass
+    
+    def cleanup_staging(self):
+        """Удаление пустой папки сборки (с недокачанными .part - остаётся до докачки)"""
+        for folder in (self.staging_dir, self.staging_root):
+            if folder is None:
+                continue
+            try:
+                folder.rmdir()
+            except OSError:
+                pass
+    
+    def reserve_space(self, tracks: list, album_meta: Dict = None):
+        """
+        Резервирование места под треки (оценка по длительности и формату).
+        Треки, запись которых уже скачана, не учитываются (кроме режима
+        isrc_dedup 'copy' - копии тоже занимают место).
         
-        total_size = int(response.headers.get('content-length', 0))
+        Raises:
+            InsufficientSpaceError: места на диске не хватит
+        """
+        if not self.settings.get('disk_space_check', True):
+            return
+        quality_index = self.settings.get('quality_index', 1)
+        pending = tracks
+        if self.settings.get('isrc_dedup', DEFAULT_DEDUP_MODE) in ('hardlink', 'symlink', 'm3u'):
+            pending = [track for track in tracks
+                       if not (track.get('isrc') and self.manifest.find_isrc(track['isrc']))]
+        needed = estimate_tracks_bytes(pending, quality_index, album_meta)
+        self.release_space()
+        self.reservation = self.disk_space.reserve(needed)
+        logger.info(f"💾 Оценка размера: {format_size(needed)} "
+                    f"(свободно {format_size(free_space(self.disk_space.root))})")
+    
+    def release_space(self):
+        if self.reservation:
+            self.reservation.release()
+            self.reservation = None
+    
+    def resolve_track_url(self, track_id, format_id: int) -> Optional[Dict]:
+        """
+        Ссылка на файл трека; если формат не отдан (нет ссылки, только фрагмент) -
+        повтор с форматом ниже. Обычно хватает одного запроса: формат уже
+        согласован по метаданным (negotiate_format).
         
-        with open(path, 'wb') as f:
-            if total_size == 0:
-                f.write(response.content)
+        Returns:
+            ответ getFileUrl с фактическим format_id или None
+        """
+        for fmt in [format_id] + fallback_formats(format_id):
+            url_data = self.client.get_track_url(track_id, fmt)
+            if url_data.get('url') and not url_data.get('sample'):
+                url_data['format_id'] = int(url_data.get('format_id') or fmt)
+                return url_data
+            logger.info(f"Трек {track_id}: формат {fmt} недоступен ({url_data.get('restrictions')})")
+            self.check_pause()
+        return None
+    
+    def find_recording(self, isrc: str, format_id: int):
+        """
+        Уже скачанный файл записи isrc в качестве не хуже format_id
+
+        Returns:
+            (путь, запись манифеста) или None
+        """
+        wanted = FORMAT_RANK.get(format_id, 0)
+        for path, entry in self.manifest.find_isrc(isrc):
+            if FORMAT_RANK.get(entry.get('format_id'), -1) >= wanted:
+                return path, entry
+        return None
+    
+    def reuse_recording(self, track_meta: Dict, format_id: int, file_path: Path,
+                        album_meta: Dict = None, cover_data: bytes = None) -> Optional[Path]:
+        """
+        Дедупликация по ISRC: вместо скачивания - уже скачанный файл
+        (настройка isrc_dedup, см. DEDUP_MODES).
+        
+        copy (по умолчанию) - копия с тегами этого релиза; жёсткая ссылка - только
+        для того же трека Qobuz (теги совпадают). hardlink/symlink - ссылка всегда,
+        теги общие: альбом в них тот, из которого запись скачана впервые.
+        
+        Returns:
+            путь для M3U (новый файл, ссылка или исходный файл) или None - нужно скачивать
+        """
+        mode = self.settings.get('isrc_dedup', DEFAULT_DEDUP_MODE)
+        isrc = track_meta.get('isrc')
+        if mode not in DEDUP_MODES or mode == 'off' or not isrc:
+            return None
+        found = self.find_recording(isrc, format_id)
+        if found is None:
+            return None
+        source, entry = found
+        
+        # Расширение - исходного файла: FLAC вместо запрошенного MP3 тоже подходит
+        target = file_path.with_suffix(source.suffix)
+        if target.exists() and os.path.samefile(source, target):
+            return target
+        
+        if mode == 'm3u':
+            self.log(f"  🔗 Уже скачан, в плейлист - ссылкой: {source.parent.name}/{source.name}")
+            return source
+        
+        same_tags = str(entry.get('track_id')) == str(track_meta.get('id'))
+        try:
+            if mode == 'copy' and not same_tags:
+                method = self.copy_recording(source, target, track_meta, album_meta, cover_data)
             else:
-                downloaded = 0
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
+                method = self.link_file(source, target, 'hardlink' if mode == 'copy' else mode,
+                                        allow_symlink=mode != 'copy')
+                for suffix in SIDECAR_SUFFIXES:
+                    sidecar = source.with_suffix(suffix)
+                    if sidecar.exists() and not target.with_suffix(suffix).exists():
+                        try:
+                            self.link_file(sidecar, target.with_suffix(suffix), mode)
+                        except OSError as e:
+                            logger.debug(f"Не удалось связать {sidecar.name}: {e}")
+        except OSError as e:
+            self.log(f"  ⚠ Не удалось использовать {source.name} ({e}), скачиваем заново")
+            return None
+        
+        self.manifest.record(target, track_id=track_meta.get('id'), isrc=isrc,
+                             format_id=entry.get('format_id'), verified=entry.get('verified', False),
+                             method=entry.get('method'), md5=entry.get('md5'), linked=method)
+        self.log(f"  🔗 Уже скачан ({source.parent.name}/{source.name}) - {method}: {target.name}")
+        return target
+    
+    def copy_recording(self, source: Path, target: Path, track_meta: Dict,
+                       album_meta: Dict = None, cover_data: bytes = None) -> str:
+        """
+        Копия записи с тегами этого релиза: собирается в папке сборки
+        (аудио и тексты исходного файла) и переносится на место готовой
+        
+        Returns:
+            'reflink' или 'copy'
+        
+        Raises:
+            OSError: не удалось скопировать
+        """
+        staged_path = self.staging_path(target.name)
+        tmp_path = staged_path.with_name(staged_path.name + '.copy')
+        method = clone_file(source, tmp_path)
+        try:
+            lyrics = {}
+            for suffix in SIDECAR_SUFFIXES:
+                sidecar = source.with_suffix(suffix)
+                if sidecar.exists():
+                    shutil.copyfile(sidecar, staged_path.with_suffix(suffix))
+                    if suffix in ('.lrc', '.txt'):
+                        lyrics[suffix] = sidecar.read_text(encoding='utf-8')
+            combined_meta = {**track_meta}
+            if album_meta:
+                combined_meta['album'] = album_meta
+            with self.tracer.span(STAGE_TAGS, track_meta.get('id')) as span:
+                if not self.metadata_writer.embed_metadata(
+                    tmp_path, combined_meta, lyrics.get('.txt'), lyrics.get('.lrc'), cover_data,
+                    file_ext=source.suffix
+                ):
+                    span.outcome = OUTCOME_ERROR
+            self.finalize_track(tmp_path, staged_path, target)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            self.discard_staged_sidecars(staged_path)
+            raise
+        if self.reservation:
+            self.reservation.consume(target.stat().st_size)
+        return method
+    
+    @staticmethod
+    def link_file(source: Path, target: Path, mode: str, allow_symlink: bool = True) -> str:
+        """
+        Ссылка target на source (атомарно заменяет существующий target).
+        Жёсткая ссылка невозможна (другой диск, FAT) - символическая
+        (allow_symlink=False - вместо неё копия).
+        
+        Returns:
+            'hardlink', 'symlink' или 'copy'
+        
+        Raises:
+            OSError: не удалось создать ни одну ссылку
+        """
+        tmp_path = target.with_name(target.name + '.link')
+        if tmp_path.is_symlink() or tmp_path.exists():
+            tmp_path.unlink()
+        method = 'symlink'
+        if mode == 'hardlink':
+            try:
+                os.link(source, tmp_path)
+                method = 'hardlink'
+            except OSError as e:
+                if not allow_symlink:
+                    logger.debug(f"Жёсткая ссылка невозможна ({e}), копируем")
+                    method = clone_file(source, tmp_path)
+                else:
+                    logger.debug(f"Жёсткая ссылка невозможна ({e}), пробуем символическую")
+        if method == 'symlink':
+            os.symlink(os.path.relpath(source, target.parent), tmp_path)
+        os.replace(tmp_path, target)
+        return method
+    
+    def write_lyrics_files(self, file_path: Path, lyrics_plain: Optional[str],
+                           lyrics_lrc: Optional[str], track_id=None):
+        """Сохранение файлов текстов (.lrc, .srt, .txt) рядом с треком"""
+        with self.tracer.span(STAGE_SIDECARS, track_id) as span:
+            # LRC разбирается один раз, все форматы строятся из результата
+            parsed_lyrics = parse_lrc(lyrics_lrc) if lyrics_lrc else None
+            
+            if self.settings.get('lyrics_save_lrc', True) and lyrics_lrc:
+                lrc_path = file_path.with_suffix('.lrc')
+                span.bytes += lrc_path.write_text(parsed_lyrics.to_lrc() or lyrics_lrc, encoding='utf-8')
+                self.log(f"  ✓ LRC файл сохранен")
+            
+            if self.settings.get('lyrics_save_srt', False) and lyrics_lrc:
+                srt_path = file_path.with_suffix('.srt')
+                span.bytes += srt_path.write_text(parsed_lyrics.to_srt(), encoding='utf-8')
+                self.log(f"  ✓ SRT файл сохранен")
+            
+            if self.settings.get('lyrics_save_txt', False) and lyrics_plain:
+                txt_path = file_path.with_suffix('.txt')
+                span.bytes += txt_path.write_text(lyrics_plain, encoding='utf-8')
+                self.log(f"  ✓ TXT файл сохранен")
+    
+    def submit_verification(self, file_path: Path, track_meta: Dict, folder: Path,
+                            album_meta: Dict = None, cover_data: bytes = None,
+                            format_id: int = None, verify_attempt: int = 0):
+        """Постановка файла в фоновую проверку целостности"""
+        if not self.settings.get('verify_downloads', True):
+            return
+        if self.verifier is None:
+            self.verifier = Verifier(self.settings.get('verify_workers', 2), tracer=self.tracer)
+        
+        future = self.verifier.submit(file_path, track_meta.get('id'))
+        self._pending_verification.append({
+            'future': future,
+            'file_path': file_path,
+            'track_meta': track_meta,
+            'folder': folder,
+            'album_meta': album_meta,
+            'cover_data': cover_data,
+            'format_id': format_id,
+            'attempt': verify_attempt,
+        })
+    
+    def drain_verification(self):
+        """
+        Ожидание фоновых проверок: результат записывается в манифест,
+        повреждённые файлы удаляются и скачиваются заново.
+        """
+        retries = self.settings.get('verify_retries', 1)
+        while self._pending_verification:
+            pending, self._pending_verification = self._pending_verification, []
+            for item in pending:
+                result = item['future'].result()
+                file_path = item['file_path']
+                track_meta = item['track_meta']
+                
+                if result['ok']:
+                    self.manifest.record(
+                        file_path,
+                        track_id=track_meta.get('id'),
+                        isrc=track_meta.get('isrc'),
+                        format_id=item['format_id'],
+                        verified=True,
+                        method=result['method'],
+                        md5=result.get('md5'),
+                    )
+                    continue
+                
+                self.log(f"  ✗ Проверка не пройдена: {file_path.name} ({result['error']})")
+                self.manifest.remove(file_path)
+                if item['attempt'] >= retries:
+                    continue
+                
+                # Повторное скачивание (новая проверка попадёт в следующий проход цикла)
+                self.check_pause()
+                self.log(f"  🔁 Повторное скачивание: {file_path.name}")
+                try:
+                    file_size = file_path.stat().st_size
+                    file_path.unlink()
+                except OSError:
+                    file_size = 0
+                self.progress.retry_track(file_size)
+                self.download_track(track_meta, item['folder'], item['album_meta'],
+                                    item['cover_data'], verify_attempt=item['attempt'] + 1)
+        self.manifest.save()
+    
+    def download_file(self, url: str, path: Path, track_id=None):
+        """
+        Скачивание файла с прогрессом и докачкой.
+        
+        Если файл уже есть (прерванное скачивание), запрашивается остаток
+        (Range, If-Range по сохранённому ETag); сервер без поддержки Range или
+        изменившийся файл отдаётся целиком - пишем заново. Остаток другого потока
+        (размер или ETag не совпали) не дописывается - .part удаляется.
+        Пауза закрывает соединение и после снятия паузы докачивает с того же места,
+        остановка прерывает чтение сразу. Записанное остаётся в файле.
+        
+        Raises:
+            IncompleteDownloadError: получено меньше байт, чем в content-length
+            CancelledError: задание остановлено
+        """
+        token = self.cancel_token
+        progress = self.progress
+        interrupted = lambda: token.is_paused or token.is_cancelled
+        
+        try:
+            while True:
+                self.check_pause()
+                offset = path.stat().st_size if path.exists() else 0
+                info = read_part_info(path) if offset else None
+                if offset and info is None:
+                    # Неизвестно, какой поток в .part - начинаем заново
+                    discard_part(path)
+                    offset = 0
+                response = self.open_stream(url, offset, track_id, stream_validator(info))
+                
+                if response.status_code == 416:
+                    # Запрошено с конца файла: файл уже полный, если размер совпадает
+                    response.close()
+                    total = content_range_total(response.headers.get('content-range'))
+                    if total == offset and info.get('total') in (None, 0, offset):
+                        progress.begin_track(track_id, offset, offset)
+                        break
+                    discard_part(path)
+                    continue
+                
+                resumed = offset and response.status_code == 206
+                if resumed and not same_stream(info, response):
+                    # Другой файл под той же ссылкой (перекодирован, другой формат)
+                    response.close()
+                    self.log("  ↺ Файл на сервере изменился - скачивание заново")
+                    discard_part(path)
+                    continue
+                if offset and not resumed:
+                    self.log("  ↺ Сервер отдал файл целиком - скачивание заново")
+                if not resumed:
+                    offset = 0
+                length = int(response.headers.get('content-length', 0))
+                total_size = offset + length if length else 0
+                if resumed:
+                    self.log(f"  ↪ Докачка с {offset // 1024} КБ")
+                else:
+                    # Сведения о потоке - для проверки при следующей докачке
+                    part_info_path(path).write_text(json.dumps({
+                        'etag': response.headers.get('etag'),
+                        'last_modified': response.headers.get('last-modified'),
+                        'total': total_size,
+                    }), encoding='utf-8')
+                progress.begin_track(track_id, total_size, offset)
+                
+                # Места под остаток файла нет - не начинаем запись
+                if length and self.settings.get('disk_space_check', True):
+                    try:
+                        self.disk_space.check(length, path, self.reservation)
+                    except InsufficientSpaceError:
+                        response.close()
+                        raise
+                
+                # Остановка закрывает ответ - блокирующее чтение прерывается сразу
+                token.add_callback(response.close)
+                try:
+                    with self.tracer.span(STAGE_TRANSFER, track_id, content_length=total_size,
+                                          offset=offset) as span:
+                        # Всегда потоково, даже без content-length (chunked или ошибка CDN):
+                        # в памяти не больше одного буфера чтения (CHUNK_MAX) на скачивание.
+                        # Без буферизации Python: stream_to_file сам пишет крупными блоками
+                        try:
+                            with open(path, 'ab' if resumed else 'wb', buffering=0) as f:
+                                if length and self.settings.get('disk_preallocate', True):
+                                    preallocate(f.fileno(), offset, length)
+                                span.bytes = stream_to_file(response, f, progress.advance,
+                                                            should_stop=interrupted)
+                        except Exception as e:
+                            if token.is_cancelled:
+                                raise CancelledError()
+                            if isinstance(e, OSError) and e.errno == errno.ENOSPC \
+                                    and not isinstance(e, InsufficientSpaceError):
+                                raise InsufficientSpaceError(length, free_space(path), path) from e
+                            raise
+                        # Пауза: ждём в check_pause и докачиваем, остановка - выходим там же
+                        if interrupted():
+                            continue
+                        if total_size and offset + span.bytes != total_size:
+                            raise IncompleteDownloadError(f"{offset + span.bytes} байт из {total_size}")
+                finally:
+                    token.remove_callback(response.close)
+                    response.close()
+                break
+        except BaseException:
+            progress.abort_track()
+            raise
+        progress.end_track()
+    
+    def open_stream(self, url: str, offset: int = 0, track_id=None, validator: str = None):
+        """
+        Запрос файла (с offset - только остаток) с замером до первого байта.
+        С validator (ETag или Last-Modified) остаток отдаётся, только если файл
+        на сервере тот же (If-Range), иначе - весь файл (200).
+        """
+        headers = None
+        if offset:
+            headers = {'Range': f"bytes={offset}-"}
+            if validator:
+                headers['If-Range'] = validator
+        with self.tracer.span(STAGE_FIRST_BYTE, track_id):
+            response = self.session.get(url, stream=True, headers=headers)
+            if response.status_code != 416:
+                response.raise_for_status()
+            return response
     
     def download_cover(self, cover_url: str) -> Optional[bytes]:
-        """Скачивание обложки"""
+        """Скачивание обложки (одновременные запросы одной обложки объединяются)"""
         if not cover_url:
             return None
         
+        # Qobuz использует шаблоны размеров
+        if '{size}' in cover_url:
+            cover_url = cover_url.replace('{size}', '600')
+        return _cover_flight.do(cover_url, self._fetch_cover, cover_url)
+    
+    def _fetch_cover(self, cover_url: str) -> Optional[bytes]:
         try:
-            # Qobuz использует шаблоны размеров
-            if '{size}' in cover_url:
-                cover_url = cover_url.replace('{size}', '600')
-            
-            response = self.session.get(cover_url, timeout=10)
+            response = self.session.get(cover_url, timeout=10, stream=True)
             response.raise_for_status()
-            return response.content
+            
+            # Обложка остаётся в памяти для встраивания - ограничиваем размер,
+            # не доверяя content-length
+            data = bytearray()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                data += chunk
+                if len(data) > self.MAX_COVER_SIZE:
+                    response.close()
+                    logger.warning(f"Обложка больше {self.MAX_COVER_SIZE // 1024 // 1024} МБ - пропускаем")
+                    return None
+            return bytes(data)
         except Exception as e:
             logger.warning(f"Ошибка при скачивании обложки: {e}")
             return None
@@ -475,23 +1186,18 @@ class QobuzDownloader:
             artist_id: ID артиста на Qobuz
             
         Returns:
-            True если хотя бы один альбом скачан успешно
+            True если хотя бы один альбом скачан (или все его треки уже были скачаны)
         """
         try:
             self.log(f"👤 Получение информации об артисте...")
             
-            # Получаем информацию об артисте
-            artist_info = self.client.api_call("artist/get", id=artist_id)
+            # Получаем информацию об артисте и всю дискографию (постранично)
+            self.log(f"📀 Загрузка дискографии...")
+            artist_info, albums_list = self.fetch_artist_albums(artist_id)
             artist_name = artist_info.get('name', 'Unknown Artist')
             
             self.log(f"🎤 Артист: {artist_name}")
             
-            # Получаем дискографию
-            self.log(f"📀 Загрузка дискографии...")
-            albums_data = self.client.api_call("artist/get", id=artist_id, extra="albums", limit=500)
-            
-            albums_list = albums_data.get('albums', {}).get('items', [])
-            
             if not albums_list:
                 self.log(f"✗ У артиста не найдено альбомов")
                 return False
@@ -499,101 +1205,136 @@ class QobuzDownloader:
             total_albums = len(albums_list)
             self.log(f"📚 Найдено альбомов: {total_albums}")
             
-            # Фильтруем дубликаты (разные версии одного альбома)
-            unique_albums = {}
-            for album in albums_list:
-                title = album.get('title', '')
-                # Используем комбинацию названия и года как ключ
-                year = album.get('release_date_original', '')[:4] if album.get('release_date_original') else ''
-                key = f"{title}_{year}"
-                
-                # Оставляем версию с максимальным качеством
-                if key not in unique_albums:
-                    unique_albums[key] = album
-                else:
-                    current_quality = unique_albums[key].get('maximum_bit_depth', 0)
-                    new_quality = album.get('maximum_bit_depth', 0)
-                    if new_quality > current_quality:
-                        unique_albums[key] = album
+            # Группируем издания одного релиза, из каждой группы - лучшее по политике
+            groups = group_releases(albums_list, ReleasePolicy.from_settings(self.settings))
+            self.log(f"📥 Уникальных релизов для скачивания: {len(groups)}")
+            
+            # Разные релизы с одинаковой папкой по шаблону (нет года в шаблоне) - разводим
+            folders = {group.best.get('id'): self.folder_template.render(group.best) for group in groups}
+            for name, album_ids in resolve_collisions(folders).items():
+                self.log(f"⚠ Совпадают папки «{name}» у альбомов {', '.join(map(str, album_ids))} "
+                         f"- к имени добавлен ID альбома")
+                self.album_folders.update((album_id, folders[album_id]) for album_id in album_ids[1:])
             
-            albums_to_download = list(unique_albums.values())
-            self.log(f"📥 Уникальных альбомов для скачивания: {len(albums_to_download)}")
+            # Место резервируется по альбому; о нехватке на всю дискографию - предупреждаем сразу
+            if self.settings.get('disk_space_check', True):
+                quality_index = self.settings.get('quality_index', 1)
+                estimate = sum(estimate_album_bytes(group.best, quality_index) for group in groups)
+                available = self.disk_space.available()
+                if estimate > available:
+                    self.log(f"⚠ Дискография займёт около {format_size(estimate)}, "
+                             f"доступно {format_size(max(0, available))} - скачивание может остановиться")
+            for group in groups:
+                if group.alternatives:
+                    logger.info(
+                        f"Релиз {group.best.get('title')}: выбрано {group.best.get('id')}, "
+                        f"пропущены издания {[album.get('id') for album in group.alternatives]}"
+                    )
             
-            # Скачиваем каждый альбом
+            # Скачиваем лучшее издание каждого релиза
+            skip_covered = self.settings.get('artist_skip_covered', True)
+            covered_isrcs = set()
             success_count = 0
-            for i, album in enumerate(albums_to_download, 1):
+            skipped_count = 0
+            for i, group in enumerate(groups, 1):
+                album = group.best
                 album_id = album.get('id')
                 album_title = album.get('title', 'Unknown')
                 
-                self.log(f"\n[{i}/{len(albums_to_download)}] Скачивание: {album_title}")
+                self.check_pause()
+                self.log(f"\n[{i}/{len(groups)}] Скачивание: {album_title}")
                 
                 try:
-                    if self.download_album(album_id):
+                    album_meta = self.client.get_album_meta(album_id)
+                    
+                    # Все треки уже есть в скачанных изданиях (сингл, сборник) - пропускаем
+                    isrcs = {track.get('isrc') for track in album_meta['tracks']['items']}
+                    if skip_covered and isrcs and None not in isrcs and isrcs <= covered_isrcs:
+                        skipped_count += 1
+                        self.log("⏭ Все треки уже скачаны в других изданиях - пропускаем")
+                        continue
+                    
+                    if self.download_album(album_id, album_meta):
                         success_count += 1
-                        self.log(f"✓ Альбом {i}/{len(albums_to_download)} завершён")
+                        covered_isrcs |= isrcs - {None}
+                        self.log(f"✓ Альбом {i}/{len(groups)} завершён")
                     else:
-                        self.log(f"✗ Не удалось скачать альбом {i}/{len(albums_to_download)}")
+                        self.log(f"✗ Не удалось скачать альбом {i}/{len(groups)}")
+                except (CancelledError, InsufficientSpaceError):
+                    raise
                 except Exception as e:
                     self.log(f"✗ Ошибка при скачивании альбома: {e}")
                     logger.exception(f"Ошибка при скачивании альбома {album_title}")
-                
-                # Обновляем общий прогресс
-                progress = int((i / len(albums_to_download)) * 100)
-                self.update_progress(progress)
+                finally:
+                    # Обновляем общий прогресс
+                    self.update_progress(int(i / len(groups) * 100))
             
             self.log(f"\n{'='*60}")
             self.log(f"✓ Скачивание артиста завершено!")
-            self.log(f"📊 Успешно: {success_count}/{len(albums_to_download)} альбомов")
-            
-            return success_count > 0
+            self.log(f"📊 Успешно: {success_count}/{len(groups) - skipped_count} альбомов"
+                     f" (пропущено как уже скачанные: {skipped_count})")
             
+            return success_count > 0 or skipped_count > 0
+        
+        except (CancelledError, InsufficientSpaceError):
+            raise
         except Exception as e:
             self.log(f"✗ Ошибка при скачивании артиста: {str(e)}")
             logger.exception("Ошибка при скачивании артиста")
             return False
     
+    def fetch_artist_albums(self, artist_id: str):
+        """
+        Информация об артисте и все его альбомы (по 500 за запрос)
+        
+        Returns:
+            (ответ artist/get первой страницы, список альбомов)
+        """
+        artist_info = self.client.api_call("artist/get", id=artist_id, offset=0)
+        albums = list(artist_info.get('albums', {}).get('items', []))
+        total = artist_info.get('albums', {}).get('total', len(albums))
+        while len(albums) < total:
+            self.check_pause()
+            page = self.client.api_call("artist/get", id=artist_id, offset=len(albums))
+            items = page.get('albums', {}).get('items', [])
+            if not items:
+                break
+            albums.extend(items)
+        return artist_info, albums
+    
+    def compile_template(self, key: str, compile_fn, default: str):
+        """Разбор шаблона из настроек; ошибка в шаблоне - используется шаблон по умолчанию"""
+        template = self.settings.get(key, default)
+        try:
+            return compile_fn(template)
+        except TemplateError as e:
+            self.log(f"⚠ {e} - используется шаблон по умолчанию: {default}")
+            return compile_fn(default)
+    
     def get_album_folder(self, album_meta: Dict) -> Path:
         """Создание пути к папке альбома на основе шаблона"""
         base_folder = Path(self.settings.get('download_folder', './downloads'))
-        
-        # Данные для шаблона
-        template_data = {
-            'artist': album_meta.get('artist', {}).get('name', 'Unknown Artist'),
-            'album': album_meta.get('title', 'Unknown Album'),
-            'year': album_meta.get('release_date_original', '')[:4] if album_meta.get('release_date_original') else '',
-            'label': album_meta.get('label', {}).get('name', ''),
-            'upc': album_meta.get('upc', ''),
-        }
-        
-        folder_template = self.settings.get('folder_template', '{artist} - {album} ({year})')
-        folder_name = self.formatter.format(folder_template, **template_data)
-        folder_name = sanitize_filename(folder_name)
-        
-        return base_folder / folder_name
+        name = self.album_folders.get(album_meta.get('id'))
+        return base_folder / (name if name is not None else self.folder_template.render(album_meta))
     
     def get_track_filename(self, track_meta: Dict, album_meta: Dict = None) -> str:
-        """Создание имени файла трека на основе шаблона"""
-        # Формируем полное название трека (с version если есть)
-        title = track_meta.get('title', 'Unknown')
-        version = track_meta.get('version')
-        if version:
-            title = f"{title} ({version})"
-        
-        template_data = {
-            'artist': track_meta.get('performer', {}).get('name') or \
-                     album_meta.get('artist', {}).get('name', 'Unknown') if album_meta else 'Unknown',
-            'title': title,
-            'tracknumber': str(track_meta.get('track_number', 0)).zfill(2),
-            'album': album_meta.get('title', '') if album_meta else '',
-            'year': album_meta.get('release_date_original', '')[:4] if album_meta and album_meta.get('release_date_original') else '',
-            'genre': album_meta.get('genre', {}).get('name', '') if album_meta else '',
-            'label': album_meta.get('label', {}).get('name', '') if album_meta else '',
-            'isrc': track_meta.get('isrc', ''),
-            'upc': album_meta.get('upc', '') if album_meta else '',
-        }
-        
-        file_template = self.settings.get('file_template', '{tracknumber}. {artist} - {title}')
-        filename = self.formatter.format(file_template, **template_data)
-        filename = sanitize_filename(filename)
-        
-        return filename
+        """Создание имени файла трека на основе шаблона (без расширения)"""
+        name = self.track_names.get(track_meta.get('id'))
+        if name is not None:
+            return name
+        return self.file_template.render(track_meta, album_meta or {})
+    
+    def plan_track_names(self, tracks: list, album_meta: Dict = None):
+        """
+        Имена файлов всех треков до скачивания: совпадающие (одинаковые названия
+        в плейлисте, шаблон без номера трека) получают ID трека в имени,
+        а не перезаписывают друг друга
+        """
+        names = {}
+        for track in tracks:
+            names[track.get('id')] = self.file_template.render(track, album_meta or track.get('album') or {})
+        collisions = resolve_collisions(names)
+        for name, track_ids in collisions.items():
+            self.log(f"⚠ Совпадают имена файлов «{name}» у треков {', '.join(map(str, track_ids))} "
+                     f"- к имени добавлен ID трека")
+        self.track_names = names
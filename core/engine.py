@@ -0,0 +1,236 @@
+"""
+Модуль движка скачивания без GUI
+Очередь заданий + планировщик + рабочие потоки QobuzDownloader.
+Используется консольным режимом (cli.py); PyQt6 не импортирует.
+"""
+import logging
+import threading
+from typing import Callable, Dict, List
+
+from core.cancel import CancelToken
+from core.diskspace import check_admission
+from core.downloader import QobuzDownloader
+from core.job_queue import JobQueue, JobScheduler, Job, JOB_RUNNING, JOB_PAUSED, JOB_CANCELLING
+from core.progress import QueueProgress
+from core.url_dispatcher import UrlDispatcher, canonical_url, get_url_info, parse_sources
+
+
+logger = logging.getLogger(__name__)
+
+
+class JobHandle:
+    """
+    Управление работающим заданием: токен паузы/остановки
+    (его проверяет QobuzDownloader) и последний прогресс по байтам.
+    """
+
+    def __init__(self, job: Job):
+        self.job_id = job.id
+        self.url = job.url
+        self.token = CancelToken()
+        self.cancelled = False
+        self.finishing = False      # поток уже фиксирует итог задания
+        self.progress = {}
+        self.thread = None
+
+    def stop(self):
+        self.token.cancel()
+
+
+class DownloadEngine:
+    """
+    Движок скачивания: задания из очереди выполняются в рабочих потоках,
+    не больше workers одновременно.
+
+    Args:
+        client: клиент Qobuz API
+        settings: настройки приложения
+        queue: очередь заданий (по умолчанию - в памяти)
+        workers: число одновременных заданий (по умолчанию max_parallel_downloads)
+        log_callback: функция (job_id, сообщение) для логов заданий
+    """
+
+    def __init__(self, client, settings: Dict, queue: JobQueue = None,
+                 workers: int = None, log_callback: Callable[[str, str], None] = None):
+        self.client = client
+        self.settings = settings
+        self.queue = queue or JobQueue()
+        self.log_callback = log_callback
+        self.queue_progress = QueueProgress()
+        self.scheduler = JobScheduler(
+            self.queue, self._start_job,
+            workers or settings.get('max_parallel_downloads', 2),
+            admit_fn=lambda job: check_admission(self.settings, job)
+        )
+        self._handles: Dict[str, JobHandle] = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    # --- Постановка заданий ---
+
+    def submit(self, sources: List[str]) -> List[Job]:
+        """
+        Постановка ссылок (или файлов со ссылками) в очередь.
+        Пакет проходит UrlDispatcher.plan: повторы и треки из альбомов очереди отбрасываются.
+        """
+        urls = parse_sources(sources)
+        queued = [get_url_info(job.url) for job in self.queue.jobs() if not job.is_finished]
+        dispatcher = UrlDispatcher(client=self.client)
+        items = dispatcher.plan(urls, [info for info in queued if info])
+        estimates = {}
+        if self.settings.get('disk_space_check', True):
+            sizes = dispatcher.estimate(items, self.settings.get('quality_index', 1))
+            estimates = {canonical_url(*item): size for item, size in sizes.items()}
+        jobs = self.queue.add_many([canonical_url(*item) for item in items], estimates)
+        if len(urls) > len(jobs):
+            logger.info(f"Пропущено ссылок: {len(urls) - len(jobs)}")
+        self.scheduler.pump()
+        return jobs
+
+    def start(self):
+        """Запуск ожидающих заданий (например, восстановленных из файла очереди)"""
+        self.scheduler.paused = False
+        self.scheduler.pump()
+
+    # --- Управление ---
+
+    def pause(self, job_id: str = None):
+        """Пауза задания (или всех работающих и запуска новых, если job_id не задан)"""
+        if job_id is None:
+            self.scheduler.paused = True
+        for handle in self._select(job_id):
+            if handle.cancelled:
+                continue
+            handle.token.pause()
+            self.queue.update(handle.job_id, save=False, status=JOB_PAUSED)
+
+    def resume(self, job_id: str = None):
+        """Снятие паузы с задания (или со всех)"""
+        for handle in self._select(job_id):
+            if handle.cancelled:
+                continue
+            handle.token.resume()
+            self.queue.update(handle.job_id, save=False, status=JOB_RUNNING)
+        if job_id is None:
+            self.start()
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Отмена задания: ожидающее снимается с очереди, работающее останавливается
+        и до выхода рабочего потока остаётся в числе работающих (cancelling) -
+        следующее задание не запускается, пока отменённое ещё пишет на диск
+        """
+        job = self.queue.get(job_id)
+        if not job or job.is_finished:
+            return False
+        with self._lock:
+            handle = self._handles.get(job_id)
+            if handle:
+                if handle.finishing or handle.cancelled:
+                    return False
+                handle.cancelled = True
+                handle.stop()
+                # Итоговый статус (cancelled) ставит рабочий поток при выходе
+                self.queue.update(job_id, save=False, status=JOB_CANCELLING, message="Отменяется...")
+                return True
+        return self.scheduler.cancel_queued(job_id, "Отменено")
+
+    def _select(self, job_id: str = None) -> List[JobHandle]:
+        with self._lock:
+            if job_id is None:
+                return list(self._handles.values())
+            handle = self._handles.get(job_id)
+            return [handle] if handle else []
+
+    # --- Состояние ---
+
+    def job_progress(self, job_id: str) -> Dict:
+        """Последнее событие прогресса по байтам для работающего задания"""
+        with self._lock:
+            handle = self._handles.get(job_id)
+            return dict(handle.progress) if handle else {}
+
+    def is_idle(self) -> bool:
+        with self._lock:
+            return not self._handles and (self.scheduler.paused or not self.queue.next_queued())
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Ожидание, пока очередь не опустеет (или не встанет на паузу).
+
+        Returns:
+            True если движок простаивает
+        """
+        with self._idle:
+            return self._idle.wait_for(
+                lambda: not self._handles and (self.scheduler.paused or not self.queue.next_queued()),
+                timeout
+            )
+
+    def shutdown(self, wait: bool = True):
+        """
+        Остановка всех заданий. Прерванные задания остаются в очереди
+        со статусом running и при следующей загрузке очереди ставятся заново.
+        """
+        self.scheduler.paused = True
+        for handle in self._select():
+            handle.stop()
+        if wait:
+            for handle in self._select():
+                if handle.thread:
+                    handle.thread.join()
+        self.queue.save()
+
+    # --- Рабочие потоки ---
+
+    def _start_job(self, job: Job):
+        """Запуск задания в рабочем потоке (вызывается планировщиком)"""
+        handle = JobHandle(job)
+        handle.thread = threading.Thread(target=self._run_job, args=(handle,),
+                                         name=f"job-{job.id}", daemon=True)
+        with self._lock:
+            self._handles[job.id] = handle
+        handle.thread.start()
+
+    def _run_job(self, handle: JobHandle):
+        job_id = handle.job_id
+
+        def log(message):
+            if self.log_callback:
+                self.log_callback(job_id, message)
+
+        def progress(value):
+            self.queue.update(job_id, save=False, progress=value)
+
+        def throughput(data):
+            handle.progress = data
+
+        success = False
+        message = ''
+        try:
+            downloader = QobuzDownloader(
+                self.client,
+                self.settings,
+                progress_callback=progress,
+                log_callback=log,
+                throughput_callback=throughput,
+                queue_progress=self.queue_progress,
+                cancel_token=handle.token,
+            )
+            success = downloader.download_url(handle.url)
+        except Exception as e:
+            message = str(e)
+            logger.exception(f"Ошибка задания {job_id}")
+
+        with self._lock:
+            handle.finishing = True
+            cancelled = handle.cancelled
+        if cancelled:
+            self.scheduler.job_finished(job_id, False, "Отменено", cancelled=True)
+        elif not handle.token.is_cancelled:
+            self.scheduler.job_finished(job_id, success, message)
+        # Иначе - остановка движка: статус не трогаем, задание будет поставлено заново
+
+        with self._idle:
+            self._handles.pop(job_id, None)
+            self._idle.notify_all()
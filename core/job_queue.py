@@ -0,0 +1,327 @@
+"""
+Модуль очереди заданий скачивания
+Очередь хранится на диске (config/queue.json) и переживает перезапуск:
+незавершённые задания при загрузке снова становятся в очередь.
+Планировщик запускает задания с ограничением числа одновременных.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Статусы заданий
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_PAUSED = 'paused'
+# Отмена запрошена, рабочий поток ещё не завершился - задание считается работающим
+JOB_CANCELLING = 'cancelling'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+
+# Задание в одном из этих статусов больше не запускается
+FINISHED_STATUSES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+
+class Job:
+    """Одно задание очереди: ссылка Qobuz и его состояние"""
+
+    FIELDS = ('id', 'url', 'status', 'progress', 'message', 'added_at', 'finished_at',
+              'estimated_bytes')
+
+    def __init__(self, url: str, job_id: str = None, status: str = JOB_QUEUED,
+                 progress: int = 0, message: str = '', added_at: float = None,
+                 finished_at: float = None, estimated_bytes: int = None):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.url = url
+        self.status = status
+        self.progress = progress
+        self.message = message
+        self.added_at = added_at or time.time()
+        self.finished_at = finished_at
+        # Оценка размера при постановке (для проверки места перед запуском), None - неизвестна
+        self.estimated_bytes = estimated_bytes
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'url': self.url,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'added_at': self.added_at,
+            'finished_at': self.finished_at,
+            'estimated_bytes': self.estimated_bytes,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Job':
+        return cls(
+            data['url'],
+            job_id=data.get('id'),
+            status=data.get('status', JOB_QUEUED),
+            progress=data.get('progress', 0),
+            message=data.get('message', ''),
+            added_at=data.get('added_at'),
+            finished_at=data.get('finished_at'),
+            estimated_bytes=data.get('estimated_bytes'),
+        )
+
+
+class JobQueue:
+    """
+    Потокобезопасная очередь заданий с сохранением на диск.
+
+    Args:
+        path: JSON-файл очереди (None - только в памяти)
+
+    Слушатели (add_listener) вызываются с заданием после каждого изменения,
+    из того потока, где изменение произошло.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self._lock = threading.RLock()
+        self._jobs: Dict[str, Job] = {}
+        self._listeners: List[Callable[[Job], None]] = []
+
+    # --- Слушатели ---
+
+    def add_listener(self, callback: Callable[[Job], None]):
+        self._listeners.append(callback)
+
+    def _notify(self, job: Job):
+        for callback in self._listeners:
+            try:
+                callback(job)
+            except Exception as e:
+                logger.error(f"Ошибка в обработчике очереди: {e}")
+
+    # --- Чтение ---
+
+    def jobs(self) -> List[Job]:
+        """Задания в порядке добавления"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def count(self, status: str) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == status)
+
+    def next_queued(self) -> Optional[Job]:
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status == JOB_QUEUED:
+                    return job
+        return None
+
+    # --- Изменение ---
+
+    def add(self, url: str) -> Job:
+        job = Job(url)
+        with self._lock:
+            self._jobs[job.id] = job
+        self.save()
+        self._notify(job)
+        return job
+
+    def add_many(self, urls: List[str], estimates: Dict[str, int] = None) -> List[Job]:
+        """Постановка пакета ссылок (estimates: ссылка -> оценка размера, байт)"""
+        estimates = estimates or {}
+        jobs = [Job(url, estimated_bytes=estimates.get(url)) for url in urls]
+        with self._lock:
+            for job in jobs:
+                self._jobs[job.id] = job
+        self.save()
+        for job in jobs:
+            self._notify(job)
+        return jobs
+
+    def update(self, job_id: str, save: bool = True, **fields) -> Optional[Job]:
+        """Изменение полей задания (status, progress, message)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return None
+            for key, value in fields.items():
+                setattr(job, key, value)
+            if fields.get('status') in FINISHED_STATUSES:
+                job.finished_at = time.time()
+        if save:
+            self.save()
+        self._notify(job)
+        return job
+
+    def requeue(self, job_id: str) -> Optional[Job]:
+        """Повторная постановка завершённого/остановленного задания"""
+        return self.update(job_id, status=JOB_QUEUED, progress=0, message='', finished_at=None)
+
+    def remove(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job:
+            self.save()
+        return job
+
+    def clear_finished(self) -> int:
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job.is_finished]
+            for job_id in finished:
+                del self._jobs[job_id]
+        if finished:
+            self.save()
+        return len(finished)
+
+    # --- Диск ---
+
+    def load(self) -> int:
+        """
+        Загрузка очереди с диска. Задания, прерванные закрытием программы
+        (running/paused), снова ставятся в очередь.
+
+        Returns:
+            число незавершённых заданий
+        """
+        if not self.path or not self.path.exists():
+            return 0
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            logger.error(f"Не удалось загрузить очередь: {e}")
+            return 0
+
+        with self._lock:
+            self._jobs.clear()
+            for item in data.get('jobs', []):
+                try:
+                    job = Job.from_dict(item)
+                except (KeyError, TypeError):
+                    continue
+                if job.status in (JOB_RUNNING, JOB_PAUSED):
+                    job.status = JOB_QUEUED
+                elif job.status == JOB_CANCELLING:
+                    job.status = JOB_CANCELLED
+                self._jobs[job.id] = job
+            pending = sum(1 for job in self._jobs.values() if not job.is_finished)
+        logger.info(f"Очередь загружена: {len(self._jobs)} заданий, ожидают {pending}")
+        return pending
+
+    def save(self):
+        """Атомарная запись очереди на диск"""
+        if not self.path:
+            return
+        with self._lock:
+            data = {'jobs': [job.to_dict() for job in self._jobs.values()]}
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix('.tmp')
+                tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.error(f"Не удалось сохранить очередь: {e}")
+
+
+class JobScheduler:
+    """
+    Планировщик очереди: запускает задания, пока число работающих
+    меньше max_parallel. Сам потоков не создаёт - запуск делает start_fn
+    (в GUI это DownloadThread), а о завершении сообщают через job_finished.
+
+    Перед запуском задание проходит admit_fn (например, проверку места на диске):
+    пока работают другие задания, оно ждёт их завершения, иначе - не запускается.
+
+    Args:
+        queue: очередь заданий
+        start_fn: функция запуска задания, получает Job
+        max_parallel: максимум одновременных заданий
+        admit_fn: функция (Job) -> причина не запускать задание или None
+    """
+
+    def __init__(self, queue: JobQueue, start_fn: Callable[[Job], None], max_parallel: int = 2,
+                 admit_fn: Callable[[Job], Optional[str]] = None):
+        self.queue = queue
+        self.start_fn = start_fn
+        self.max_parallel = max(1, max_parallel)
+        self.admit_fn = admit_fn
+        self.paused = False
+        self._lock = threading.Lock()
+
+    def set_max_parallel(self, value: int):
+        self.max_parallel = max(1, int(value))
+        self.pump()
+
+    def running_count(self) -> int:
+        return (self.queue.count(JOB_RUNNING) + self.queue.count(JOB_PAUSED)
+                + self.queue.count(JOB_CANCELLING))
+
+    def pump(self) -> List[Job]:
+        """Запуск ожидающих заданий в пределах лимита"""
+        started = []
+        if self.paused:
+            return started
+        with self._lock:
+            while self.running_count() < self.max_parallel:
+                job = self.queue.next_queued()
+                if not job:
+                    break
+                reason = self.admit_fn(job) if self.admit_fn else None
+                if reason:
+                    if self.running_count():
+                        # Работающие задания освободят резерв - ждём их завершения
+                        logger.info(f"Задание {job.id} ждёт: {reason}")
+                        break
+                    logger.warning(f"Задание {job.id} не запущено: {reason}")
+                    self.queue.update(job.id, status=JOB_FAILED, message=reason)
+                    continue
+                self.queue.update(job.id, status=JOB_RUNNING, progress=0, message='')
+                try:
+                    self.start_fn(job)
+                except Exception as e:
+                    logger.exception(f"Не удалось запустить задание {job.id}")
+                    self.queue.update(job.id, status=JOB_FAILED, message=str(e))
+                    continue
+                started.append(job)
+        return started
+
+    def cancel_queued(self, job_id: str, message: str = '') -> bool:
+        """
+        Отмена ещё не запущенного задания (под блокировкой планировщика -
+        pump не запустит его одновременно)
+
+        Returns:
+            True если задание ждало в очереди и отменено
+        """
+        with self._lock:
+            job = self.queue.get(job_id)
+            if not job or job.status != JOB_QUEUED:
+                return False
+            self.queue.update(job_id, status=JOB_CANCELLED, message=message)
+            return True
+
+    def job_finished(self, job_id: str, success: bool, message: str = '',
+                     cancelled: bool = False):
+        """Задание завершилось - фиксируем статус и запускаем следующие"""
+        if cancelled:
+            status = JOB_CANCELLED
+        else:
+            status = JOB_DONE if success else JOB_FAILED
+        fields = {'status': status, 'message': message}
+        if success:
+            fields['progress'] = 100
+        self.queue.update(job_id, **fields)
+        self.pump()
@@ -43,7 +43,7 @@ class Localization:
         # Главное окно
         'app_title': 'Qobuz GUI Downloader',
         'url_label': 'Qobuz URL:',
-        'url_placeholder': 'Paste link to track, album, artist or playlist...',
+        'url_placeholder': 'Paste one or more links to tracks, albums, artists or playlists...',
         'download_button': 'Download',
         'downloading': 'Downloading...',
         'pause_button': '⏸ Pause',
@@ -53,6 +53,35 @@ class Localization:
         'logout_button': 'Logout',
         'exit_button': '✕ Exit',
         'progress_label': 'Progress:',
+        'throughput_status': '{speed} · ETA queue {queue_eta}',
+        'track_row_status': '%p% · {speed} · {eta}',
+        'add_file_button': 'From file...',
+        'open_links_file': 'Select a file with links',
+        'queue_label': 'Download queue:',
+        'queue_col_url': 'Link',
+        'queue_col_status': 'Status',
+        'queue_col_progress': 'Progress',
+        'queue_col_track': 'Track',
+        'queue_col_message': 'Result',
+        'remove_job_button': 'Remove',
+        'clear_finished_button': 'Clear finished',
+        'job_status_queued': 'Queued',
+        'job_status_running': 'Downloading',
+        'job_status_paused': 'Paused',
+        'job_status_done': 'Done',
+        'job_status_failed': 'Failed',
+        'job_status_cancelling': 'Cancelling',
+        'job_status_cancelled': 'Cancelled',
+        'jobs_added': '➕ Added to queue: {count}',
+        'api_started': '🌐 Control API: {url}',
+        'api_token_generated': '🔑 Control API token (api_token is not set): {token}',
+        'api_error': '⚠ Could not start control API: {error}',
+        'auth_in_progress': '⏳ Logging in to Qobuz...',
+        'auth_ready': '✓ Logged in: {label}',
+        'auth_pending_links': '⏳ Links will be queued after login: {count}',
+        'jobs_skipped': '⏭ Skipped (invalid, duplicate or already covered by an album): {count}',
+        'queue_restored': '📋 Restored from previous session: {count} jobs',
+        'queue_status': 'Running: {running} · queued: {queued} · done: {done} · failed: {failed}',
         'log_label': 'Process Log:',
         'status_ready': 'Ready',
         
@@ -195,7 +224,7 @@ class Localization:
         # Главное окно
         'app_title': 'Qobuz GUI Downloader',
         'url_label': 'URL Qobuz:',
-        'url_placeholder': 'Вставьте ссылку на трек, альбом, артиста или плейлист...',
+        'url_placeholder': 'Вставьте одну или несколько ссылок на треки, альбомы, артистов или плейлисты...',
         'download_button': 'Скачать',
         'downloading': 'Скачиваю...',
         'pause_button': '⏸ Пауза',
@@ -205,6 +234,35 @@ class Localization:
         'logout_button': 'Выход из аккаунта',
         'exit_button': '✕ Выход',
         'progress_label': 'Прогресс:',
+        'throughput_status': '{speed} · осталось: очередь {queue_eta}',
+        'track_row_status': '%p% · {speed} · {eta}',
+        'add_file_button': 'Из файла...',
+        'open_links_file': 'Выберите файл со ссылками',
+        'queue_label': 'Очередь загрузок:',
+        'queue_col_url': 'Ссылка',
+        'queue_col_status': 'Статус',
+        'queue_col_progress': 'Прогресс',
+        'queue_col_track': 'Трек',
+        'queue_col_message': 'Результат',
+        'remove_job_button': 'Удалить',
+        'clear_finished_button': 'Очистить завершённые',
+        'job_status_queued': 'В очереди',
+        'job_status_running': 'Скачивается',
+        'job_status_paused': 'Пауза',
+        'job_status_done': 'Готово',
+        'job_status_failed': 'Ошибка',
+        'job_status_cancelling': 'Отменяется',
+        'job_status_cancelled': 'Отменено',
+        'jobs_added': '➕ Добавлено в очередь: {count}',
+        'api_started': '🌐 API управления: {url}',
+        'api_token_generated': '🔑 Токен API управления (api_token не задан): {token}',
+        'api_error': '⚠ Не удалось запустить API управления: {error}',
+        'auth_in_progress': '⏳ Авторизация в Qobuz...',
+        'auth_ready': '✓ Авторизован: {label}',
+        'auth_pending_links': '⏳ Ссылки будут поставлены в очередь после авторизации: {count}',
+        'jobs_skipped': '⏭ Пропущено (не ссылка Qobuz, повтор или трек из альбома в очереди): {count}',
+        'queue_restored': '📋 Восстановлено из прошлой сессии: {count} заданий',
+        'queue_status': 'Скачивается: {running} · в очереди: {queued} · готово: {done} · ошибок: {failed}',
         'log_label': 'Лог процесса:',
         'status_ready': 'Готов к работе',
         
@@ -318,6 +376,7 @@ class Localization:
     def __init__(self):
         """Инициализация с автоопределением языка системы"""
         self.current_lang = self._detect_system_language()
+        self.strings = self.RU if self.current_lang == 'ru' else self.EN
         logger.info(f"✓ Локализация инициализирована: {self.current_lang}")
     
     def _detect_system_language(self) -> str:
@@ -338,10 +397,12 @@ class Localization:
         """Установка языка вручную"""
         if lang in ['en', 'ru']:
             self.current_lang = lang
+            self.strings = self.RU if lang == 'ru' else self.EN
             logger.info(f"✓ Язык изменен на: {lang}")
         else:
             logger.warning(f"Неизвестный язык: {lang}, используется английский")
             self.current_lang = 'en'
+            self.strings = self.EN
     
     def get(self, key: str, **kwargs) -> str:
         """
@@ -354,11 +415,8 @@ class Localization:
         Returns:
             Локализованная строка
         """
-        # Выбираем словарь языка
-        lang_dict = self.RU if self.current_lang == 'ru' else self.EN
-        
-        # Получаем строку
-        text = lang_dict.get(key, key)
+        # Получаем строку (словарь языка выбран при инициализации)
+        text = self.strings.get(key, key)
         
         # Форматируем если есть параметры
         if kwargs:
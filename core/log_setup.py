@@ -0,0 +1,154 @@
+"""
+Модуль настройки логирования
+Рабочие потоки только кладут записи в очередь (QueueHandler) - это микросекунды,
+запись в файл и консоль делает фоновый поток QueueListener.
+Файл ротируется по размеру или по времени, по желанию - в формате JSON Lines.
+"""
+import atexit
+import json
+import logging
+import queue
+import sys
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from pathlib import Path
+from typing import Dict, Optional
+
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DEFAULT_LOG_FILE = 'qobuz_downloader.log'
+DEFAULT_MAX_MB = 10
+DEFAULT_BACKUP_COUNT = 5
+
+# Атрибуты LogRecord, которые не считаются дополнительными полями (extra=...)
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON (поля extra=... попадают в объект как есть)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exception'] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(QueueHandler):
+    """
+    QueueHandler, сохраняющий исключение для форматтеров слушателя:
+    стандартный вклеивает трассировку в текст сообщения, и JSON теряет её как поле
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def create_file_handler(path: Path, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024,
+                        backup_count: int = DEFAULT_BACKUP_COUNT, when: str = None,
+                        json_format: bool = False) -> logging.Handler:
+    """
+    Файловый обработчик с ротацией.
+
+    Args:
+        when: ротация по времени ('midnight', 'H', 'D', 'W0'...); пусто - по размеру
+        max_bytes: размер файла для ротации по размеру (0 - без ротации)
+        backup_count: сколько старых файлов хранить
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if when:
+        handler = TimedRotatingFileHandler(path, when=when, backupCount=backup_count,
+                                           encoding='utf-8', delay=True)
+    else:
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                      encoding='utf-8', delay=True)
+    handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+def setup_logging(level=logging.INFO, log_file: Optional[str] = DEFAULT_LOG_FILE,
+                  max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024,
+                  backup_count: int = DEFAULT_BACKUP_COUNT, when: str = None,
+                  json_format: bool = False, console: bool = True,
+                  console_stream=None) -> QueueListener:
+    """
+    Настройка корневого логгера: очередь + фоновый поток записи.
+    Повторный вызов заменяет предыдущую настройку.
+
+    Args:
+        level: уровень корневого логгера
+        log_file: файл лога (None - без файла)
+        max_bytes, backup_count, when: ротация (см. create_file_handler)
+        json_format: файл в формате JSON Lines
+        console: дублировать в консоль (текстом)
+        console_stream: поток консоли (по умолчанию stderr)
+    """
+    global _listener
+    shutdown_logging()
+
+    handlers = []
+    if log_file:
+        handlers.append(create_file_handler(log_file, max_bytes, backup_count, when, json_format))
+    if console:
+        stream_handler = logging.StreamHandler(console_stream or sys.stderr)
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers.append(stream_handler)
+
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(level)
+    return _listener
+
+
+def setup_logging_from_settings(settings: Dict, level=logging.INFO, **kwargs) -> QueueListener:
+    """Настройка логирования по настройкам приложения (log_*)"""
+    return setup_logging(
+        level=level,
+        log_file=settings.get('log_file', DEFAULT_LOG_FILE) or None,
+        max_bytes=int(settings.get('log_max_mb', DEFAULT_MAX_MB) * 1024 * 1024),
+        backup_count=settings.get('log_backup_count', DEFAULT_BACKUP_COUNT),
+        when=settings.get('log_rotate_when') or None,
+        json_format=settings.get('log_json', False),
+        **kwargs
+    )
+
+
+def shutdown_logging():
+    """Остановка фонового потока: оставшиеся в очереди записи дописываются"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,236 @@
+"""
+Модуль для разбора LRC-текстов
+Один проход по тексту → компактная структура → все форматы (SRT, TXT, SYLT, LRC)
+"""
+import re
+from array import array
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+
+# Таймкод строки: [mm:ss], [mm:ss.x], [mm:ss.xx], [mm:ss.xxx] (минуты могут быть > 99)
+_TIME_TAG = re.compile(r"\[(\d+):(\d{1,2})(?:[.:](\d{1,3}))?\]")
+# Караоке-таймкод слова (Enhanced LRC): <mm:ss.xx>
+_WORD_TAG = re.compile(r"<(\d+):(\d{1,2})(?:[.:](\d{1,3}))?>")
+# Служебные теги: [ar:...], [ti:...], [offset:...] и т.д.
+_META_TAG = re.compile(r"^\[([a-zA-Z#]+):(.*)\]$")
+
+# Заглушка для строк без текста (инструментальные паузы)
+EMPTY_LINE = "♪"
+
+
+def _to_ms(mm: str, ss: str, frac: Optional[str]) -> int:
+    """Перевод таймкода в миллисекунды (дробная часть - доли секунды, а не сотые)"""
+    ms = 0
+    if frac:
+        # .5 → 500 мс, .50 → 500 мс, .500 → 500 мс
+        ms = int(frac.ljust(3, '0'))
+    return (int(mm) * 60 + int(ss)) * 1000 + ms
+
+
+def _fmt_lrc_time(ms: int) -> str:
+    """Форматирование таймкода в виде mm:ss.xx (или mm:ss.xxx, если нужна точность)"""
+    if ms < 0:
+        ms = 0
+    mm, rest = divmod(ms, 60000)
+    ss, frac = divmod(rest, 1000)
+    if frac % 10:
+        return f"{mm:02d}:{ss:02d}.{frac:03d}"
+    return f"{mm:02d}:{ss:02d}.{frac // 10:02d}"
+
+
+def _fmt_srt_time(ms: int) -> str:
+    """Форматирование таймкода SubRip: hh:mm:ss,mmm"""
+    if ms < 0:
+        ms = 0
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+
+class ParsedLyrics:
+    """
+    Результат разбора LRC.
+
+    Attributes:
+        times: таймкоды строк в мс, отсортированы по возрастанию
+        line_ids: индекс строки в таблице lines для каждого таймкода
+        lines: таблица уникальных строк текста (в порядке появления в исходнике)
+        words: караоке-таймкоды для каждой строки таблицы lines - кортеж пар
+               (мс, фрагмент) или None, если таймкодов слов нет. Фрагмент - текст
+               до следующего тега как в исходнике (слог, слово с пробелом, пустой
+               фрагмент у завершающего тега)
+        leads: текст перед первым таймкодом слова для каждой строки таблицы lines
+        plain_lines: строки для обычного текста в исходном порядке
+        tags: служебные теги ([ar:], [ti:], [offset:] ...)
+
+    Объект неизменяемый и может разделяться между потоками.
+    """
+
+    __slots__ = ('times', 'line_ids', 'lines', 'words', 'leads', 'plain_lines', 'tags')
+
+    def __init__(self, times: array, line_ids: array, lines: Tuple[str, ...],
+                 words: Tuple[Optional[Tuple[Tuple[int, str], ...]], ...],
+                 leads: Tuple[str, ...],
+                 plain_lines: Tuple[str, ...], tags: Tuple[Tuple[str, str], ...]):
+        self.times = times
+        self.line_ids = line_ids
+        self.lines = lines
+        self.words = words
+        self.leads = leads
+        self.plain_lines = plain_lines
+        self.tags = tags
+
+    def __bool__(self) -> bool:
+        return bool(self.times) or bool(self.plain_lines)
+
+    @property
+    def is_synced(self) -> bool:
+        """Есть ли в тексте таймкоды"""
+        return len(self.times) > 0
+
+    def entries(self) -> List[Tuple[int, str]]:
+        """Пары (мс, текст) в хронологическом порядке"""
+        lines = self.lines
+        return [(ms, lines[i]) for ms, i in zip(self.times, self.line_ids)]
+
+    def to_plain(self) -> str:
+        """Обычный текст без таймкодов"""
+        return "\n".join(self.plain_lines)
+
+    def to_sylt(self) -> List[Tuple[str, int]]:
+        """Элементы для ID3 SYLT: (текст, мс)"""
+        lines = self.lines
+        return [(lines[i] or EMPTY_LINE, ms) for ms, i in zip(self.times, self.line_ids)]
+
+    def to_srt(self) -> str:
+        """SubRip (.srt) для VLC"""
+        count = len(self.times)
+        if not count:
+            return ""
+
+        times = self.times
+        lines = self.lines
+        srt_lines = []
+        for idx in range(count):
+            start_ms = times[idx]
+            if idx + 1 < count:
+                # Конец - на 0.5 секунды раньше следующего старта
+                end_ms = max(start_ms + 500, times[idx + 1] - 500)
+            else:
+                end_ms = start_ms + 4000
+
+            srt_lines.append(str(idx + 1))
+            srt_lines.append(f"{_fmt_srt_time(start_ms)} --> {_fmt_srt_time(end_ms)}")
+            srt_lines.append(lines[self.line_ids[idx]] or EMPTY_LINE)
+            srt_lines.append("")
+
+        return "\n".join(srt_lines)
+
+    def to_lrc(self) -> str:
+        """
+        Нормализованный LRC для встраивания в теги.
+        Смещение [offset:] уже применено к таймкодам, поэтому сам тег не выводится.
+        Караоке-строки выводятся фрагментами исходника: текст перед первым тегом
+        и пробелы между слогами сохраняются.
+        """
+        out = [f"[{key}:{value}]" for key, value in self.tags if key != 'offset']
+        for ms, i in zip(self.times, self.line_ids):
+            words = self.words[i]
+            if words:
+                text = self.leads[i] + "".join(f"<{_fmt_lrc_time(w_ms)}>{part}" for w_ms, part in words)
+            else:
+                text = self.lines[i]
+            out.append(f"[{_fmt_lrc_time(ms)}]{text}")
+        return "\n".join(out)
+
+
+def _split_words(text: str) -> Tuple[str, str, Optional[Tuple[Tuple[int, str], ...]]]:
+    """
+    Разделение строки с караоке-таймкодами на чистый текст, текст перед
+    первым тегом и пары (мс, фрагмент). Фрагменты не обрезаются: слоги
+    одного слова склеиваются без пробела, как в исходнике.
+    """
+    parts = _WORD_TAG.split(text)
+    if len(parts) == 1:
+        return text.strip(), "", None
+
+    # parts: [до первого тега, mm, ss, frac, фрагмент, mm, ss, frac, фрагмент, ...]
+    lead = parts[0]
+    words = tuple(
+        (_to_ms(parts[pos], parts[pos + 1], parts[pos + 2]), parts[pos + 3])
+        for pos in range(1, len(parts), 4)
+    )
+    clean = (lead + "".join(part for _, part in words)).strip()
+    return clean, lead, words
+
+
+@lru_cache(maxsize=32)
+def parse_lrc(lyrics_lrc: str) -> ParsedLyrics:
+    """
+    Разбор LRC за один проход.
+
+    Результат кешируется, поэтому повторные вызовы для одного текста
+    (SRT, TXT, SYLT одного трека) не разбирают его заново.
+    """
+    raw_entries = []  # (мс, порядковый номер, индекс строки)
+    lines: List[str] = []
+    words: List[Optional[Tuple[Tuple[int, str], ...]]] = []
+    leads: List[str] = []
+    line_table = {}
+    plain_lines: List[str] = []
+    tags: List[Tuple[str, str]] = []
+    offset = 0
+
+    for raw_line in (lyrics_lrc or "").splitlines():
+        raw_line = raw_line.strip()
+        if not raw_line:
+            continue
+
+        times = _TIME_TAG.findall(raw_line)
+        if not times:
+            meta = _META_TAG.match(raw_line)
+            if meta:
+                key, value = meta.group(1).lower(), meta.group(2).strip()
+                tags.append((key, value))
+                if key == 'offset':
+                    try:
+                        offset = int(value)
+                    except ValueError:
+                        pass
+                continue
+            # Строка без таймкодов - остаётся только в обычном тексте
+            text, _, _ = _split_words(raw_line)
+            if text:
+                plain_lines.append(text)
+            continue
+
+        text, lead, line_words = _split_words(_TIME_TAG.sub("", raw_line))
+        if text:
+            plain_lines.append(text)
+
+        key = (text, lead, line_words)
+        line_id = line_table.get(key)
+        if line_id is None:
+            line_id = line_table[key] = len(lines)
+            lines.append(text)
+            words.append(line_words)
+            leads.append(lead)
+
+        for mm, ss, frac in times:
+            raw_entries.append((_to_ms(mm, ss, frac), len(raw_entries), line_id))
+
+    raw_entries.sort()
+
+    # Положительный [offset:] означает, что текст должен появляться раньше
+    times_arr = array('l', (max(0, ms - offset) for ms, _, _ in raw_entries))
+    ids_arr = array('l', (line_id for _, _, line_id in raw_entries))
+    if offset:
+        words = [
+            tuple((max(0, ms - offset), part) for ms, part in line_words) if line_words else None
+            for line_words in words
+        ]
+
+    return ParsedLyrics(times_arr, ids_arr, tuple(lines), tuple(words), tuple(leads),
+                        tuple(plain_lines), tuple(tags))
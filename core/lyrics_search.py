@@ -8,16 +8,31 @@ import requests
 import logging
 from typing import Optional, Tuple, List, Dict
 
-try:
-    from rapidfuzz import fuzz
-    FUZZ_AVAILABLE = True
-except ImportError:
-    FUZZ_AVAILABLE = False
-    logging.warning("Библиотека rapidfuzz не установлена. Сравнение строк будет менее точным. Рекомендуется: pip install rapidfuzz")
-
+from core.lrc import parse_lrc
+from core.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# Одинаковые одновременные поиски (один трек в нескольких заданиях) выполняются один раз
+_search_flight = SingleFlight()
+
+# rapidfuzz загружается при первом сравнении строк (None - ещё не загружали)
+FUZZ_AVAILABLE = None
+fuzz = None
+
+
+def _load_fuzz() -> bool:
+    """Импорт rapidfuzz при первом использовании"""
+    global FUZZ_AVAILABLE, fuzz
+    if FUZZ_AVAILABLE is None:
+        try:
+            from rapidfuzz import fuzz
+            FUZZ_AVAILABLE = True
+        except ImportError:
+            FUZZ_AVAILABLE = False
+            logger.warning("Библиотека rapidfuzz не установлена. Сравнение строк будет менее точным. Рекомендуется: pip install rapidfuzz")
+    return FUZZ_AVAILABLE
+
 
 class LyricsSearcher:
     """
@@ -25,6 +40,9 @@ class LyricsSearcher:
     и строгой фильтрацией для предотвращения ложных срабатываний.
     """
     
+    # Базовый адрес LRCLib API (переопределяется для локального стенда)
+    API_URL = "https://lrclib.net/api"
+    
     def __init__(self):
         self.session = requests.Session()
         self.session.headers.update({
@@ -69,6 +87,16 @@ class LyricsSearcher:
         return clean_title.strip().lower()
     
     def search_lyrics(self, artist: str, title: str, album: str = None, duration: int = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Поиск текста; одинаковые одновременные запросы объединяются
+        
+        Returns:
+            Tuple[plain_text, lrc_text] - обычный текст и LRC (если найден synced)
+        """
+        key = (self.API_URL, artist, title, album, duration)
+        return _search_flight.do(key, self._search_lyrics, artist, title, album, duration)
+    
+    def _search_lyrics(self, artist: str, title: str, album: str = None, duration: int = None) -> Tuple[Optional[str], Optional[str]]:
         """
         Основной метод поиска, реализующий алгоритм "Поиск → Фильтрация → Выбор лучшего".
         
@@ -87,7 +115,7 @@ class LyricsSearcher:
         
         # --- Шаг 1: Получаем кандидатов с помощью /api/search ---
         try:
-            url = "https://lrclib.net/api/search"
+            url = f"{self.API_URL}/search"
             params = {'track_name': title, 'artist_name': artist}
             if album:
                 params['album_name'] = album
@@ -170,7 +198,7 @@ class LyricsSearcher:
             item_artist = item.get('artistName', '')
             
             # Сравниваем исполнителей
-            if FUZZ_AVAILABLE:
+            if _load_fuzz():
                 artist_score = fuzz.ratio(target_artist.lower(), item_artist.lower())
                 if artist_score < MIN_ARTIST_SCORE:
                     logger.debug(f"Отброшен (артист): '{item_artist}' vs '{target_artist}' (схожесть {artist_score:.0f}%)")
@@ -218,9 +246,7 @@ class LyricsSearcher:
         """Преобразование LRC в обычный текст (удаление таймкодов)"""
         if not lyrics_lrc:
             return ""
-        text_no_timestamps = re.sub(r'\[\d{2}:\d{2}\.\d{2,3}\]', '', lyrics_lrc)
-        text_no_karaoke = re.sub(r'<\d{2}:\d{2}\.\d{2,3}>', '', text_no_timestamps)
-        return "\n".join(line.strip() for line in text_no_karaoke.splitlines() if line.strip())
+        return parse_lrc(lyrics_lrc).to_plain()
     
     def lrc_to_srt(self, lyrics_lrc: str) -> str:
         """
@@ -232,57 +258,6 @@ class LyricsSearcher:
         Returns:
             текст в формате SRT
         """
-        entries = []
-        time_pattern = re.compile(r"\[(\d{1,2}):(\d{2})(?:[\.:](\d{1,2}))?\]")
-        
-        for raw_line in lyrics_lrc.splitlines():
-            if not raw_line.strip():
-                continue
-            times = list(time_pattern.finditer(raw_line))
-            if not times:
-                continue
-            
-            # Текст без таймкодов
-            text = time_pattern.sub("", raw_line).strip()
-            if not text:
-                text = "♪"
-            
-            for m in times:
-                mm = int(m.group(1) or 0)
-                ss = int(m.group(2) or 0)
-                ff = int(m.group(3) or 0)
-                # ff трактуем как сотые доли секунды
-                ms = ff * 10 if ff < 10 else ff if ff < 100 else 0
-                total_ms = (mm * 60 + ss) * 1000 + ms
-                entries.append((total_ms, text))
-        
-        if not entries:
+        if not lyrics_lrc:
             return ""
-        
-        entries.sort(key=lambda x: x[0])
-        
-        def fmt_srt_time(ms: int) -> str:
-            if ms < 0:
-                ms = 0
-            h = ms // 3600000
-            ms %= 3600000
-            m = ms // 60000
-            ms %= 60000
-            s = ms // 1000
-            ms %= 1000
-            return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
-        
-        srt_lines = []
-        for idx, (start_ms, text) in enumerate(entries, start=1):
-            if idx < len(entries):
-                # Конец - на 0.5 секунды раньше следующего старта
-                end_ms = max(start_ms + 500, entries[idx][0] - 500)
-            else:
-                end_ms = start_ms + 4000
-            
-            srt_lines.append(str(idx))
-            srt_lines.append(f"{fmt_srt_time(start_ms)} --> {fmt_srt_time(end_ms)}")
-            srt_lines.append(text)
-            srt_lines.append("")
-        
-        return "\n".join(srt_lines)
+        return parse_lrc(lyrics_lrc).to_srt()
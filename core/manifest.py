@@ -0,0 +1,164 @@
+"""
+Модуль манифеста скачанных файлов
+JSON-файл в папке загрузок: что скачано, в каком формате и прошло ли проверку.
+Повторные синхронизации пропускают файлы, которые уже проверены и не менялись.
+Индекс по ISRC находит уже скачанные копии записи (сборники, deluxe, плейлисты).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = '.qobuz_manifest.json'
+MANIFEST_VERSION = 1
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+def get_manifest(root: Path) -> 'Manifest':
+    """
+    Общий манифест папки загрузок: параллельные задания пишут
+    в один объект, а не перезаписывают файл друг друга.
+    """
+    key = str(Path(root).resolve())
+    with _manifests_lock:
+        manifest = _manifests.get(key)
+        if manifest is None:
+            manifest = _manifests[key] = Manifest(Path(root))
+        return manifest
+
+
+class Manifest:
+    """
+    Манифест папки загрузок.
+
+    Ключ записи - путь файла относительно корня. Запись считается актуальной,
+    пока размер и время изменения файла совпадают с сохранёнными.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.path = self.root / MANIFEST_NAME
+        self._lock = threading.Lock()
+        self._entries = None
+        self._isrc_index = None  # ISRC -> ключи записей
+        self._dirty = False
+
+    def _key(self, file_path: Path) -> str:
+        file_path = Path(file_path)
+        try:
+            return file_path.resolve().relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return file_path.resolve().as_posix()
+
+    def _load(self) -> Dict:
+        if self._entries is None:
+            self._entries = {}
+            if self.path.exists():
+                try:
+                    data = json.loads(self.path.read_text(encoding='utf-8'))
+                    self._entries = data.get('files', {})
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Манифест повреждён, создаём заново: {e}")
+            self._isrc_index = {}
+            for key, entry in self._entries.items():
+                self._index(key, entry)
+        return self._entries
+    
+    def _index(self, key: str, entry: Dict):
+        isrc = entry.get('isrc')
+        if isrc:
+            self._isrc_index.setdefault(isrc, set()).add(key)
+    
+    def _unindex(self, key: str, entry: Dict):
+        keys = self._isrc_index.get(entry.get('isrc'))
+        if keys:
+            keys.discard(key)
+
+    def get(self, file_path: Path) -> Optional[Dict]:
+        with self._lock:
+            return self._load().get(self._key(file_path))
+
+    def is_verified(self, file_path: Path) -> bool:
+        """Файл проверен и с тех пор не менялся"""
+        entry = self.get(file_path)
+        if not entry or not entry.get('verified'):
+            return False
+        try:
+            stat = Path(file_path).stat()
+        except OSError:
+            return False
+        return entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns
+    
+    def find_isrc(self, isrc: str) -> List[Tuple[Path, Dict]]:
+        """
+        Файлы с записью isrc, которые с момента записи не менялись
+        (проверенные - первыми)
+        """
+        with self._lock:
+            self._load()
+            found = [(key, dict(self._entries[key])) for key in self._isrc_index.get(isrc, ())]
+        result = []
+        for key, entry in found:
+            path = self.root / key
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+                result.append((path, entry))
+        result.sort(key=lambda item: not item[1].get('verified'))
+        return result
+
+    def record(self, file_path: Path, **fields):
+        """Добавление/обновление записи (размер и mtime берутся с диска)"""
+        file_path = Path(file_path)
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return
+        with self._lock:
+            entries = self._load()
+            key = self._key(file_path)
+            entry = entries.setdefault(key, {})
+            self._unindex(key, entry)
+            entry.update(fields)
+            self._index(key, entry)
+            entry['size'] = stat.st_size
+            entry['mtime_ns'] = stat.st_mtime_ns
+            entry['updated_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+            self._dirty = True
+
+    def remove(self, file_path: Path):
+        with self._lock:
+            key = self._key(file_path)
+            entry = self._load().pop(key, None)
+            if entry is not None:
+                self._unindex(key, entry)
+                self._dirty = True
+
+    def entries(self) -> Dict[str, Dict]:
+        with self._lock:
+            return dict(self._load())
+
+    def save(self):
+        """Атомарная запись на диск (через временный файл)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {'version': MANIFEST_VERSION, 'files': self._entries}
+            try:
+                self.root.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix('.tmp')
+                tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding='utf-8')
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                logger.warning(f"Не удалось сохранить манифест: {e}")
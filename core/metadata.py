@@ -2,24 +2,37 @@
 Модуль для встраивания метаданных в аудиофайлы
 """
 import logging
-import re
 from pathlib import Path
 from typing import Dict, Optional, List, Tuple
 
-try:
-    from mutagen.flac import FLAC, Picture
-    from mutagen.mp3 import MP3
-    from mutagen.id3 import (ID3, APIC, TIT2, TPE1, TALB, TDRC, TCON, TRCK, 
-                             TPE2, SYLT, USLT, TSRC, TCOP, TPUB, COMM)
-    from mutagen.id3._util import ID3NoHeaderError
-    import mutagen.flac
-    METADATA_AVAILABLE = True
-except ImportError:
-    METADATA_AVAILABLE = False
-    logging.warning("Библиотеки для метаданных не установлены. Установите: pip install mutagen")
+from core.lrc import parse_lrc
 
 logger = logging.getLogger(__name__)
 
+# mutagen загружается при первой записи тегов, а не при импорте модуля:
+# окно входа и консольный режим не платят за него при запуске.
+# None - ещё не загружали, True/False - результат загрузки
+METADATA_AVAILABLE = None
+
+
+def _load_mutagen() -> bool:
+    """Импорт классов mutagen в глобальные имена модуля (один раз)"""
+    global METADATA_AVAILABLE, mutagen, FLAC, Picture, MP3, ID3, APIC, TIT2, TPE1, TALB, \
+        TDRC, TCON, TRCK, TPE2, SYLT, USLT, TSRC, TCOP, TPUB, COMM, ID3NoHeaderError
+    if METADATA_AVAILABLE is None:
+        try:
+            from mutagen.flac import FLAC, Picture
+            from mutagen.mp3 import MP3
+            from mutagen.id3 import (ID3, APIC, TIT2, TPE1, TALB, TDRC, TCON, TRCK, 
+                                     TPE2, SYLT, USLT, TSRC, TCOP, TPUB, COMM)
+            from mutagen.id3._util import ID3NoHeaderError
+            import mutagen.flac
+            METADATA_AVAILABLE = True
+        except ImportError:
+            METADATA_AVAILABLE = False
+            logger.warning("Библиотеки для метаданных не установлены. Установите: pip install mutagen")
+    return METADATA_AVAILABLE
+
 
 class MetadataWriter:
     """Класс для записи метаданных в аудиофайлы"""
@@ -34,7 +47,8 @@ class MetadataWriter:
     def embed_metadata(self, file_path: Path, track_meta: Dict, 
                        lyrics_plain: Optional[str] = None,
                        lyrics_lrc: Optional[str] = None,
-                       cover_data: Optional[bytes] = None) -> bool:
+                       cover_data: Optional[bytes] = None,
+                       file_ext: Optional[str] = None) -> bool:
         """
         Встраивание метаданных в аудиофайл
         
@@ -44,15 +58,16 @@ class MetadataWriter:
             lyrics_plain: обычный текст песни
             lyrics_lrc: синхронизированный текст (LRC)
             cover_data: данные обложки (JPEG)
+            file_ext: формат файла ('.flac'/'.mp3'), если файл ещё под временным именем
         
         Returns:
             True если успешно
         """
-        if not METADATA_AVAILABLE:
+        if not _load_mutagen():
             logger.error("Библиотеки для метаданных недоступны")
             return False
         
-        file_ext = file_path.suffix.lower()
+        file_ext = (file_ext or file_path.suffix).lower()
         
         if file_ext == '.flac':
             return self._embed_flac(file_path, track_meta, lyrics_plain, lyrics_lrc, cover_data)
@@ -128,7 +143,7 @@ class MetadataWriter:
             if self.settings.get('lyrics_enable', True):
                 # Предпочитаем LRC, если доступен
                 if lyrics_lrc:
-                    audio['LYRICS'] = lyrics_lrc
+                    audio['LYRICS'] = parse_lrc(lyrics_lrc).to_lrc() or lyrics_lrc
                     logger.info("✓ LRC текст встроен в FLAC")
                 elif lyrics_plain:
                     audio['LYRICS'] = lyrics_plain
@@ -227,14 +242,17 @@ class MetadataWriter:
             # Тексты песен
             if self.settings.get('lyrics_enable', True):
                 if lyrics_lrc:
+                    # Разбор LRC кешируется - SYLT и USLT строятся из одной структуры
+                    parsed = parse_lrc(lyrics_lrc)
+                    
                     # Встраиваем SYLT (синхронизированный текст)
-                    sylt_items = self._parse_lrc_for_sylt(lyrics_lrc)
+                    sylt_items = parsed.to_sylt()
                     if sylt_items:
                         audio.tags.add(SYLT(encoding=3, lang='eng', format=2, type=1, desc='', text=sylt_items))
                         logger.info("✓ Синхронизированный текст (SYLT) встроен в MP3")
                     
                     # Дублируем как USLT для видимости
-                    audio.tags.add(USLT(encoding=3, lang='eng', desc='LRC', text=lyrics_lrc))
+                    audio.tags.add(USLT(encoding=3, lang='eng', desc='LRC', text=parsed.to_lrc() or lyrics_lrc))
                     logger.info("✓ LRC текст встроен в MP3 (USLT)")
                     
                 elif lyrics_plain:
@@ -262,24 +280,4 @@ class MetadataWriter:
     
     def _parse_lrc_for_sylt(self, lyrics_lrc: str) -> List[Tuple[str, int]]:
         """Парсинг LRC для формата SYLT"""
-        sylt_items = []
-        time_pattern = re.compile(r"\[(\d{1,2}):(\d{2})(?:[\.:](\d{1,2}))?\]")
-        
-        for raw_line in lyrics_lrc.splitlines():
-            if not raw_line.strip():
-                continue
-            times = list(time_pattern.finditer(raw_line))
-            if not times:
-                continue
-            
-            text = time_pattern.sub("", raw_line).strip() or "♪"
-            
-            for m in times:
-                mm = int(m.group(1) or 0)
-                ss = int(m.group(2) or 0)
-                ff = int(m.group(3) or 0)
-                ms = ff * 10 if ff < 10 else ff if ff < 100 else 0
-                total_ms = (mm * 60 + ss) * 1000 + ms
-                sylt_items.append((text, total_ms))
-        
-        return sylt_items
+        return parse_lrc(lyrics_lrc).to_sylt()
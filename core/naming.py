@@ -0,0 +1,164 @@
+"""
+Модуль шаблонов именования папок и файлов
+Шаблон (folder_template/file_template) разбирается один раз при изменении
+настроек: проверяются переменные и форматы, строится план - чередование
+текста и функций получения значений. Имя трека собирается по плану без
+повторного разбора и без словаря всех переменных. Поддерживаются записи
+{artist} и %artist% (как в подсказке окна настроек).
+"""
+import re
+import string
+from functools import lru_cache
+from typing import Callable, Dict, Hashable, List, Tuple
+
+
+# Недопустимые в именах файлов символы (Windows) и управляющие символы - на "_"
+_SANITIZE_TABLE = str.maketrans({char: '_' for char in '<>:"/\\|?*' + ''.join(map(chr, range(32)))})
+
+_PERCENT_FIELD = re.compile(r'%(\w+)%')
+
+
+def sanitize_filename(filename: str) -> str:
+    """Очистка имени файла от недопустимых символов"""
+    # Удаляем точки в конце (Windows не любит)
+    return filename.translate(_SANITIZE_TABLE).rstrip('.')
+
+
+class TemplateError(ValueError):
+    """Ошибка в шаблоне именования"""
+
+
+def _year(album: Dict) -> str:
+    return (album.get('release_date_original') or '')[:4]
+
+
+def _track_title(track: Dict) -> str:
+    # Полное название трека (с version если есть)
+    title = track.get('title', 'Unknown')
+    version = track.get('version')
+    return f"{title} ({version})" if version else title
+
+
+# Переменные шаблона папки альбома: имя -> функция(album_meta)
+FOLDER_FIELDS: Dict[str, Callable] = {
+    'artist': lambda album: (album.get('artist') or {}).get('name', 'Unknown Artist'),
+    'album': lambda album: album.get('title', 'Unknown Album'),
+    'year': _year,
+    'genre': lambda album: (album.get('genre') or {}).get('name', ''),
+    'label': lambda album: (album.get('label') or {}).get('name', ''),
+    'upc': lambda album: album.get('upc', ''),
+}
+
+# Переменные шаблона имени файла: имя -> функция(track_meta, album_meta)
+FILE_FIELDS: Dict[str, Callable] = {
+    'artist': lambda track, album: ((track.get('performer') or {}).get('name')
+                                    or (album.get('artist') or {}).get('name') or 'Unknown'),
+    'title': lambda track, album: _track_title(track),
+    'tracknumber': lambda track, album: str(track.get('track_number') or 0).zfill(2),
+    'album': lambda track, album: album.get('title', ''),
+    'year': lambda track, album: _year(album),
+    'genre': lambda track, album: (album.get('genre') or {}).get('name', ''),
+    'label': lambda track, album: (album.get('label') or {}).get('name', ''),
+    'isrc': lambda track, album: track.get('isrc', ''),
+    'upc': lambda track, album: album.get('upc', ''),
+}
+
+DEFAULT_FOLDER_TEMPLATE = '{artist} - {album} ({year})'
+DEFAULT_FILE_TEMPLATE = '{tracknumber}. {artist} - {title}'
+
+
+class NameTemplate:
+    """
+    Разобранный шаблон.
+
+    План - список (текст, функция значения или None, формат, преобразование).
+    Пустое значение переменной даёт пустую строку, результат очищается
+    sanitize_filename.
+
+    Raises:
+        TemplateError: неизвестная переменная, неверный формат или синтаксис
+    """
+
+    def __init__(self, template: str, fields: Dict[str, Callable]):
+        self.template = template
+        self.plan: List[Tuple] = []
+        self.fields = set()
+
+        if not template or not template.strip():
+            raise TemplateError("Пустой шаблон")
+        text = _PERCENT_FIELD.sub(
+            lambda m: '{%s}' % m.group(1) if m.group(1) in fields else m.group(0), template
+        )
+        try:
+            parsed = list(string.Formatter().parse(text))
+        except ValueError as e:
+            raise TemplateError(f"Ошибка в шаблоне «{template}»: {e}")
+
+        for literal, field, spec, conversion in parsed:
+            if field is None:
+                self.plan.append((literal, None, '', None))
+                continue
+            if field not in fields:
+                raise TemplateError(
+                    f"Неизвестная переменная {{{field}}} в шаблоне «{template}». "
+                    f"Доступны: {', '.join(fields)}"
+                )
+            if '{' in spec:
+                raise TemplateError(f"Вложенные поля в формате {{{field}:{spec}}} не поддерживаются")
+            try:
+                format('', spec)
+            except ValueError as e:
+                raise TemplateError(f"Неверный формат {{{field}:{spec}}}: {e}")
+            self.plan.append((literal, fields[field], spec, conversion))
+            self.fields.add(field)
+
+    def render(self, *meta) -> str:
+        """Имя по метаданным (album_meta для папки, track_meta и album_meta для файла)"""
+        parts = []
+        for literal, getter, spec, conversion in self.plan:
+            if literal:
+                parts.append(literal)
+            if getter is None:
+                continue
+            value = getter(*meta)
+            if conversion == 'r':
+                value = repr(value)
+            elif conversion == 'a':
+                value = ascii(value)
+            if not value:
+                continue
+            parts.append(format(value, spec) if spec else str(value))
+        return sanitize_filename(''.join(parts))
+
+
+@lru_cache(maxsize=32)
+def compile_folder_template(template: str) -> NameTemplate:
+    return NameTemplate(template, FOLDER_FIELDS)
+
+
+@lru_cache(maxsize=32)
+def compile_file_template(template: str) -> NameTemplate:
+    return NameTemplate(template, FILE_FIELDS)
+
+
+def resolve_collisions(names: Dict[Hashable, str]) -> Dict[Hashable, List[Hashable]]:
+    """
+    Поиск совпадающих имён (без учёта регистра - как в Windows и macOS).
+    Первое по порядку имя остаётся, к остальным добавляется " (ключ)".
+
+    Args:
+        names: ключ (ID трека) -> имя; изменяется на месте
+
+    Returns:
+        имя -> ключи, у которых оно совпало
+    """
+    seen: Dict[str, Hashable] = {}
+    collisions: Dict[str, List[Hashable]] = {}
+    for key, name in names.items():
+        folded = name.casefold()
+        if folded not in seen:
+            seen[folded] = key
+            continue
+        collisions.setdefault(name, [seen[folded]]).append(key)
+        names[key] = f"{name} ({key})"
+    return collisions
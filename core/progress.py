@@ -0,0 +1,253 @@
+"""
+Модуль для отслеживания прогресса скачивания по байтам
+Скользящая оценка скорости и ETA для трека, задания и всей очереди.
+События прогресса прореживаются до фиксированной частоты.
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+
+# Частота событий прогресса (не чаще одного раза за интервал, секунд)
+PROGRESS_INTERVAL = 0.25
+# Окно усреднения скорости, секунд
+THROUGHPUT_WINDOW = 5.0
+
+
+def format_speed(bytes_per_sec: float) -> str:
+    """Скорость в МБ/с"""
+    return f"{bytes_per_sec / 1024 / 1024:.1f} MB/s"
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    """ETA в виде m:ss или h:mm:ss ('--:--' если неизвестно)"""
+    if seconds is None or seconds < 0 or seconds == float('inf'):
+        return "--:--"
+    seconds = int(seconds + 0.5)
+    h, rest = divmod(seconds, 3600)
+    m, s = divmod(rest, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+
+class ThroughputEstimator:
+    """
+    Скользящая оценка скорости: отношение прироста байт к времени
+    по отсчётам за последние window секунд.
+    """
+
+    # Минимальный шаг между отсчётами (чтобы не хранить по отсчёту на каждый чанк)
+    SAMPLE_STEP = 0.05
+
+    def __init__(self, window: float = THROUGHPUT_WINDOW):
+        self.window = window
+        self.total = 0
+        self._samples = deque()  # (время, накопленные байты)
+
+    def add(self, nbytes: int, now: float = None):
+        now = time.monotonic() if now is None else now
+        self.total += nbytes
+        samples = self._samples
+        if samples and now - samples[-1][0] < self.SAMPLE_STEP:
+            return
+        samples.append((now, self.total))
+        while len(samples) > 2 and now - samples[0][0] > self.window:
+            samples.popleft()
+
+    def rate(self, now: float = None) -> float:
+        """Скорость, байт/с (0 если данных недостаточно)"""
+        samples = self._samples
+        if not samples:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        first_t, first_b = samples[0]
+        # Учитываем байты, пришедшие после последнего отсчёта
+        elapsed = max(now, samples[-1][0]) - first_t
+        if elapsed <= 0:
+            return 0.0
+        return (self.total - first_b) / elapsed
+
+    def reset(self):
+        self.total = 0
+        self._samples.clear()
+
+
+class QueueProgress:
+    """
+    Сводный прогресс очереди: суммарная скорость и ETA по всем активным заданиям.
+    Потокобезопасен - задания обновляют его из своих потоков.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def register(self, job: 'JobProgress'):
+        with self._lock:
+            self._jobs[id(job)] = job
+
+    def unregister(self, job: 'JobProgress'):
+        with self._lock:
+            self._jobs.pop(id(job), None)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        speed = sum(job.speed() for job in jobs)
+        remaining = sum(job.remaining_bytes() for job in jobs)
+        return {
+            'queue_jobs': len(jobs),
+            'queue_speed': speed,
+            'queue_remaining': remaining,
+            'queue_eta': remaining / speed if speed > 0 else None,
+        }
+
+
+class JobProgress:
+    """
+    Прогресс одного задания (download_url): текущий трек + все треки задания.
+
+    Args:
+        callback: функция, получающая словарь с событием прогресса
+        queue: сводный прогресс очереди (опционально)
+        interval: минимальный интервал между событиями, секунд
+    """
+
+    def __init__(self, callback: Callable[[Dict], None] = None,
+                 queue: QueueProgress = None, interval: float = PROGRESS_INTERVAL):
+        self.callback = callback
+        self.queue = queue
+        self.interval = interval
+
+        self.job_rate = ThroughputEstimator()
+        self.track_rate = ThroughputEstimator()
+        self.tracks_total = 0
+        self.tracks_done = 0
+        self.tracks_skipped = 0       # завершены без скачивания (уже были, недоступны, ошибка)
+        self.attempts_aborted = 0     # прерванные попытки (обрыв с повтором, ошибка, повтор после проверки)
+        self.bytes_done = 0           # байты завершённых треков
+        self.track_id = None
+        self.track_bytes = 0
+        self.track_total = 0
+        self._last_emit = 0.0
+
+        if queue is not None:
+            queue.register(self)
+
+    # --- Обновление ---
+
+    def add_tracks(self, count: int):
+        """Задание узнало о новых треках (альбом/плейлист)"""
+        self.tracks_total += count
+
+    def begin_track(self, track_id, total_size: int, offset: int = 0):
+        """Начало (или докачка с offset байт) трека"""
+        if self.queue is not None:
+            self.queue.register(self)
+        self.track_id = track_id
+        self.track_bytes = offset
+        self.track_total = total_size
+        self.track_rate.reset()
+        self._emit(force=True)
+
+    def advance(self, nbytes: int):
+        """Пришли очередные байты текущего трека"""
+        now = time.monotonic()
+        self.track_bytes += nbytes
+        self.track_rate.add(nbytes, now)
+        self.job_rate.add(nbytes, now)
+        if now - self._last_emit >= self.interval:
+            self._emit(now)
+
+    def end_track(self):
+        self.bytes_done += self.track_bytes
+        self.tracks_done += 1
+        self._emit(force=True)
+        self.track_id = None
+        self.track_bytes = 0
+        self.track_total = 0
+
+    def skip_track(self):
+        """Трек завершён без скачивания - в числе треков задания, но байт не будет"""
+        self.tracks_skipped += 1
+        self._emit(force=True)
+
+    def abort_track(self):
+        """
+        Попытка скачивания прервана (обрыв, ошибка, остановка). Число треков
+        не меняется: трек докачивается повтором или отмечается skip_track
+        """
+        if self.track_id is None:
+            return
+        self.attempts_aborted += 1
+        self.track_id = None
+        self.track_bytes = 0
+        self.track_total = 0
+        self._emit(force=True)
+
+    def retry_track(self, nbytes: int = 0):
+        """
+        Скачанный трек (nbytes байт) не прошёл проверку и скачивается заново:
+        он снова в числе оставшихся, попытка считается прерванной, число треков
+        не меняется
+        """
+        self.tracks_done = max(0, self.tracks_done - 1)
+        self.bytes_done = max(0, self.bytes_done - nbytes)
+        self.attempts_aborted += 1
+        self._emit(force=True)
+
+    def close(self):
+        if self.queue is not None:
+            self.queue.unregister(self)
+
+    # --- Оценки ---
+
+    def speed(self) -> float:
+        return self.job_rate.rate()
+
+    def remaining_bytes(self) -> int:
+        """
+        Оценка оставшихся байт задания: остаток текущего трека
+        + оставшиеся треки по среднему размеру уже скачанных.
+        """
+        track_left = max(0, self.track_total - self.track_bytes) if self.track_total else 0
+        finished = self.tracks_done + self.tracks_skipped + (1 if self.track_id is not None else 0)
+        tracks_left = max(0, self.tracks_total - finished)
+        if self.tracks_done:
+            avg = self.bytes_done / self.tracks_done
+        else:
+            avg = self.track_total
+        return int(track_left + tracks_left * avg)
+
+    def snapshot(self, now: float = None) -> Dict:
+        track_speed = self.track_rate.rate(now)
+        job_speed = self.job_rate.rate(now)
+        track_left = max(0, self.track_total - self.track_bytes) if self.track_total else None
+        job_left = self.remaining_bytes()
+        data = {
+            'track_id': self.track_id,
+            'track_bytes': self.track_bytes,
+            'track_total': self.track_total,
+            'track_percent': int(self.track_bytes * 100 / self.track_total) if self.track_total else None,
+            'track_speed': track_speed,
+            'track_eta': track_left / track_speed if track_left is not None and track_speed > 0 else None,
+            'job_bytes': self.bytes_done + self.track_bytes,
+            'job_tracks_done': self.tracks_done,
+            'job_tracks_total': self.tracks_total,
+            'job_tracks_skipped': self.tracks_skipped,
+            'job_attempts_aborted': self.attempts_aborted,
+            'job_speed': job_speed,
+            'job_eta': job_left / job_speed if job_speed > 0 else None,
+        }
+        if self.queue is not None:
+            data.update(self.queue.snapshot())
+        return data
+
+    def _emit(self, now: float = None, force: bool = False):
+        if not self.callback:
+            return
+        now = time.monotonic() if now is None else now
+        if not force and now - self._last_emit < self.interval:
+            return
+        self._last_emit = now
+        self.callback(self.snapshot(now))
@@ -8,6 +8,8 @@ import requests
 import base64
 import re
 from collections import OrderedDict
+from core.api_cache import get_default_cache
+from core.singleflight import SingleFlight
 
 
 class QobuzAPIException(Exception):
@@ -109,7 +111,12 @@ class Bundle:
 class QobuzClient:
     """Клиент для работы с API Qobuz"""
     
-    def __init__(self, email, password, app_id, secrets):
+    BASE_URL = "https://www.qobuz.com/api.json/0.2/"
+    
+    # Запросы метаданных: одинаковые одновременные вызовы объединяются
+    COALESCED_ENDPOINTS = ("album/get", "track/get", "artist/get", "label/get", "playlist/get")
+    
+    def __init__(self, email, password, app_id, secrets, base_url=None, cache=None):
         self.secrets = secrets
         self.id = str(app_id)
         self.session = requests.Session()
@@ -118,7 +125,12 @@ class QobuzClient:
             "X-App-Id": self.id,
             "Content-Type": "application/json;charset=UTF-8"
         })
-        self.base = "https://www.qobuz.com/api.json/0.2/"
+        # base_url позволяет направить клиент на локальный стенд (benchmarks/)
+        self.base = base_url or self.BASE_URL
+        # Кеш ответов метаданных (core.api_cache.ResponseCache), None - без кеша
+        self.cache = cache
+        self.cache_scope = self.id
+        self.inflight = SingleFlight()
         self.sec = None
         self.auth(email, password)
         self.cfg_setup()
@@ -176,8 +188,34 @@ class QobuzClient:
             }
         else:
             params = kwargs
+        
+        if epoint in self.COALESCED_ENDPOINTS:
+            # Несколько рабочих потоков часто просят один альбом одновременно
+            key = (self.cache_scope, epoint, tuple(sorted((k, str(v)) for k, v in params.items())))
+            return self.inflight.do(key, self._request, epoint, params)
+        return self._request(epoint, params)
+    
+    def _request(self, epoint, params):
+        """HTTP-запрос к API (через кеш ответов для метаданных)"""
+        # Метаданные - из кеша; просроченная запись проверяется условным запросом
+        cache_key = cached = headers = None
+        if self.cache is not None and self.cache.cacheable(epoint):
+            cache_key = self.cache.make_key(self.cache_scope, epoint, params)
+            cached = self.cache.get(cache_key)
+            if cached and cached['fresh']:
+                return cached['data']
+            if cached:
+                headers = {}
+                if cached['etag']:
+                    headers['If-None-Match'] = cached['etag']
+                if cached['last_modified']:
+                    headers['If-Modified-Since'] = cached['last_modified']
             
-        r = self.session.get(self.base + epoint, params=params)
+        r = self.session.get(self.base + epoint, params=params, headers=headers)
+        
+        if cached and r.status_code == 304:
+            self.cache.refresh(cache_key, epoint)
+            return cached['data']
         
         if epoint == "user/login":
             if r.status_code == 401:
@@ -188,7 +226,11 @@ class QobuzClient:
             raise InvalidAppSecretError(f"Invalid app secret: {r.json()}")
         
         r.raise_for_status()
-        return r.json()
+        data = r.json()
+        if cache_key:
+            self.cache.put(cache_key, epoint, data,
+                           r.headers.get('ETag'), r.headers.get('Last-Modified'))
+        return data
     
     def auth(self, email, pwd):
         """Авторизация пользователя"""
@@ -199,6 +241,8 @@ class QobuzClient:
         self.session.headers.update({"X-User-Auth-Token": self.uat})
         self.label = usr_info["user"]["credential"]["parameters"]["short_label"]
         self.user_info = usr_info
+        # Ответы зависят от аккаунта (регион, доступность) - кеш раздельный
+        self.cache_scope = f"{self.id}:{usr_info['user'].get('id', self.label)}"
         
     def test_secret(self, sec):
         """Тестирование секрета"""
@@ -259,4 +303,4 @@ def get_app_credentials():
 def get_qobuz_client(email, password):
     """Создание клиента Qobuz"""
     app_id, secrets = get_app_credentials()
-    return QobuzClient(email, password, app_id, secrets)
+    return QobuzClient(email, password, app_id, secrets, cache=get_default_cache())
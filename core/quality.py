@@ -0,0 +1,72 @@
+"""
+Модуль согласования качества (format_id)
+Лучший доступный формат выбирается до запроса ссылки - по максимальному
+качеству трека/альбома из метаданных (maximum_bit_depth, maximum_sampling_rate,
+hires_streamable). Запрос 24/192 для CD-альбома не тратит вызов getFileUrl
+и не даёт файла ниже ожидаемого без отметки об этом.
+"""
+from typing import Dict, List, Optional
+
+from core.releases import edition_quality
+
+
+# Соответствие индекса качества и format_id
+QUALITY_MAP = {
+    0: 5,   # MP3 320
+    1: 6,   # FLAC 16/44.1
+    2: 7,   # FLAC 24/96
+    3: 27,  # FLAC 24/192
+}
+
+# Порядок format_id по качеству
+FORMAT_RANK = {5: 0, 6: 1, 7: 2, 27: 3}
+
+FORMAT_NAMES = {
+    5: "MP3 320",
+    6: "FLAC 16/44.1",
+    7: "FLAC 24/96",
+    27: "FLAC 24/192",
+}
+
+# Форматы FLAC от лучшего к худшему (MP3 - отдельное семейство, без понижения)
+LOSSLESS_FORMATS = (27, 7, 6)
+
+
+def file_extension(format_id: int) -> str:
+    return '.mp3' if format_id == 5 else '.flac'
+
+
+def available_format(meta: Dict) -> Optional[int]:
+    """
+    Лучший FLAC-формат по метаданным трека или альбома;
+    None - в метаданных нет сведений о качестве
+    """
+    if not meta or 'maximum_bit_depth' not in meta:
+        return None
+    bits, rate = edition_quality(meta)
+    if bits <= 16 or meta.get('hires_streamable') is False:
+        return 6
+    return 27 if rate > 96 else 7
+
+
+def negotiate_format(quality_index: int, track_meta: Dict, album_meta: Dict = None) -> int:
+    """
+    format_id для запроса: выбранное качество, но не выше доступного
+    (сведения трека точнее, чем альбома - в сборниках треки разного качества)
+    """
+    requested = QUALITY_MAP.get(quality_index, 6)
+    if requested == 5:
+        return requested
+    available = available_format(track_meta)
+    if available is None:
+        available = available_format(album_meta)
+    if available is None or FORMAT_RANK[available] >= FORMAT_RANK[requested]:
+        return requested
+    return available
+
+
+def fallback_formats(format_id: int) -> List[int]:
+    """Форматы для повтора, если сервер не отдал ссылку на format_id"""
+    if format_id not in LOSSLESS_FORMATS:
+        return []
+    return list(LOSSLESS_FORMATS[LOSSLESS_FORMATS.index(format_id) + 1:])
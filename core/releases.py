@@ -0,0 +1,185 @@
+"""
+Модуль группировки релизов дискографии
+Издания одного релиза (ремастеры, deluxe, explicit/clean, разные форматы)
+сводятся в группу по нормализованному названию и году первого выпуска,
+из группы выбирается лучшее издание по политике качества с учётом
+выбранного quality_index.
+"""
+import re
+from typing import Dict, List, Tuple
+
+
+# Целевое качество для quality_index: (разрядность, частота кГц).
+# MP3 и CD одинаково обслуживаются изданием 16/44.1
+QUALITY_TARGETS = {
+    0: (16, 44.1),
+    1: (16, 44.1),
+    2: (24, 96.0),
+    3: (24, 192.0),
+}
+
+# Политики выбора издания
+POLICY_QUALITY = 'quality'   # качество (до целевого), затем полнота
+POLICY_TRACKS = 'tracks'     # полнота (число треков), затем качество
+
+# Пометки изданий, которые не меняют сам релиз
+_EDITION_MARKERS = re.compile(
+    r"\b(remaster(ed)?|deluxe|expanded|anniversary|special|collector'?s|legacy|limited|"
+    r"bonus\s+tracks?|explicit|clean|mono|stereo|hi-?res)\b",
+    re.IGNORECASE
+)
+# Слова, допустимые рядом с пометкой: "Super Deluxe Edition", "2011 Remaster",
+# "25th Anniversary Version" (сами по себе изданием не считаются: "Live Version")
+_EDITION_FILLER = re.compile(
+    r"\b(edition|version|super|\d{4}|\d+(st|nd|rd|th)|and|&)\b",
+    re.IGNORECASE
+)
+_GROUPS = re.compile(r"\(([^()]*)\)|\[([^\[\]]*)\]|«([^«»]*)»")
+
+
+def is_edition_marker(text: str) -> bool:
+    """
+    Текст целиком - пометка издания: "Remastered 2019", "Deluxe Edition".
+    "Blue Album", "Vol. 1", "Live Version" - часть названия, а не издание.
+    """
+    if not _EDITION_MARKERS.search(text):
+        return False
+    rest = _EDITION_FILLER.sub(' ', _EDITION_MARKERS.sub(' ', text))
+    return not re.sub(r"[\s,.;:/+-]+", '', rest)
+
+
+def _strip_editions(title: str):
+    """Название без пометок изданий и признак, что пометки были"""
+    marked = False
+
+    def drop(match):
+        nonlocal marked
+        content = next(group for group in match.groups() if group is not None)
+        if is_edition_marker(content):
+            marked = True
+            return ' '
+        return match.group(0)
+
+    clean = _GROUPS.sub(drop, title or '')
+    # Хвост после " - " с пометкой издания ("- 2011 Remaster", "- Deluxe")
+    parts = re.split(r'\s+-\s+', clean)
+    while len(parts) > 1 and is_edition_marker(parts[-1]):
+        parts.pop()
+        marked = True
+    return ' - '.join(parts), marked
+
+
+def normalize_title(title: str) -> str:
+    """
+    Название релиза без пометок изданий: "Abbey Road (Remastered 2019)",
+    "Abbey Road [Deluxe Edition]" и "Abbey Road - 2019 Remaster" → "abbey road".
+    Скобки с другим содержимым остаются: "Weezer (Blue Album)" и
+    "Weezer (Green Album)" - разные релизы.
+    """
+    clean, _ = _strip_editions(title)
+    clean = re.sub(r'_+', ' ', clean)
+    clean = re.sub(r'\s+', ' ', clean)
+    return clean.strip(' _-\t\n\r').lower()
+
+
+def release_year(album: Dict) -> str:
+    """Год первого выпуска издания ('' - неизвестен)"""
+    return (album.get('release_date_original') or '')[:4]
+
+
+def edition_quality(album: Dict) -> Tuple[int, float]:
+    """Максимальное качество издания: (разрядность, частота кГц)"""
+    return (int(album.get('maximum_bit_depth') or 16),
+            float(album.get('maximum_sampling_rate') or 44.1))
+
+
+class ReleasePolicy:
+    """
+    Политика выбора лучшего издания.
+
+    Качество выше целевого (quality_index) не даёт преимущества: для CD
+    издание 24/192 не лучше 16/44.1, а скачается столько же треков.
+
+    Args:
+        quality_index: выбранное качество (0..3)
+        prefer: POLICY_QUALITY или POLICY_TRACKS
+        prefer_explicit: при прочих равных explicit, а не clean
+    """
+
+    def __init__(self, quality_index: int = 1, prefer: str = POLICY_QUALITY,
+                 prefer_explicit: bool = True):
+        self.target = QUALITY_TARGETS.get(quality_index, QUALITY_TARGETS[1])
+        self.prefer = prefer
+        self.prefer_explicit = prefer_explicit
+
+    @classmethod
+    def from_settings(cls, settings: Dict) -> 'ReleasePolicy':
+        return cls(
+            quality_index=settings.get('quality_index', 1),
+            prefer=settings.get('artist_release_policy', POLICY_QUALITY),
+            prefer_explicit=settings.get('artist_prefer_explicit', True),
+        )
+
+    def score(self, album: Dict) -> Tuple:
+        """Ключ сортировки: больше - лучше"""
+        bits, rate = edition_quality(album)
+        quality = (min(bits, self.target[0]), min(rate, self.target[1]))
+        tracks = album.get('tracks_count') or 0
+        explicit = bool(album.get('parental_warning'))
+        explicit_score = explicit if self.prefer_explicit else not explicit
+        # При равенстве - более позднее издание (ремастер)
+        released = album.get('released_at') or 0
+        if self.prefer == POLICY_TRACKS:
+            return (tracks, quality, explicit_score, released)
+        return (quality, tracks, explicit_score, released)
+
+
+class ReleaseGroup:
+    """Издания одного релиза, лучшее - первое"""
+
+    def __init__(self, key: Tuple, editions: List[Dict]):
+        self.key = key
+        self.editions = editions
+
+    @property
+    def best(self) -> Dict:
+        return self.editions[0]
+
+    @property
+    def alternatives(self) -> List[Dict]:
+        return self.editions[1:]
+
+
+def group_releases(albums: List[Dict], policy: ReleasePolicy) -> List[ReleaseGroup]:
+    """
+    Группировка изданий по (артист, нормализованное название, год выпуска).
+
+    Одноимённые альбомы разных лет (Peter Gabriel 1977 и 1978) - разные релизы.
+    Издание с пометкой ("Remastered 2009" с датой 2009) присоединяется
+    к релизу без пометки, только если такой релиз с этим названием один.
+
+    Returns:
+        группы, крупные релизы (по числу треков лучшего издания) первыми -
+        чтобы синглы и сборники проверялись на покрытие уже после альбомов
+    """
+    buckets: Dict[Tuple, List[Tuple[Dict, bool]]] = {}
+    for album in albums:
+        artist_id = (album.get('artist') or {}).get('id')
+        title, marked = _strip_editions(album.get('title', ''))
+        buckets.setdefault((artist_id, normalize_title(title)), []).append((album, marked))
+
+    groups: Dict[Tuple, List[Dict]] = {}
+    for (artist_id, title), editions in buckets.items():
+        base_years = {release_year(album) for album, marked in editions if not marked}
+        for album, marked in editions:
+            year = release_year(album)
+            if marked and year not in base_years and len(base_years) == 1:
+                year = next(iter(base_years))
+            groups.setdefault((artist_id, title, year), []).append(album)
+
+    result = [
+        ReleaseGroup(key, sorted(editions, key=policy.score, reverse=True))
+        for key, editions in groups.items()
+    ]
+    result.sort(key=lambda group: group.best.get('tracks_count') or 0, reverse=True)
+    return result
@@ -0,0 +1,65 @@
+"""
+Модуль объединения одинаковых одновременных запросов (single-flight)
+Если несколько потоков одновременно запрашивают одно и то же (альбом
+для треков одного плейлиста, обложку, текст песни), запрос выполняет
+первый, остальные ждут и получают его результат или его исключение.
+Результат не запоминается: следующий запрос после завершения идёт заново
+(для повторов есть кеш ответов API).
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    """Запрос в полёте"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Группа запросов, объединяемых по ключу.
+
+    Ожидающие получают тот же объект результата, что и первый вызов,
+    поэтому результат нельзя изменять на месте.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.shared = 0  # сколько вызовов получили чужой результат
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Вызов fn(*args, **kwargs), если такой же (по key) ещё не выполняется"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,250 @@
+"""
+Модуль для структурированных замеров времени по этапам скачивания
+Каждый этап трека (получение URL, первый байт, передача, поиск текстов,
+запись тегов, файлы текстов, проверка) записывается как span с ID трека, байтами и исходом.
+Экспорт: JSON Lines (.jsonl) или trace-файл Chrome/Perfetto (.json).
+Файл trace_file общий для всех заданий процесса (TraceFile): строки .jsonl
+дописываются под одной блокировкой, .json собирается из span'ов всех заданий.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Этапы обработки трека
+STAGE_URL_RESOLVE = 'url_resolve'
+STAGE_FIRST_BYTE = 'first_byte'
+STAGE_TRANSFER = 'transfer'
+STAGE_LYRICS = 'lyrics_search'
+STAGE_TAGS = 'tag_write'
+STAGE_SIDECARS = 'sidecars'
+STAGE_VERIFY = 'verify'
+
+# Исходы
+OUTCOME_OK = 'ok'
+OUTCOME_ERROR = 'error'
+OUTCOME_CANCELLED = 'cancelled'
+OUTCOME_SKIPPED = 'skipped'
+
+_trace_files = {}
+_trace_files_lock = threading.Lock()
+
+
+class Span:
+    """Один замер: этап, трек, интервал времени, байты и исход"""
+
+    __slots__ = ('name', 'track_id', 'start', 'end', 'bytes', 'outcome', 'thread', 'attrs')
+
+    def __init__(self, name: str, track_id=None, start: float = None, **attrs):
+        self.name = name
+        self.track_id = track_id
+        self.start = time.perf_counter() if start is None else start
+        self.end = None
+        self.bytes = 0
+        self.outcome = OUTCOME_OK
+        self.thread = threading.get_ident()
+        self.attrs = attrs
+
+    @property
+    def duration(self) -> float:
+        """Длительность в секундах"""
+        return ((self.end if self.end is not None else time.perf_counter()) - self.start)
+
+
+class TraceFile:
+    """
+    Файл замеров, общий для всех Tracer'ов процесса с этим путём.
+    Для .jsonl записи дописываются по мере завершения span'ов, для остальных
+    расширений события копятся и файл пишется целиком в write() - со span'ами
+    всех заданий, а не только последнего.
+    """
+
+    def __init__(self, path: Path, max_events: int = 100000):
+        self.path = path
+        self.stream = path.suffix.lower() == '.jsonl'
+        self.failed = False
+        self._events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+
+    def add(self, tracer: 'Tracer', span: Span):
+        if not self.stream:
+            event = tracer.trace_event(span)
+            with self._lock:
+                self._events.append(event)
+            return
+        line = json.dumps(tracer.to_dict(span), ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self.failed:
+                return
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+            except OSError as e:
+                logger.warning(f"Не удалось записать trace: {e}")
+                self.failed = True
+
+    def write(self) -> Path:
+        """Trace-файл Chrome Trace Event со всеми накопленными событиями"""
+        with self._lock:
+            events = list(self._events)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + '.tmp')
+            tmp.write_text(json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'},
+                                      ensure_ascii=False, default=str), encoding='utf-8')
+            os.replace(tmp, self.path)
+        return self.path
+
+
+def get_trace_file(path) -> TraceFile:
+    """Общий объект файла замеров (задания одного процесса пишут в один)"""
+    path = Path(path)
+    key = str(path.resolve())
+    with _trace_files_lock:
+        trace_file = _trace_files.get(key)
+        if trace_file is None:
+            trace_file = _trace_files[key] = TraceFile(path)
+        return trace_file
+
+
+class Tracer:
+    """
+    Сборщик span'ов одного задания.
+
+    Args:
+        path: файл для экспорта (общий для заданий, см. TraceFile). Для .jsonl
+              span'ы дописываются по мере завершения, для остальных расширений
+              trace-файл пишется целиком в export().
+        max_spans: сколько последних span'ов держать в памяти
+    """
+
+    def __init__(self, path: Optional[str] = None, max_spans: int = 20000):
+        self.path = Path(path) if path else None
+        self.spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        # Привязка perf_counter к настенным часам для абсолютных отметок
+        self._perf0 = time.perf_counter()
+        self._wall0 = time.time()
+        self._file = get_trace_file(self.path) if self.path else None
+
+    def wall_time(self, perf: float) -> float:
+        """Перевод отметки perf_counter в Unix-время"""
+        return self._wall0 + (perf - self._perf0)
+
+    @contextmanager
+    def span(self, name: str, track_id=None, **attrs) -> Iterator[Span]:
+        """
+        Замер блока кода. Исход определяется автоматически:
+        исключение → error (InterruptedError → cancelled), иначе значение span.outcome.
+        """
+        current = Span(name, track_id, **attrs)
+        try:
+            yield current
+        except InterruptedError:
+            current.outcome = OUTCOME_CANCELLED
+            raise
+        except BaseException:
+            current.outcome = OUTCOME_ERROR
+            raise
+        finally:
+            self.finish(current)
+
+    def start(self, name: str, track_id=None, **attrs) -> Span:
+        """Ручной старт span'а (для этапов, которые не укладываются в with-блок)"""
+        return Span(name, track_id, **attrs)
+
+    def finish(self, span: Span, outcome: str = None, end: float = None):
+        """Завершение span'а и передача в хранилище/файл"""
+        span.end = time.perf_counter() if end is None else end
+        if outcome:
+            span.outcome = outcome
+        with self._lock:
+            self.spans.append(span)
+        if self._file:
+            self._file.add(self, span)
+
+    def to_dict(self, span: Span) -> Dict:
+        data = {
+            'stage': span.name,
+            'track_id': span.track_id,
+            'start': round(self.wall_time(span.start), 6),
+            'duration_ms': round(span.duration * 1000, 3),
+            'bytes': span.bytes,
+            'outcome': span.outcome,
+            'thread': span.thread,
+        }
+        if span.attrs:
+            data.update(span.attrs)
+        return data
+
+    def trace_event(self, span: Span) -> Dict:
+        """Событие Chrome Trace Event ('X' - полный интервал)"""
+        args = {'track_id': span.track_id, 'bytes': span.bytes, 'outcome': span.outcome}
+        args.update(span.attrs)
+        return {
+            'name': span.name,
+            'cat': 'track',
+            'ph': 'X',
+            'ts': round(self.wall_time(span.start) * 1e6),
+            'dur': round(span.duration * 1e6),
+            'pid': os.getpid(),
+            'tid': span.thread,
+            'args': args,
+        }
+
+    def export_jsonl(self, path) -> Path:
+        """Все span'ы из памяти в формате JSON Lines"""
+        path = Path(path)
+        with self._lock:
+            spans = list(self.spans)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for span in spans:
+                f.write(json.dumps(self.to_dict(span), ensure_ascii=False, default=str) + "\n")
+        return path
+
+    def export_trace(self, path) -> Path:
+        """Trace-файл в формате Chrome Trace Event (открывается в chrome://tracing и Perfetto)"""
+        path = Path(path)
+        with self._lock:
+            spans = list(self.spans)
+        events = [self.trace_event(span) for span in spans]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'},
+                                   ensure_ascii=False, default=str), encoding='utf-8')
+        return path
+
+    def export(self) -> Optional[Path]:
+        """Экспорт в файл из настроек (для .jsonl данные уже записаны по ходу)"""
+        if not self._file or self._file.stream:
+            return self.path
+        try:
+            return self._file.write()
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить trace-файл: {e}")
+            return None
+
+    def summary(self) -> List[Dict]:
+        """Сводка по этапам: количество, суммарное время, байты, ошибки"""
+        stats = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            s = stats.setdefault(span.name, {'stage': span.name, 'count': 0, 'total_ms': 0.0,
+                                             'max_ms': 0.0, 'bytes': 0, 'errors': 0})
+            ms = span.duration * 1000
+            s['count'] += 1
+            s['total_ms'] += ms
+            s['max_ms'] = max(s['max_ms'], ms)
+            s['bytes'] += span.bytes
+            if span.outcome == OUTCOME_ERROR:
+                s['errors'] += 1
+        return sorted(stats.values(), key=lambda s: s['total_ms'], reverse=True)
@@ -0,0 +1,137 @@
+"""
+Модуль для потоковой записи HTTP-ответа в файл
+Адаптивный размер чтения (растёт вместе с измеренной скоростью до нескольких МБ),
+приём через readinto в заранее выделенный буфер и запись крупными выровненными блоками.
+Обрыв соединения посреди тела сводится к IncompleteDownloadError - полученное
+остаётся в файле и докачивается повтором.
+"""
+import time
+from typing import BinaryIO, Callable, Optional
+
+from requests.exceptions import ChunkedEncodingError, ConnectionError as RequestsConnectionError
+from urllib3.exceptions import ProtocolError
+
+from core.verify import IncompleteDownloadError
+
+
+# Выравнивание размеров чтения/записи
+BLOCK_ALIGN = 64 * 1024
+# Границы размера чтения
+CHUNK_MIN = 64 * 1024
+CHUNK_MAX = 4 * 1024 * 1024
+# Сколько должно длиться одно заполнение буфера: достаточно долго, чтобы
+# итераций было мало, и достаточно коротко, чтобы прогресс и отмена оставались отзывчивыми
+TARGET_FILL_TIME = 0.1
+
+# Обрыв тела ответа: urllib3 2.x - ProtocolError (IncompleteRead, сброс соединения),
+# requests - при чтении через iter_content
+TRUNCATION_ERRORS = (ProtocolError, RequestsConnectionError, ChunkedEncodingError)
+
+
+class AdaptiveChunkSizer:
+    """
+    Подбор размера чтения по измеренной скорости:
+    размер ≈ скорость × TARGET_FILL_TIME, выровнен по BLOCK_ALIGN
+    и ограничен CHUNK_MIN..CHUNK_MAX.
+    """
+
+    def __init__(self, minimum: int = CHUNK_MIN, maximum: int = CHUNK_MAX,
+                 target_time: float = TARGET_FILL_TIME):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_time = target_time
+        self.size = minimum
+
+    def update(self, nbytes: int, elapsed: float) -> int:
+        if elapsed > 0 and nbytes > 0:
+            wanted = int(nbytes / elapsed * self.target_time)
+            # Растём не более чем вдвое за шаг, уменьшаемся сразу
+            wanted = min(wanted, self.size * 2)
+            wanted = max(self.minimum, min(self.maximum, wanted))
+            self.size = max(BLOCK_ALIGN, wanted // BLOCK_ALIGN * BLOCK_ALIGN)
+        return self.size
+
+
+def write_all(f: BinaryIO, data: memoryview):
+    """
+    Запись блока целиком: файл без буферизации (FileIO) может записать
+    меньше запрошенного - дописываем остаток
+    """
+    while data:
+        n = f.write(data)
+        if n is None:
+            raise BlockingIOError("запись в неблокирующий файл не выполнена")
+        data = data[n:]
+
+
+def stream_to_file(response, f: BinaryIO,
+                   on_chunk: Optional[Callable[[int], None]] = None,
+                   sizer: AdaptiveChunkSizer = None,
+                   should_stop: Optional[Callable[[], bool]] = None) -> int:
+    """
+    Запись тела ответа requests (stream=True) в открытый файл.
+
+    Данные принимаются через response.raw.readinto в один буфер размера CHUNK_MAX,
+    запись идёт блоками размера текущего чанка (кратно BLOCK_ALIGN, кроме хвоста).
+
+    Args:
+        response: ответ requests, полученный с stream=True
+        f: файл, открытый на запись в бинарном режиме (лучше без буферизации)
+        on_chunk: вызывается после записи каждого блока с его размером
+        sizer: стратегия размера чтения (по умолчанию - адаптивная)
+        should_stop: проверяется после каждого блока; True - прекратить чтение
+                     (пауза/остановка), записанное остаётся в файле
+
+    Returns:
+        число записанных байт
+
+    Raises:
+        IncompleteDownloadError: соединение оборвалось (принятое до обрыва записано)
+    """
+    sizer = sizer or AdaptiveChunkSizer()
+    raw = response.raw
+    # Распаковка gzip/deflate, если CDN вдруг сжал ответ
+    raw.decode_content = True
+
+    buf = bytearray(sizer.maximum)
+    view = memoryview(buf)
+    written = 0
+
+    while True:
+        chunk = sizer.size
+        filled = 0
+        started = time.perf_counter()
+        truncated = None
+        # Заполняем буфер до размера чанка (readinto может вернуть меньше)
+        while filled < chunk:
+            try:
+                n = raw.readinto(view[filled:chunk])
+            except TRUNCATION_ERRORS as e:
+                truncated = e
+                break
+            if not n:
+                break
+            filled += n
+        if truncated is not None:
+            # Сохраняем принятое - повтор докачает с этого места (Range)
+            if filled:
+                write_all(f, view[:filled])
+                written += filled
+                if on_chunk:
+                    on_chunk(filled)
+            raise IncompleteDownloadError(f"соединение оборвано после {written} байт: {truncated}") from truncated
+        if not filled:
+            break
+
+        write_all(f, view[:filled])
+        written += filled
+        if on_chunk:
+            on_chunk(filled)
+        if should_stop and should_stop():
+            break
+
+        if filled < chunk:
+            break  # конец потока
+        sizer.update(filled, time.perf_counter() - started)
+
+    return written
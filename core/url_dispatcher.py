@@ -1,13 +1,22 @@
 """
 Универсальный диспетчер URL для обработки различных типов контента Qobuz
+Пакет ссылок нормализуется в пары (тип, ID), дубликаты и треки из уже
+поставленных альбомов отбрасываются, остальное скачивается параллельно.
 """
 import re
 import os
-from typing import List, Tuple, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple, Optional, Callable
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Канонический вид ссылки: одинаковый контент - одинаковая строка
+CANONICAL_URL = "https://play.qobuz.com/{type}/{id}"
+
+# Потоков для запросов метаданных треков при свёртке в альбомы
+RESOLVE_WORKERS = 8
+
 
 def get_url_info(url: str) -> Optional[Tuple[str, str]]:
     """
@@ -47,6 +56,11 @@ def get_url_info(url: str) -> Optional[Tuple[str, str]]:
     return None
 
 
+def canonical_url(content_type: str, content_id: str) -> str:
+    """Каноническая ссылка Qobuz для пары (тип, ID)"""
+    return CANONICAL_URL.format(type=content_type, id=content_id)
+
+
 def parse_sources(sources_list: List[str]) -> List[str]:
     """
     Принимает список строк и раскрывает их в плоский список URL.
@@ -97,15 +111,27 @@ class UrlDispatcher:
     
     Attributes:
         downloader: Экземпляр QobuzDownloader для выполнения скачивания
+        downloader_factory: Функция, создающая новый QobuzDownloader (для параллельной работы)
+        client: Клиент Qobuz API для свёртки треков в альбомы
+        max_workers: Сколько ссылок скачивается одновременно
         handlers: Словарь-маршрутизатор для разных типов контента
     """
     
-    def __init__(self, downloader=None):
+    def __init__(self, downloader=None, downloader_factory: Callable = None,
+                 client=None, max_workers: int = 2):
         """
         Args:
             downloader: Экземпляр QobuzDownloader (опционально)
+            downloader_factory: Функция без аргументов, возвращающая новый QobuzDownloader.
+                                Каждая ссылка получает свой экземпляр, поэтому их можно
+                                скачивать параллельно
+            client: Клиент Qobuz API (по умолчанию - клиент downloader)
+            max_workers: Число параллельных скачиваний (только с downloader_factory)
         """
         self.downloader = downloader
+        self.downloader_factory = downloader_factory
+        self.client = client or getattr(downloader, 'client', None)
+        self.max_workers = max(1, max_workers)
         
         # Словарь-маршрутизатор: связывает тип контента с функцией-обработчиком
         self.handlers = {
@@ -118,41 +144,158 @@ class UrlDispatcher:
     
     # --- Обработчики для разных типов контента ---
     
-    def handle_album(self, item_id: str) -> bool:
+    def handle_album(self, item_id: str, downloader=None) -> bool:
         """Обработка альбома"""
         logger.info(f"Запуск скачивания АЛЬБОМА с ID: {item_id}")
-        if self.downloader:
-            return self.downloader.download_album(item_id)
+        downloader = downloader or self.downloader
+        if downloader:
+            return downloader.download_album(item_id)
         return False
     
-    def handle_track(self, item_id: str) -> bool:
+    def handle_track(self, item_id: str, downloader=None) -> bool:
         """Обработка трека"""
         logger.info(f"Запуск скачивания ТРЕКА с ID: {item_id}")
-        if self.downloader:
-            return self.downloader.download_track(item_id)
+        downloader = downloader or self.downloader
+        if downloader:
+            return downloader.download_track_by_id(item_id)
         return False
     
-    def handle_artist(self, item_id: str) -> bool:
+    def handle_artist(self, item_id: str, downloader=None) -> bool:
         """Обработка артиста (вся дискография)"""
         logger.info(f"Запуск скачивания АРТИСТА с ID: {item_id}")
-        if self.downloader:
-            return self.downloader.download_artist(item_id)
+        downloader = downloader or self.downloader
+        if downloader:
+            return downloader.download_artist(item_id)
         return False
     
-    def handle_playlist(self, item_id: str) -> bool:
+    def handle_playlist(self, item_id: str, downloader=None) -> bool:
         """Обработка плейлиста"""
         logger.info(f"Запуск скачивания ПЛЕЙЛИСТА с ID: {item_id}")
-        if self.downloader:
-            return self.downloader.download_playlist(item_id)
+        downloader = downloader or self.downloader
+        if downloader:
+            return downloader.download_playlist(item_id)
         return False
     
-    def handle_label(self, item_id: str) -> bool:
+    def handle_label(self, item_id: str, downloader=None) -> bool:
         """Обработка лейбла"""
         logger.info(f"Запуск скачивания ЛЕЙБЛА с ID: {item_id}")
-        if self.downloader:
+        if downloader or self.downloader:
             logger.warning("Скачивание лейблов пока не поддерживается")
         return False
     
+    # --- Подготовка пакета ---
+    
+    def plan(self, urls: List[str],
+             queued: Iterable[Tuple[str, str]] = ()) -> List[Tuple[str, str]]:
+        """
+        Нормализация пакета ссылок перед скачиванием.
+        
+        1. Каждая ссылка приводится к (тип, ID), нераспознанные отбрасываются
+        2. Повторы (в том числе уже стоящие в очереди - queued) убираются
+        3. Треки, альбом которых есть в пакете или в очереди, убираются
+           (для этого запрашиваются метаданные треков, параллельно)
+        
+        Args:
+            urls: Ссылки (уже раскрытые parse_sources)
+            queued: Пары (тип, ID), которые уже стоят в очереди
+            
+        Returns:
+            Список пар (тип, ID) в исходном порядке
+        """
+        seen = set(queued)
+        items = []
+        invalid = duplicates = 0
+        
+        for url in urls:
+            url_info = get_url_info(url)
+            if not url_info:
+                invalid += 1
+                continue
+            if url_info in seen:
+                duplicates += 1
+                continue
+            seen.add(url_info)
+            items.append(url_info)
+        
+        album_ids = {item_id for content_type, item_id in seen if content_type == 'album'}
+        track_ids = [item_id for content_type, item_id in items if content_type == 'track']
+        covered = set()
+        if album_ids and track_ids and self.client:
+            with ThreadPoolExecutor(max_workers=min(RESOLVE_WORKERS, len(track_ids))) as executor:
+                for track_id, album_id in zip(track_ids, executor.map(self._track_album_id, track_ids)):
+                    if album_id in album_ids:
+                        covered.add(track_id)
+            items = [item for item in items if not (item[0] == 'track' and item[1] in covered)]
+        
+        if invalid or duplicates or covered:
+            logger.info(
+                f"Пакет: {len(items)} к скачиванию, нераспознано {invalid}, "
+                f"повторов {duplicates}, треков из альбомов пакета {len(covered)}"
+            )
+        return items
+    
+    def estimate(self, items: List[Tuple[str, str]], quality_index: int) -> Dict[Tuple[str, str], int]:
+        """
+        Оценка размера заданий (альбом, трек, плейлист) для проверки места перед запуском.
+        Метаданные запрашиваются параллельно и остаются в кеше API - скачивание их не повторит.
+        
+        Returns:
+            (тип, ID) -> оценка в байтах (только для оценённых)
+        """
+        from core.diskspace import estimate_item_bytes
+        
+        items = [item for item in items if item[0] in ('album', 'track', 'playlist')]
+        if not items or not self.client:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(RESOLVE_WORKERS, len(items))) as executor:
+            sizes = executor.map(lambda item: estimate_item_bytes(self.client, *item, quality_index), items)
+            return {item: size for item, size in zip(items, sizes) if size}
+    
+    def _track_album_id(self, track_id: str) -> Optional[str]:
+        """ID альбома трека (None если метаданные недоступны)"""
+        try:
+            album = self.client.get_track_meta(track_id).get('album') or {}
+            return str(album.get('id')) if album.get('id') else None
+        except Exception as e:
+            logger.warning(f"Не удалось получить альбом трека {track_id}: {e}")
+            return None
+    
+    # --- Скачивание ---
+    
+    def dispatch(self, items: List[Tuple[str, str]]) -> int:
+        """
+        Скачивание подготовленного пакета.
+        С downloader_factory ссылки скачиваются параллельно (max_workers),
+        иначе - по очереди общим downloader.
+        
+        Returns:
+            Число успешно обработанных ссылок
+        """
+        if self.downloader_factory and self.max_workers > 1 and len(items) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers,
+                                    thread_name_prefix='dispatch') as executor:
+                results = list(executor.map(lambda item: self.run_item(*item), items))
+        else:
+            results = [self.run_item(content_type, content_id) for content_type, content_id in items]
+        return sum(1 for result in results if result)
+    
+    def run_item(self, content_type: str, content_id: str) -> bool:
+        """Скачивание одной пары (тип, ID)"""
+        handler = self.handlers.get(content_type)
+        if not handler:
+            logger.error(f"Неизвестный тип контента: {content_type}")
+            return False
+        
+        downloader = self.downloader_factory() if self.downloader_factory else None
+        try:
+            return handler(content_id, downloader)
+        except Exception as e:
+            logger.error(f"Ошибка при обработке {content_type} {content_id}: {e}")
+            return False
+        finally:
+            if downloader:
+                downloader.finish()
+    
     # --- Основной метод обработки ---
     
     def process_input(self, user_input: str) -> Tuple[int, int]:
@@ -163,7 +306,7 @@ class UrlDispatcher:
             user_input: Строка с URL (одна или несколько, разделённых пробелами) или путь к файлу
             
         Returns:
-            Кортеж (успешно_обработано, всего_найдено)
+            Кортеж (успешно_обработано, всего_к_скачиванию)
             
         Examples:
             >>> dispatcher.process_input("https://play.qobuz.com/album/abc123")
@@ -187,34 +330,11 @@ class UrlDispatcher:
         
         logger.info(f"Найдено {len(urls)} URL для обработки")
         
-        success_count = 0
+        items = self.plan(urls)
+        success_count = self.dispatch(items)
         
-        # Обрабатываем каждый URL
-        for i, url in enumerate(urls, 1):
-            logger.info(f"[{i}/{len(urls)}] Обработка URL: {url}")
-            
-            url_info = get_url_info(url)
-            
-            if url_info:
-                content_type, content_id = url_info
-                
-                # Ищем подходящий обработчик в нашем словаре
-                handler = self.handlers.get(content_type)
-                
-                if handler:
-                    # Вызываем найденный обработчик, передавая ему ID
-                    try:
-                        if handler(content_id):
-                            success_count += 1
-                    except Exception as e:
-                        logger.error(f"Ошибка при обработке {content_type} {content_id}: {e}")
-                else:
-                    logger.error(f"Неизвестный тип контента: {content_type}")
-            else:
-                logger.warning(f"Строка не является распознаваемой ссылкой Qobuz: \"{url}\"")
-        
-        logger.info(f"Обработка завершена: {success_count}/{len(urls)} успешно")
-        return success_count, len(urls)
+        logger.info(f"Обработка завершена: {success_count}/{len(items)} успешно")
+        return success_count, len(items)
     
     def process_url(self, url: str) -> bool:
         """
@@ -232,15 +352,4 @@ class UrlDispatcher:
             logger.error(f"Невалидный URL: {url}")
             return False
         
-        content_type, content_id = url_info
-        handler = self.handlers.get(content_type)
-        
-        if not handler:
-            logger.error(f"Неподдерживаемый тип: {content_type}")
-            return False
-        
-        try:
-            return handler(content_id)
-        except Exception as e:
-            logger.error(f"Ошибка при обработке: {e}")
-            return False
+        return self.run_item(*url_info)
@@ -0,0 +1,190 @@
+"""
+Модуль для проверки целостности скачанных файлов
+Размер против content-length, структура FLAC (STREAMINFO, первый аудиокадр)
+и, если установлен flac, полное декодирование со сверкой MD5.
+Тяжёлые проверки выполняются в фоновом пуле потоков.
+"""
+import logging
+import shutil
+import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict
+
+from core.tracing import Tracer, STAGE_VERIFY, OUTCOME_ERROR
+
+
+logger = logging.getLogger(__name__)
+
+
+class VerificationError(Exception):
+    """Файл не прошёл проверку"""
+    pass
+
+
+class IncompleteDownloadError(VerificationError):
+    """Скачано меньше байт, чем заявлено в content-length"""
+    pass
+
+
+# Методы проверки (записываются в манифест)
+METHOD_SIZE = 'size'
+METHOD_STREAMINFO = 'streaminfo'
+METHOD_FLAC_MD5 = 'flac-md5'
+METHOD_MPEG = 'mpeg-sync'
+
+
+def check_size(path: Path, expected: int):
+    """Сверка размера файла с ожидаемым (content-length)"""
+    actual = path.stat().st_size
+    if expected and actual != expected:
+        raise IncompleteDownloadError(f"Размер {actual} байт вместо {expected}")
+
+
+def read_streaminfo(path: Path) -> Dict:
+    """
+    Разбор заголовка FLAC: STREAMINFO и смещение первого аудиокадра.
+
+    Raises:
+        VerificationError: если структура файла некорректна
+    """
+    with open(path, 'rb') as f:
+        if f.read(4) != b'fLaC':
+            raise VerificationError("Нет сигнатуры fLaC")
+
+        info = None
+        while True:
+            header = f.read(4)
+            if len(header) < 4:
+                raise VerificationError("Заголовок метаданных обрезан")
+            is_last = header[0] & 0x80
+            block_type = header[0] & 0x7F
+            length = int.from_bytes(header[1:4], 'big')
+
+            if block_type == 0:
+                data = f.read(length)
+                if length != 34 or len(data) != 34:
+                    raise VerificationError("Некорректный блок STREAMINFO")
+                packed = int.from_bytes(data[10:18], 'big')
+                info = {
+                    'sample_rate': packed >> 44,
+                    'channels': ((packed >> 41) & 0x7) + 1,
+                    'bits_per_sample': ((packed >> 36) & 0x1F) + 1,
+                    'total_samples': packed & 0xFFFFFFFFF,
+                    'md5': data[18:34].hex(),
+                }
+            elif block_type == 127:
+                raise VerificationError("Недопустимый тип блока метаданных")
+            else:
+                f.seek(length, 1)
+
+            if is_last:
+                break
+
+        if info is None:
+            raise VerificationError("Нет блока STREAMINFO")
+        if not info['sample_rate']:
+            raise VerificationError("Нулевая частота дискретизации")
+
+        info['audio_offset'] = f.tell()
+        sync = f.read(2)
+        # Синхрослово кадра FLAC: 0b11111111111110 + резерв + тип блокировки
+        if len(sync) < 2 or sync[0] != 0xFF or (sync[1] & 0xFE) != 0xF8:
+            raise VerificationError("Нет аудиокадров после метаданных")
+
+    return info
+
+
+def verify_mp3(path: Path) -> Dict:
+    """Проверка MP3: после ID3v2 должен начинаться кадр MPEG"""
+    with open(path, 'rb') as f:
+        head = f.read(10)
+        offset = 0
+        if head[:3] == b'ID3' and len(head) == 10:
+            size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+            offset = 10 + size + (10 if head[5] & 0x10 else 0)
+        f.seek(offset)
+        sync = f.read(2)
+    if len(sync) < 2 or sync[0] != 0xFF or (sync[1] & 0xE0) != 0xE0:
+        raise VerificationError("Нет кадра MPEG после тегов")
+    return {'method': METHOD_MPEG}
+
+
+def verify_flac(path: Path, decode: bool = True) -> Dict:
+    """
+    Проверка FLAC: структура заголовка, а при наличии утилиты flac -
+    полное декодирование со сверкой MD5 из STREAMINFO.
+    """
+    info = read_streaminfo(path)
+    result = {'method': METHOD_STREAMINFO, 'md5': info['md5'],
+              'sample_rate': info['sample_rate'], 'bits_per_sample': info['bits_per_sample']}
+
+    flac_bin = shutil.which('flac') if decode else None
+    if flac_bin and info['md5'] != '0' * 32:
+        proc = subprocess.run([flac_bin, '-t', '-s', str(path)], capture_output=True, timeout=600)
+        if proc.returncode != 0:
+            error = proc.stderr.decode('utf-8', 'replace').strip().splitlines()
+            raise VerificationError(f"flac -t: {error[-1] if error else proc.returncode}")
+        result['method'] = METHOD_FLAC_MD5
+    return result
+
+
+def verify_file(path: Path, decode: bool = True, suffix: str = None) -> Dict:
+    """
+    Проверка структуры файла (размер против content-length сверяется
+    ещё при скачивании - после записи тегов он уже другой).
+
+    Args:
+        suffix: тип файла, если по имени его не определить (.part в папке сборки)
+
+    Returns:
+        словарь: ok, method, error, size (+ md5 и параметры для FLAC)
+    """
+    path = Path(path)
+    result = {'ok': False, 'method': METHOD_SIZE, 'error': None}
+    try:
+        result['size'] = path.stat().st_size
+        suffix = (suffix or path.suffix).lower()
+        if suffix == '.flac':
+            result.update(verify_flac(path, decode))
+        elif suffix == '.mp3':
+            result.update(verify_mp3(path))
+        result['ok'] = True
+    except (VerificationError, OSError, subprocess.SubprocessError) as e:
+        result['error'] = str(e)
+    return result
+
+
+class Verifier:
+    """
+    Фоновый пул проверки файлов
+
+    Args:
+        workers: число потоков проверки
+        decode: полное декодирование FLAC (если есть утилита flac)
+        tracer: сборщик замеров (этап verify)
+    """
+
+    def __init__(self, workers: int = 2, decode: bool = True, tracer: Tracer = None):
+        self.decode = decode
+        self.tracer = tracer
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers),
+                                            thread_name_prefix='verify')
+
+    def submit(self, path: Path, track_id=None) -> Future:
+        """Постановка файла в очередь проверки (результат - словарь verify_file)"""
+        return self._executor.submit(self._run, Path(path), track_id)
+
+    def _run(self, path: Path, track_id=None) -> Dict:
+        span = self.tracer.start(STAGE_VERIFY, track_id) if self.tracer else None
+        result = verify_file(path, self.decode)
+        if span:
+            span.bytes = result.get('size', 0)
+            span.attrs['method'] = result['method']
+            self.tracer.finish(span, None if result['ok'] else OUTCOME_ERROR)
+        if not result['ok']:
+            logger.warning(f"Проверка не пройдена: {path} ({result['error']})")
+        return result
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
@@ -2,12 +2,31 @@
 Главное окно приложения Qobuz GUI Downloader
 """
 import os
+import logging
+from collections import deque
+from pathlib import Path
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                              QLineEdit, QPushButton, QTextEdit, QProgressBar,
-                              QLabel, QTabWidget, QStatusBar, QMessageBox)
-from PyQt6.QtCore import Qt, pyqtSignal, QThread
+                              QLineEdit, QPushButton, QPlainTextEdit, QProgressBar,
+                              QLabel, QTabWidget, QStatusBar, QMessageBox,
+                              QTableWidget, QTableWidgetItem, QHeaderView,
+                              QAbstractItemView, QFileDialog, QSplitter)
+from PyQt6.QtCore import Qt, pyqtSignal, QThread, QObject, QTimer
 from PyQt6.QtGui import QFont, QIcon
 from core.localization import t
+from core.cancel import CancelToken
+from core.diskspace import check_admission
+from core.progress import QueueProgress, format_eta, format_speed
+from core.job_queue import (JobQueue, JobScheduler, JOB_QUEUED, JOB_RUNNING, JOB_PAUSED,
+                            JOB_CANCELLING, JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+from core.url_dispatcher import UrlDispatcher, canonical_url, get_url_info, parse_sources
+
+
+logger = logging.getLogger(__name__)
+
+# Сколько строк лога хранит окно (старые удаляются; полный лог - в файле)
+LOG_MAX_LINES = 5000
+# Период вывода накопленных сообщений в окно, мс (примерно кадр)
+LOG_FLUSH_INTERVAL = 50
 
 
 def create_message_box(parent, icon, title, text, buttons, default_button=None):
@@ -45,19 +64,63 @@ def create_message_box(parent, icon, title, text, buttons, default_button=None):
     return msg
 
 
+class LogSink(QObject):
+    """
+    Вывод лога в окно пачками: рабочие потоки только кладут строки
+    в очередь (без сигнала на каждое сообщение), таймер GUI-потока
+    раз в LOG_FLUSH_INTERVAL добавляет накопленное одним вызовом.
+    Виджет хранит не больше LOG_MAX_LINES строк.
+    """
+    
+    def __init__(self, widget, max_lines=LOG_MAX_LINES, interval=LOG_FLUSH_INTERVAL):
+        super().__init__(widget)
+        self.widget = widget
+        self.widget.setMaximumBlockCount(max_lines)
+        # Больше, чем поместится в виджет, держать незачем
+        self._pending = deque(maxlen=max_lines)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start(interval)
+    
+    def push(self, message):
+        """Добавление сообщения (из любого потока)"""
+        self._pending.append(message)
+    
+    def flush(self):
+        """Вывод накопленных сообщений (GUI-поток)"""
+        if not self._pending:
+            return
+        lines = []
+        try:
+            while True:
+                lines.append(self._pending.popleft())
+        except IndexError:
+            pass
+        
+        # Прокручиваем вниз, только если пользователь не листает историю
+        scrollbar = self.widget.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+        self.widget.appendPlainText('\n'.join(lines))
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+
 class DownloadThread(QThread):
     """Поток для скачивания, чтобы не блокировать GUI"""
     progress_signal = pyqtSignal(int)
-    log_signal = pyqtSignal(str)
     finished_signal = pyqtSignal(bool, str)
+    throughput_signal = pyqtSignal(dict)  # Скорость и ETA (трек / задание / очередь)
     
-    def __init__(self, url, settings, qobuz_client):
+    def __init__(self, url, settings, qobuz_client, queue_progress=None, job_id=None,
+                 log_callback=None):
         super().__init__()
         self.url = url
+        self.job_id = job_id
+        self.log_callback = log_callback or (lambda message: None)
         self.settings = settings
         self.qobuz_client = qobuz_client
-        self._is_running = True
-        self._is_paused = False
+        self.queue_progress = queue_progress
+        self.token = CancelToken()
         
     def run(self):
         """Выполнение скачивания в фоновом потоке"""
@@ -69,13 +132,13 @@ class DownloadThread(QThread):
                 self.qobuz_client,
                 self.settings,
                 progress_callback=self.progress_signal.emit,
-                log_callback=self.log_signal.emit
+                log_callback=self.log_callback,
+                throughput_callback=self.throughput_signal.emit,
+                queue_progress=self.queue_progress,
+                cancel_token=self.token
             )
             
-            # Передаём ссылку на поток чтобы downloader мог проверять паузу
-            downloader._download_thread = self
-            
-            self.log_signal.emit(t('download_starting', url=self.url))
+            self.log_callback(t('download_starting', url=self.url))
             success = downloader.download_url(self.url)
             
             if success:
@@ -86,21 +149,118 @@ class DownloadThread(QThread):
         except Exception as e:
             self.finished_signal.emit(False, t('error_occurred', error=str(e)))
     
+    def set_paused(self, paused):
+        """Пауза/продолжение (действует внутри чтения файла)"""
+        if paused:
+            self.token.pause()
+        else:
+            self.token.resume()
+    
     def stop(self):
-        """Остановка потока"""
-        self._is_running = False
+        """Остановка потока: недокачанный файл остаётся в .part"""
+        self.token.cancel()
+
+
+class PlanThread(QThread):
+    """
+    Подготовка пакета ссылок в фоне: нормализация, удаление повторов
+    и треков из уже поставленных альбомов, оценка размера заданий
+    для проверки места (нужны запросы к API)
+    """
+    planned_signal = pyqtSignal(list, int, dict)  # канонические ссылки, всего на входе, оценки размера
+    
+    def __init__(self, urls, queued, qobuz_client, quality_index=None):
+        super().__init__()
+        self.urls = urls
+        self.queued = queued
+        self.qobuz_client = qobuz_client
+        self.quality_index = quality_index
+    
+    def run(self):
+        dispatcher = UrlDispatcher(client=self.qobuz_client)
+        try:
+            items = dispatcher.plan(self.urls, self.queued)
+        except Exception:
+            items = [info for info in map(get_url_info, self.urls) if info]
+        estimates = {}
+        if self.quality_index is not None:
+            sizes = dispatcher.estimate(items, self.quality_index)
+            estimates = {canonical_url(*item): size for item, size in sizes.items()}
+        self.planned_signal.emit([canonical_url(*item) for item in items], len(self.urls), estimates)
+
+
+class ApiBridge(QObject):
+    """
+    Контроллер для API управления (core.control_api) поверх очереди окна.
+    Запросы приходят из потоков HTTP-сервера и передаются в GUI-поток сигналами.
+    """
+    submit_signal = pyqtSignal(list)
+    pause_signal = pyqtSignal(str)
+    resume_signal = pyqtSignal(str)
+    cancel_signal = pyqtSignal(str)
+    
+    def __init__(self, window):
+        super().__init__()
+        self.window = window
+        self.queue = window.job_queue
+        self.submit_signal.connect(lambda sources: window.add_urls(parse_sources(sources)))
+        self.pause_signal.connect(window.pause_job)
+        self.resume_signal.connect(window.resume_job)
+        self.cancel_signal.connect(window.cancel_job)
+    
+    def submit(self, sources):
+        self.submit_signal.emit(list(sources))
+        return None  # задания появятся в очереди асинхронно
+    
+    def pause(self, job_id=None):
+        self.pause_signal.emit(job_id or '')
+    
+    def resume(self, job_id=None):
+        self.resume_signal.emit(job_id or '')
+    
+    def cancel(self, job_id):
+        job = self.queue.get(job_id)
+        if not job or job.is_finished:
+            return False
+        self.cancel_signal.emit(job_id)
+        return True
+    
+    def job_progress(self, job_id):
+        return dict(self.window.job_live_progress.get(job_id) or {})
 
 
 class MainWindow(QMainWindow):
     """Главное окно приложения"""
+    auth_failed_signal = pyqtSignal(str)  # фоновая авторизация не удалась
     
     def __init__(self, qobuz_client=None):
         super().__init__()
         self.qobuz_client = qobuz_client
-        self.download_thread = None
+        self.login_thread = None
+        self.pending_urls = []  # ссылки, добавленные до готовности клиента
+        self.pending_resume = False
+        self.download_threads = {}  # job_id -> DownloadThread
+        self.stopping_threads = []  # остановленные, ещё не завершившиеся потоки
         self.settings = None
         self.is_paused = False
+        self._closing = False
+        self.queue_progress = QueueProgress()
+        
+        # Очередь заданий (переживает перезапуск) и планировщик
+        config_dir = Path(__file__).parent.parent / "config"
+        self.job_queue = JobQueue(config_dir / "queue.json")
+        self.restored_jobs = self.job_queue.load()
+        self.scheduler = JobScheduler(self.job_queue, self.start_job,
+                                      admit_fn=lambda job: check_admission(self.settings, job))
+        self.job_rows = {}  # job_id -> строка таблицы
+        self.plan_threads = []
+        self.job_live_progress = {}  # job_id -> последнее событие прогресса по байтам
+        self.api_server = None
+        
         self.init_ui()
+        self.job_queue.add_listener(self.update_job_row)
+        for job in self.job_queue.jobs():
+            self.update_job_row(job)
         
     def init_ui(self):
         """Инициализация интерфейса"""
@@ -154,8 +314,13 @@ class MainWindow(QMainWindow):
         self.exit_btn.setMinimumWidth(100)
         self.exit_btn.clicked.connect(self.exit_app)
         
+        self.add_file_btn = QPushButton(t('add_file_button'))
+        self.add_file_btn.setMinimumWidth(110)
+        self.add_file_btn.clicked.connect(self.add_links_file)
+        
         url_layout.addWidget(url_label)
         url_layout.addWidget(self.url_input)
+        url_layout.addWidget(self.add_file_btn)
         url_layout.addWidget(self.download_btn)
         url_layout.addWidget(self.pause_btn)
         url_layout.addWidget(self.stop_btn)
@@ -173,19 +338,72 @@ class MainWindow(QMainWindow):
         self.progress_bar.setMaximum(100)
         self.progress_bar.setValue(0)
         
+        # Суммарная скорость и ETA очереди (трек каждого задания - в его строке таблицы)
+        self.throughput_label = QLabel("")
+        self.throughput_label.setMinimumWidth(240)
+        
         progress_layout.addWidget(progress_label)
         progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.throughput_label)
         
         main_layout.addLayout(progress_layout)
         
+        # Очередь заданий: строка на задание
+        queue_widget = QWidget()
+        queue_layout = QVBoxLayout()
+        queue_layout.setContentsMargins(0, 0, 0, 0)
+        queue_widget.setLayout(queue_layout)
+        
+        queue_header = QHBoxLayout()
+        queue_header.addWidget(QLabel(t('queue_label')))
+        queue_header.addStretch()
+        self.remove_job_btn = QPushButton(t('remove_job_button'))
+        self.remove_job_btn.clicked.connect(self.remove_selected_jobs)
+        self.clear_finished_btn = QPushButton(t('clear_finished_button'))
+        self.clear_finished_btn.clicked.connect(self.clear_finished_jobs)
+        queue_header.addWidget(self.remove_job_btn)
+        queue_header.addWidget(self.clear_finished_btn)
+        queue_layout.addLayout(queue_header)
+        
+        self.queue_table = QTableWidget(0, 5)
+        self.queue_table.setHorizontalHeaderLabels([
+            t('queue_col_url'), t('queue_col_status'),
+            t('queue_col_progress'), t('queue_col_track'), t('queue_col_message'),
+        ])
+        header = self.queue_table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(2, QHeaderView.ResizeMode.Fixed)
+        header.setSectionResizeMode(3, QHeaderView.ResizeMode.Fixed)
+        header.setSectionResizeMode(4, QHeaderView.ResizeMode.Stretch)
+        self.queue_table.setColumnWidth(2, 140)
+        self.queue_table.setColumnWidth(3, 220)
+        self.queue_table.verticalHeader().setVisible(False)
+        self.queue_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.queue_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        # Двойной клик по завершённому заданию - поставить заново
+        self.queue_table.cellDoubleClicked.connect(self.retry_job_at_row)
+        queue_layout.addWidget(self.queue_table)
+        
         # Область логов
+        log_widget = QWidget()
+        log_layout = QVBoxLayout()
+        log_layout.setContentsMargins(0, 0, 0, 0)
+        log_widget.setLayout(log_layout)
+        
         log_label = QLabel(t('log_label'))
-        main_layout.addWidget(log_label)
+        log_layout.addWidget(log_label)
         
-        self.log_text = QTextEdit()
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
         self.log_text.setFont(QFont("Consolas", 9))
-        main_layout.addWidget(self.log_text)
+        log_layout.addWidget(self.log_text)
+        self.log_sink = LogSink(self.log_text)
+        
+        splitter = QSplitter(Qt.Orientation.Vertical)
+        splitter.addWidget(queue_widget)
+        splitter.addWidget(log_widget)
+        main_layout.addWidget(splitter)
         
         # Статусная строка
         self.statusBar = QStatusBar()
@@ -231,7 +449,7 @@ class MainWindow(QMainWindow):
             background-color: #cccccc;
             color: #666666;
         }
-        QTextEdit {
+        QPlainTextEdit {
             border: 2px solid #ddd;
             border-radius: 4px;
             padding: 8px;
@@ -252,33 +470,233 @@ class MainWindow(QMainWindow):
             font-size: 12px;
             color: #333;
         }
+        QTableWidget {
+            border: 2px solid #ddd;
+            border-radius: 4px;
+            background-color: #ffffff;
+            color: #000000;
+        }
         """
         self.setStyleSheet(style)
         
     def set_settings(self, settings):
         """Установка настроек"""
         self.settings = settings
+        self.scheduler.set_max_parallel(settings.get('max_parallel_downloads', 2))
+        if settings.get('api_enable', False) and self.api_server is None:
+            self.start_api_server()
+        if self.restored_jobs:
+            self.log(t('queue_restored', count=self.restored_jobs))
+            self.restored_jobs = 0
+        
+    def start_authentication(self, email, password):
+        """
+        Авторизация в фоне (LoginThread): окно уже показано,
+        ссылки копятся до готовности клиента и ставятся в очередь после входа
+        """
+        from gui.login_window import LoginThread
+        
+        self.log(t('auth_in_progress'))
+        self.statusBar.showMessage(t('login_authenticating'))
+        self.login_thread = LoginThread(email, password)
+        self.login_thread.success_signal.connect(self.set_client)
+        self.login_thread.error_signal.connect(self.auth_failed_signal.emit)
+        self.login_thread.start()
+    
+    def is_authenticating(self):
+        return self.login_thread is not None and self.login_thread.isRunning()
+    
+    def set_client(self, client):
+        """Клиент готов: ставим отложенные ссылки и продолжаем очередь"""
+        self.qobuz_client = client
+        self.log(t('auth_ready', label=client.label))
+        self.statusBar.showMessage(t('status_ready'))
         
+        urls, self.pending_urls = self.pending_urls, []
+        resume, self.pending_resume = self.pending_resume, False
+        if urls:
+            self.add_urls(urls)  # постановка сама продолжит очередь
+        elif resume:
+            self.resume_queue()
+    
+    def start_api_server(self):
+        """Запуск локального HTTP API управления очередью"""
+        from core.control_api import ControlApiServer
+        try:
+            self.api_server = ControlApiServer(
+                ApiBridge(self),
+                host=self.settings.get('api_host', '127.0.0.1'),
+                port=self.settings.get('api_port', 8765),
+                token=self.settings.get('api_token') or None,
+            )
+            self.api_server.start()
+            self.log(t('api_started', url=self.api_server.url))
+            if self.api_server.token_generated:
+                self.log(t('api_token_generated', token=self.api_server.token))
+        except OSError as e:
+            self.api_server = None
+            self.log(t('api_error', error=str(e)))
+    
     def log(self, message):
-        """Добавление сообщения в лог"""
-        self.log_text.append(message)
-        # Прокрутка вниз
-        scrollbar = self.log_text.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
+        """Добавление сообщения в лог (появится в окне со следующей пачкой)"""
+        logger.info(message)
+        self.log_sink.push(message)
         
     def update_progress(self, value):
-        """Обновление прогресс-бара"""
+        """Обновление общего прогресса очереди (среднее по заданиям)"""
         self.progress_bar.setValue(value)
+    
+    def update_job_progress(self, job_id, value):
+        """Прогресс одного задания"""
+        self.job_queue.update(job_id, save=False, progress=value)
+    
+    def update_job_row(self, job):
+        """Обновление строки задания в таблице (слушатель очереди)"""
+        row = self.job_rows.get(job.id)
+        if row is None:
+            row = self.queue_table.rowCount()
+            self.queue_table.insertRow(row)
+            self.job_rows[job.id] = row
+            url_item = QTableWidgetItem(job.url)
+            url_item.setData(Qt.ItemDataRole.UserRole, job.id)
+            self.queue_table.setItem(row, 0, url_item)
+            self.queue_table.setItem(row, 1, QTableWidgetItem())
+            bar = QProgressBar()
+            bar.setRange(0, 100)
+            self.queue_table.setCellWidget(row, 2, bar)
+            track_bar = QProgressBar()
+            track_bar.setRange(0, 100)
+            track_bar.setFormat("")
+            self.queue_table.setCellWidget(row, 3, track_bar)
+            self.queue_table.setItem(row, 4, QTableWidgetItem())
+        
+        self.queue_table.item(row, 1).setText(t(f'job_status_{job.status}'))
+        self.queue_table.cellWidget(row, 2).setValue(job.progress)
+        if job.is_finished:
+            self.update_job_track(job.id, None)
+        self.queue_table.item(row, 4).setText(job.message)
+        self.update_queue_summary()
+    
+    def update_job_track(self, job_id, data):
+        """Прогресс текущего трека задания - в его строке (None - трека нет)"""
+        row = self.job_rows.get(job_id)
+        if row is None:
+            return
+        bar = self.queue_table.cellWidget(row, 3)
+        percent = data.get('track_percent') if data else None
+        if percent is None:
+            bar.setValue(0)
+            bar.setFormat("")
+            return
+        bar.setValue(percent)
+        bar.setFormat(t(
+            'track_row_status',
+            speed=format_speed(data.get('track_speed', 0.0)),
+            eta=format_eta(data.get('track_eta')),
+        ))
+    
+    def rebuild_queue_table(self):
+        """Полная перерисовка таблицы (после удаления заданий)"""
+        self.queue_table.setRowCount(0)
+        self.job_rows.clear()
+        for job in self.job_queue.jobs():
+            self.update_job_row(job)
+        self.update_queue_summary()
+    
+    def update_queue_summary(self):
+        """Общий прогресс, статусная строка и состояние кнопок"""
+        jobs = self.job_queue.jobs()
+        if jobs:
+            self.progress_bar.setValue(int(sum(job.progress for job in jobs) / len(jobs)))
+        else:
+            self.progress_bar.setValue(0)
+        
+        counts = {status: 0 for status in (JOB_QUEUED, JOB_RUNNING, JOB_PAUSED, JOB_CANCELLING,
+                                           JOB_DONE, JOB_FAILED, JOB_CANCELLED)}
+        for job in jobs:
+            counts[job.status] += 1
+        active = counts[JOB_RUNNING] + counts[JOB_PAUSED]
+        
+        self.pause_btn.setEnabled(active > 0)
+        self.stop_btn.setEnabled(active > 0)
+        if active:
+            self.statusBar.showMessage(t(
+                'queue_status',
+                running=active,
+                queued=counts[JOB_QUEUED],
+                done=counts[JOB_DONE],
+                failed=counts[JOB_FAILED] + counts[JOB_CANCELLED],
+            ))
+    
+    def update_throughput(self, data):
+        """Суммарная скорость и ETA очереди (из события любого задания)"""
+        self.throughput_label.setText(t(
+            'throughput_status',
+            speed=format_speed(data.get('queue_speed', data.get('job_speed', 0.0))),
+            queue_eta=format_eta(data.get('queue_eta', data.get('job_eta'))),
+        ))
         
     def start_download(self):
-        """Начало процесса скачивания"""
-        url = self.url_input.text().strip()
+        """Добавление ссылок из поля ввода в очередь"""
+        text = self.url_input.text().strip()
         
-        if not url:
+        if not text:
+            # Пустой ввод - продолжаем остановленную очередь, если в ней что-то есть
+            if self.job_queue.next_queued():
+                self.resume_queue()
+                return
             self.log(t('error_no_url'))
             self.statusBar.showMessage(t('error_no_url'))
             return
-            
+        
+        self.add_urls(parse_sources(text.split()))
+        self.url_input.clear()
+    
+    def add_links_file(self):
+        """Добавление в очередь ссылок из текстового файла"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, t('open_links_file'), "", "Text files (*.txt);;All files (*)"
+        )
+        if path:
+            self.add_urls(parse_sources([path]))
+    
+    def add_urls(self, urls):
+        """Подготовка пакета ссылок в фоне (PlanThread) с постановкой в очередь"""
+        if not urls:
+            self.log(t('error_no_url'))
+            return
+        # Без клиента нельзя проверить треки по альбомам - ждём авторизацию
+        if not self.qobuz_client and self.is_authenticating():
+            self.pending_urls.extend(urls)
+            self.log(t('auth_pending_links', count=len(self.pending_urls)))
+            return
+        # Незавершённые задания очереди - чтобы не поставить их повторно
+        queued = [get_url_info(job.url) for job in self.job_queue.jobs() if not job.is_finished]
+        check_space = self.settings and self.settings.get('disk_space_check', True)
+        plan_thread = PlanThread(urls, [info for info in queued if info], self.qobuz_client,
+                                 self.settings.get('quality_index', 1) if check_space else None)
+        plan_thread.planned_signal.connect(self.queue_planned)
+        plan_thread.finished.connect(lambda: self.plan_threads.remove(plan_thread))
+        self.plan_threads.append(plan_thread)
+        plan_thread.start()
+    
+    def queue_planned(self, urls, total, estimates):
+        """Пакет подготовлен: ставим в очередь то, что осталось"""
+        if total > len(urls):
+            self.log(t('jobs_skipped', count=total - len(urls)))
+        if not urls:
+            return
+        jobs = self.job_queue.add_many(urls, estimates)
+        self.log(t('jobs_added', count=len(jobs)))
+        self.resume_queue()
+    
+    def resume_queue(self):
+        """Запуск ожидающих заданий"""
+        if not self.qobuz_client and self.is_authenticating():
+            self.pending_resume = True
+            self.statusBar.showMessage(t('login_authenticating'))
+            return
+        
         if not self.qobuz_client:
             self.log(t('error_no_auth'))
             self.statusBar.showMessage(t('error_no_auth'))
@@ -289,48 +707,141 @@ class MainWindow(QMainWindow):
             self.statusBar.showMessage(t('error_no_settings'))
             return
         
-        # Отключаем кнопку скачивания, включаем управление
-        self.download_btn.setEnabled(False)
-        self.download_btn.setText(t('downloading'))
-        self.pause_btn.setEnabled(True)
-        self.stop_btn.setEnabled(True)
-        self.is_paused = False
-        self.progress_bar.setValue(0)
-        self.statusBar.showMessage(t('status_downloading'))
+        self.scheduler.paused = False
+        self.scheduler.pump()
+    
+    def start_job(self, job):
+        """Запуск задания в отдельном потоке (вызывается планировщиком)"""
+        thread = DownloadThread(job.url, self.settings, self.qobuz_client,
+                                self.queue_progress, job_id=job.id,
+                                log_callback=self.log_sink.push)
+        thread.progress_signal.connect(lambda value, job_id=job.id: self.update_job_progress(job_id, value))
+        thread.throughput_signal.connect(self.update_throughput)
+        thread.throughput_signal.connect(
+            lambda data, job_id=job.id: self.job_live_progress.__setitem__(job_id, data)
+        )
+        thread.throughput_signal.connect(
+            lambda data, job_id=job.id: self.update_job_track(job_id, data)
+        )
+        thread.finished_signal.connect(
+            lambda success, message, job_id=job.id: self.job_finished(job_id, success, message)
+        )
+        self.download_threads[job.id] = thread
+        self.update_job_track(job.id, None)
+        thread.start()
+    
+    def job_finished(self, job_id, success, message):
+        """Обработка завершения задания"""
+        self.download_threads.pop(job_id, None)
+        self.job_live_progress.pop(job_id, None)
+        if self._closing:
+            return
         
-        # Очищаем лог
-        self.log_text.clear()
+        job = self.job_queue.get(job_id)
+        # Отменяемое задание получит статус и освободит место после выхода потока (cancel_thread)
+        if job is not None and job.status == JOB_CANCELLING:
+            return
+        # Отменённое/удалённое задание уже получило свой статус
+        if job is None or job.status not in (JOB_RUNNING, JOB_PAUSED):
+            self.scheduler.pump()
+            return
+        
+        self.log(f"\n{'✓' if success else '✗'} {message}: {job.url}")
+        self.scheduler.job_finished(job_id, success, message)
         
-        # Создаем и запускаем поток скачивания
-        self.download_thread = DownloadThread(url, self.settings, self.qobuz_client)
-        self.download_thread.progress_signal.connect(self.update_progress)
-        self.download_thread.log_signal.connect(self.log)
-        self.download_thread.finished_signal.connect(self.download_finished)
-        self.download_thread.start()
+        if not self.download_threads:
+            self.download_finished(success, message)
     
     def toggle_pause(self):
-        """Переключение паузы/возобновления"""
-        if not self.download_thread or not self.download_thread.isRunning():
+        """Переключение паузы/возобновления всех работающих заданий"""
+        if not self.download_threads:
             return
         
+        self.is_paused = not self.is_paused
+        # На паузе новые задания из очереди тоже не стартуют
+        self.scheduler.paused = self.is_paused
+        status = JOB_PAUSED if self.is_paused else JOB_RUNNING
+        for job_id, thread in self.download_threads.items():
+            thread.set_paused(self.is_paused)
+            self.job_queue.update(job_id, save=False, status=status)
+        
         if self.is_paused:
-            # Возобновить
-            self.download_thread._is_paused = False
+            self.pause_btn.setText(t('resume_button'))
+            self.log(t('status_paused'))
+            self.statusBar.showMessage(t('status_paused'))
+        else:
             self.pause_btn.setText(t('pause_button'))
-            self.is_paused = False
             self.log(t('status_resumed'))
             self.statusBar.showMessage(t('status_downloading'))
+            self.scheduler.pump()
+    
+    def pause_job(self, job_id):
+        """Пауза одного задания (пустой job_id - всей очереди)"""
+        if not job_id:
+            if not self.is_paused:
+                self.toggle_pause()
+            return
+        thread = self.download_threads.get(job_id)
+        if thread:
+            thread.set_paused(True)
+            self.job_queue.update(job_id, save=False, status=JOB_PAUSED)
+    
+    def resume_job(self, job_id):
+        """Продолжение одного задания (пустой job_id - всей очереди)"""
+        if not job_id:
+            if self.is_paused:
+                self.toggle_pause()
+            else:
+                self.resume_queue()
+            return
+        thread = self.download_threads.get(job_id)
+        if thread:
+            thread.set_paused(False)
+            self.job_queue.update(job_id, save=False, status=JOB_RUNNING)
+    
+    def cancel_job(self, job_id):
+        """Отмена одного задания (работающее останавливается)"""
+        job = self.job_queue.get(job_id)
+        if not job or job.is_finished:
+            return
+        thread = self.download_threads.get(job_id)
+        if thread:
+            self.cancel_thread(job_id, thread)
         else:
-            # Пауза
-            self.download_thread._is_paused = True
-            self.pause_btn.setText(t('resume_button'))
-            self.is_paused = True
-            self.log(t('status_paused'))
-            self.statusBar.showMessage(t('status_paused'))
+            self.scheduler.cancel_queued(job_id, t('download_stopped'))
+    
+    def cancel_thread(self, job_id, thread):
+        """
+        Отмена работающего задания: до выхода потока оно в статусе cancelling
+        и занимает место в планировщике, статус cancelled и запуск следующих -
+        по сигналу finished потока
+        """
+        self.download_threads.pop(job_id, None)
+        self.job_queue.update(job_id, save=False, status=JOB_CANCELLING, message=t('status_stopping'))
+        
+        def finished():
+            job = self.job_queue.get(job_id)
+            if job is not None and job.status == JOB_CANCELLING:
+                self.scheduler.job_finished(job_id, False, t('download_stopped'), cancelled=True)
+        
+        thread.finished.connect(finished)
+        self.stop_thread(thread)
+        if not thread.isRunning():
+            finished()
+    
+    def stop_thread(self, thread):
+        """
+        Остановка потока задания без ожидания: поток выходит сам
+        на ближайшей точке проверки, недокачанное остаётся в .part
+        """
+        thread.stop()
+        if thread.isRunning():
+            self.stopping_threads.append(thread)
+            thread.finished.connect(lambda: self.stopping_threads.remove(thread))
     
     def stop_download(self):
-        """Остановка скачивания"""
-        if not self.download_thread or not self.download_thread.isRunning():
+        """Остановка всех работающих заданий (ожидающие остаются в очереди)"""
+        if not self.download_threads:
             return
         
         msg = create_message_box(
@@ -344,18 +855,50 @@ class MainWindow(QMainWindow):
         
         if reply == QMessageBox.StandardButton.Yes:
             self.log(t('status_stopping'))
-            self.download_thread.stop()
-            self.download_thread.wait(3000)  # Ждём 3 секунды
-            if self.download_thread.isRunning():
-                self.download_thread.terminate()  # Принудительная остановка
+            self.scheduler.paused = True
+            for job_id, thread in list(self.download_threads.items()):
+                self.cancel_thread(job_id, thread)
             
             self.download_finished(False, t('download_stopped'))
     
+    def remove_selected_jobs(self):
+        """Удаление выбранных заданий (работающие останавливаются)"""
+        rows = {index.row() for index in self.queue_table.selectedIndexes()}
+        if not rows:
+            return
+        stopped = False
+        for row in rows:
+            job_id = self.queue_table.item(row, 0).data(Qt.ItemDataRole.UserRole)
+            thread = self.download_threads.get(job_id)
+            self.job_queue.remove(job_id)
+            if thread:
+                # Следующие задания - только после выхода потока удалённого
+                thread.finished.connect(self.scheduler.pump)
+                self.stop_thread(thread)
+                self.download_threads.pop(job_id, None)
+                stopped = stopped or thread.isRunning()
+        self.rebuild_queue_table()
+        if not stopped:
+            self.scheduler.pump()
+    
+    def clear_finished_jobs(self):
+        """Удаление завершённых заданий из очереди"""
+        if self.job_queue.clear_finished():
+            self.rebuild_queue_table()
+    
+    def retry_job_at_row(self, row, column):
+        """Повторная постановка завершённого задания"""
+        item = self.queue_table.item(row, 0)
+        job = self.job_queue.get(item.data(Qt.ItemDataRole.UserRole)) if item else None
+        if job and job.is_finished:
+            self.job_queue.requeue(job.id)
+            self.resume_queue()
+    
     def exit_app(self):
         """Выход из приложения"""
         
         # Проверяем, идёт ли скачивание
-        if self.download_thread and self.download_thread.isRunning():
+        if self.download_threads:
             msg = create_message_box(
                 self,
                 QMessageBox.Icon.Question,
@@ -367,33 +910,18 @@ class MainWindow(QMainWindow):
             
             if reply == QMessageBox.StandardButton.No:
                 return
-            
-            # Останавливаем скачивание
-            self.download_thread.stop()
-            self.download_thread.wait(2000)
-            if self.download_thread.isRunning():
-                self.download_thread.terminate()
         
         self.close()
         
     def download_finished(self, success, message):
-        """Обработка завершения скачивания"""
-        self.download_btn.setEnabled(True)
-        self.download_btn.setText(t('download_button'))
+        """Очередь опустела: возвращаем кнопки в исходное состояние"""
         self.pause_btn.setEnabled(False)
         self.pause_btn.setText(t('pause_button'))
         self.stop_btn.setEnabled(False)
         self.is_paused = False
         
-        if success:
-            self.log(f"\n✓ {message}")
+        if not self.download_threads:
             self.statusBar.showMessage(message)
-            self.progress_bar.setValue(100)
-        else:
-            self.log(f"\n✗ {message}")
-            self.statusBar.showMessage(message)
-            
-        self.download_thread = None
         
     def open_settings(self):
         """Открытие окна настроек"""
@@ -402,6 +930,7 @@ class MainWindow(QMainWindow):
         settings_window = SettingsWindow(self.settings, self)
         if settings_window.exec():
             self.settings = settings_window.get_settings()
+            self.scheduler.set_max_parallel(self.settings.get('max_parallel_downloads', 2))
             self.log(t('settings_updated'))
             # Сохраняем настройки сразу
             self.save_settings_to_file()
@@ -476,7 +1005,19 @@ class MainWindow(QMainWindow):
             
     def closeEvent(self, event):
         """Обработка закрытия окна"""
-        if self.download_thread and self.download_thread.isRunning():
-            self.download_thread.stop()
-            self.download_thread.wait()
+        # Работающие задания остаются в очереди со статусом running -
+        # при следующем запуске они снова станут в очередь
+        self._closing = True
+        if self.is_authenticating():
+            # Поток авторизации нельзя уничтожить на ходу
+            self.login_thread.success_signal.disconnect()
+            self.login_thread.error_signal.disconnect()
+            self.login_thread.wait()
+        if self.api_server:
+            self.api_server.stop()
+        for thread in list(self.download_threads.values()):
+            thread.stop()
+        for thread in list(self.download_threads.values()) + self.stopping_threads:
+            thread.wait()
+        self.job_queue.save()
         event.accept()
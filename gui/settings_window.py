@@ -3,9 +3,11 @@
 """
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTabWidget,
                               QWidget, QLabel, QLineEdit, QPushButton, QCheckBox,
-                              QComboBox, QGroupBox, QFileDialog, QScrollArea)
+                              QComboBox, QGroupBox, QFileDialog, QScrollArea, QSpinBox)
 from PyQt6.QtCore import Qt
 
+from core.naming import compile_folder_template, compile_file_template, TemplateError
+
 
 class SettingsWindow(QDialog):
     """Окно настроек приложения"""
@@ -16,6 +18,7 @@ class SettingsWindow(QDialog):
         self.init_ui()
         self.load_settings()
         self.connect_auto_save()  # Подключаем автосохранение
+        self.validate_templates()
         
     def init_ui(self):
         """Инициализация интерфейса"""
@@ -113,8 +116,19 @@ class SettingsWindow(QDialog):
         self.create_playlist = QCheckBox("Создавать M3U плейлист")
         self.create_playlist.setChecked(False)
         
+        # Сколько заданий очереди скачивается одновременно
+        parallel_layout = QHBoxLayout()
+        parallel_label = QLabel("Одновременных заданий в очереди:")
+        self.max_parallel_downloads = QSpinBox()
+        self.max_parallel_downloads.setRange(1, 8)
+        self.max_parallel_downloads.setValue(2)
+        parallel_layout.addWidget(parallel_label)
+        parallel_layout.addWidget(self.max_parallel_downloads)
+        parallel_layout.addStretch()
+        
         options_layout.addWidget(self.download_cover)
         options_layout.addWidget(self.create_playlist)
+        options_layout.addLayout(parallel_layout)
         options_group.setLayout(options_layout)
         
         layout.addWidget(options_group)
@@ -146,6 +160,13 @@ class SettingsWindow(QDialog):
         templates_layout.addWidget(self.folder_template)
         templates_layout.addWidget(file_label)
         templates_layout.addWidget(self.file_template)
+        
+        # Ошибка в шаблоне - сразу, а не при скачивании
+        self.template_error = QLabel()
+        self.template_error.setWordWrap(True)
+        self.template_error.setStyleSheet("color: #c00000;")
+        self.template_error.hide()
+        templates_layout.addWidget(self.template_error)
         templates_group.setLayout(templates_layout)
         
         layout.addWidget(templates_group)
@@ -329,6 +350,18 @@ class SettingsWindow(QDialog):
         self.lyrics_prefer_synced.setEnabled(enabled)
         self.lyrics_fallback.setEnabled(enabled)
         
+    def validate_templates(self):
+        """Проверка шаблонов именования (ошибка показывается под полями)"""
+        errors = []
+        for widget, compile_fn in ((self.folder_template, compile_folder_template),
+                                   (self.file_template, compile_file_template)):
+            try:
+                compile_fn(widget.text())
+            except TemplateError as e:
+                errors.append(str(e))
+        self.template_error.setText("\n".join(errors))
+        self.template_error.setVisible(bool(errors))
+    
     def browse_folder(self):
         """Выбор папки для сохранения"""
         folder = QFileDialog.getExistingDirectory(self, "Выберите папку для сохранения")
@@ -343,6 +376,7 @@ class SettingsWindow(QDialog):
         self.quality_combo.setCurrentIndex(quality_index)
         self.download_cover.setChecked(self.settings.get('download_cover', True))
         self.create_playlist.setChecked(self.settings.get('create_playlist', False))
+        self.max_parallel_downloads.setValue(self.settings.get('max_parallel_downloads', 2))
         
         # Именование
         self.folder_template.setText(self.settings.get('folder_template', '%artist% - %album% (%year%)'))
@@ -375,12 +409,15 @@ class SettingsWindow(QDialog):
         
     def get_settings(self):
         """Получение настроек из UI"""
-        return {
+        # Настройки без виджетов (trace_file и т.п.) сохраняются как есть
+        settings = dict(self.settings)
+        settings.update({
             # Скачивание
             'download_folder': self.download_folder.text(),
             'quality_index': self.quality_combo.currentIndex(),
             'download_cover': self.download_cover.isChecked(),
             'create_playlist': self.create_playlist.isChecked(),
+            'max_parallel_downloads': self.max_parallel_downloads.value(),
             
             # Именование
             'folder_template': self.folder_template.text(),
@@ -410,7 +447,8 @@ class SettingsWindow(QDialog):
             'lyrics_save_txt': self.lyrics_save_txt.isChecked(),
             'lyrics_prefer_synced': self.lyrics_prefer_synced.isChecked(),
             'lyrics_fallback': self.lyrics_fallback.isChecked(),
-        }
+        })
+        return settings
     
     def connect_auto_save(self):
         """Подключение автосохранения для всех виджетов"""
@@ -418,9 +456,12 @@ class SettingsWindow(QDialog):
         self.download_folder.textChanged.connect(self.auto_save)
         self.folder_template.textChanged.connect(self.auto_save)
         self.file_template.textChanged.connect(self.auto_save)
+        self.folder_template.textChanged.connect(self.validate_templates)
+        self.file_template.textChanged.connect(self.validate_templates)
         
-        # QComboBox
+        # QComboBox / QSpinBox
         self.quality_combo.currentIndexChanged.connect(self.auto_save)
+        self.max_parallel_downloads.valueChanged.connect(self.auto_save)
         
         # QCheckBox
         self.download_cover.stateChanged.connect(self.auto_save)
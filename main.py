@@ -3,179 +3,30 @@ Qobuz GUI Downloader
 Главный файл приложения
 """
 import sys
-import json
-import base64
 import logging
 from pathlib import Path
-from PyQt6.QtWidgets import QApplication, QMessageBox
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QIcon
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('qobuz_downloader.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+from core.config import ConfigManager
+from core.localization import t
+from core.log_setup import setup_logging_from_settings
 
 logger = logging.getLogger(__name__)
 
 
-class ConfigManager:
-    """Менеджер конфигурации приложения"""
-    
-    def __init__(self):
-        # Определяем папку программы (работает и для .py и для .exe)
-        if getattr(sys, 'frozen', False):
-            # Если запущен как EXE (PyInstaller)
-            app_dir = Path(sys.executable).parent
-        else:
-            # Если запущен как скрипт .py
-            app_dir = Path(__file__).parent
-        
-        self.config_dir = app_dir / "config"
-        self.config_dir.mkdir(exist_ok=True)
-        
-        self.credentials_file = self.config_dir / "credentials.json"
-        self.settings_file = self.config_dir / "settings.json"
-    
-    def load_credentials(self):
-        """Загрузка учетных данных"""
-        if not self.credentials_file.exists():
-            return None, None
-        
-        try:
-            with open(self.credentials_file, 'r') as f:
-                data = json.load(f)
-                email = data.get('email')
-                encrypted_password = data.get('password')
-                
-                if email and encrypted_password:
-                    # Расшифровываем пароль
-                    password = base64.b64decode(encrypted_password.encode()).decode()
-                    return email, password
-        except Exception as e:
-            logger.error(f"Ошибка при загрузке учетных данных: {e}")
-        
-        return None, None
-    
-    def save_credentials(self, email, password):
-        """Сохранение учетных данных"""
-        try:
-            # Шифруем пароль
-            encrypted_password = base64.b64encode(password.encode()).decode()
-            
-            credentials = {
-                "email": email,
-                "password": encrypted_password
-            }
-            
-            with open(self.credentials_file, 'w') as f:
-                json.dump(credentials, f, indent=2)
-            
-            logger.info("✓ Учетные данные сохранены")
-            return True
-        except Exception as e:
-            logger.error(f"Ошибка при сохранении учетных данных: {e}")
-            return False
-    
-    def delete_credentials(self):
-        """Удаление учетных данных"""
-        try:
-            if self.credentials_file.exists():
-                self.credentials_file.unlink()
-                logger.info("✓ Учетные данные удалены")
-            return True
-        except Exception as e:
-            logger.error(f"Ошибка при удалении учетных данных: {e}")
-            return False
-    
-    def load_settings(self):
-        """Загрузка настроек"""
-        if not self.settings_file.exists():
-            return self.get_default_settings()
-        
-        try:
-            with open(self.settings_file, 'r', encoding='utf-8') as f:
-                settings = json.load(f)
-                # Дополняем недостающие значения по умолчанию
-                default = self.get_default_settings()
-                for key, value in default.items():
-                    if key not in settings:
-                        settings[key] = value
-                return settings
-        except Exception as e:
-            logger.error(f"Ошибка при загрузке настроек: {e}")
-            return self.get_default_settings()
+def main():
+    """Главная функция"""
+    # PyQt6 импортируется здесь, а не при загрузке модуля: импорт main.py
+    # (сборка, инструменты, бенчмарк запуска) не тянет Qt
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtGui import QIcon
     
-    def save_settings(self, settings):
-        """Сохранение настроек"""
-        try:
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, indent=2, ensure_ascii=False)
-            return True
-        except Exception as e:
-            logger.error(f"Ошибка при сохранении настроек: {e}")
-            return False
+    # Менеджер конфигурации
+    config = ConfigManager()
     
-    def get_default_settings(self):
-        """Настройки по умолчанию"""
-        downloads_folder = str(Path.home() / "Music" / "Qobuz Downloads")
-        
-        return {
-            # Скачивание
-            'download_folder': downloads_folder,
-            'quality_index': 1,  # FLAC 16/44.1
-            'download_cover': True,
-            'create_playlist': False,
-            
-            # Именование
-            'folder_template': '{artist} - {album} ({year})',
-            'file_template': '{tracknumber}. {artist} - {title}',
-            
-            # Метаданные - основные
-            'tag_title': True,
-            'tag_artist': True,
-            'tag_album': True,
-            'tag_tracknumber': True,
-            'tag_year': True,
-            'tag_genre': True,
-            
-            # Метаданные - расширенные
-            'tag_upc': True,
-            'tag_isrc': True,
-            'tag_copyright': True,
-            'tag_label': True,
-            'tag_release_type': True,
-            'tag_explicit': True,
-            'tag_composer': True,
-            
-            # Тексты песен
-            'lyrics_enable': True,
-            'lyrics_save_lrc': True,
-            'lyrics_save_srt': False,
-            'lyrics_save_txt': False,
-            'lyrics_prefer_synced': True,
-            'lyrics_fallback': True,
-        }
+    # Загружаем настройки
+    settings = config.load_settings()
     
-    def delete_credentials(self):
-        """Удаление сохранённых учетных данных"""
-        try:
-            if self.credentials_file.exists():
-                self.credentials_file.unlink()
-                logger.info("Учетные данные удалены")
-                return True
-        except Exception as e:
-            logger.error(f"Ошибка при удалении учетных данных: {e}")
-        return False
-
-
-def main():
-    """Главная функция"""
+    # Логирование: файл с ротацией, запись в фоновом потоке
+    setup_logging_from_settings(settings)
     
     # Windows: установка App User Model ID для отдельной иконки в панели задач
     import platform
@@ -209,61 +60,48 @@ def main():
     # Настраиваем стиль
     app.setStyle("Fusion")
     
-    # Менеджер конфигурации
-    config = ConfigManager()
-    
-    # Загружаем настройки
-    settings = config.load_settings()
-    
     # Проверяем учетные данные
     email, password = config.load_credentials()
     
-    qobuz_client = None
+    from gui.main_window import MainWindow
     
     if email and password:
-        # Пытаемся авторизоваться
-        try:
-            from gui.login_window import LoginWindow
-            from core.qobuz_api import get_qobuz_client
-            
-            logger.info("Попытка автоматической авторизации...")
-            qobuz_client = get_qobuz_client(email, password)
-            logger.info(f"✓ Авторизован: {qobuz_client.label}")
-            
-        except Exception as e:
-            logger.warning(f"Автоматическая авторизация не удалась: {e}")
+        # Окно показывается сразу, авторизация (загрузка бандла, вход,
+        # подбор секрета - несколько секунд) идёт в фоне
+        main_window = MainWindow()
+        main_window.set_settings(settings)
+        
+        def on_auth_failed(error):
+            logger.warning(f"Автоматическая авторизация не удалась: {error}")
             
             # Показываем сообщение и удаляем невалидные учетные данные
             from PyQt6.QtWidgets import QMessageBox
-            QMessageBox.warning(
-                None,
-                "Ошибка авторизации",
-                f"Сохранённые учетные данные больше не действительны.\n\n"
-                f"Ошибка: {str(e)}\n\n"
-                f"Пожалуйста, войдите заново."
-            )
-            
-            # Удаляем невалидные данные
+            QMessageBox.warning(main_window, t('auth_failed_title'), t('auth_failed', error=error))
             config.delete_credentials()
-            qobuz_client = None
-    
-    # Если не авторизованы, показываем окно входа
-    if not qobuz_client:
+            
+            from gui.login_window import LoginWindow
+            login_window = LoginWindow(main_window, config=config)
+            if login_window.exec():
+                main_window.set_client(login_window.get_client())
+            else:
+                logger.info("Выход из приложения")
+                main_window.close()
+        
+        main_window.auth_failed_signal.connect(on_auth_failed)
+        logger.info("Попытка автоматической авторизации...")
+        main_window.start_authentication(email, password)
+    else:
+        # Если не авторизованы, показываем окно входа
         from gui.login_window import LoginWindow
         
         login_window = LoginWindow(config=config)
-        if login_window.exec():
-            qobuz_client = login_window.get_client()
-        else:
+        if not login_window.exec():
             # Пользователь отменил вход
             logger.info("Выход из приложения")
             return 0
-    
-    # Создаем главное окно
-    from gui.main_window import MainWindow
-    
-    main_window = MainWindow(qobuz_client)
-    main_window.set_settings(settings)
+        
+        main_window = MainWindow(login_window.get_client())
+        main_window.set_settings(settings)
     
     # Сохраняем настройки при закрытии
     def save_settings_on_close():
@@ -285,5 +123,6 @@ if __name__ == '__main__':
         sys.exit(main())
     except Exception as e:
         logger.exception("Критическая ошибка")
+        from PyQt6.QtWidgets import QMessageBox
         QMessageBox.critical(None, "Ошибка", f"Критическая ошибка:\n{str(e)}")
         sys.exit(1)
@@ -0,0 +1,59 @@
+"""Тесты потоковой записи ответа в файл (core/transfer.py)"""
+import io
+import unittest
+
+from core.transfer import AdaptiveChunkSizer, stream_to_file
+
+
+class FakeRaw:
+    """Тело ответа: readinto отдаёт данные порциями"""
+
+    def __init__(self, data: bytes, step: int = 1000):
+        self.data = data
+        self.pos = 0
+        self.step = step
+        self.decode_content = False
+
+    def readinto(self, buf) -> int:
+        n = min(len(buf), self.step, len(self.data) - self.pos)
+        buf[:n] = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+
+class FakeResponse:
+    def __init__(self, data: bytes, step: int = 1000):
+        self.raw = FakeRaw(data, step)
+
+
+class ShortWriteFile(io.RawIOBase):
+    """Файл без буферизации, который за раз записывает не больше limit байт"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b) -> int:
+        part = bytes(b[:self.limit])
+        self.data += part
+        return len(part)
+
+
+class StreamToFileTest(unittest.TestCase):
+
+    def test_short_writes_are_completed(self):
+        payload = bytes(range(256)) * 1000
+        f = ShortWriteFile(limit=777)
+        chunks = []
+        written = stream_to_file(FakeResponse(payload, step=5000), f, on_chunk=chunks.append,
+                                 sizer=AdaptiveChunkSizer(maximum=128 * 1024))
+        self.assertEqual(written, len(payload))
+        self.assertEqual(sum(chunks), len(payload))
+        self.assertEqual(bytes(f.data), payload)
+
+
+if __name__ == '__main__':
+    unittest.main()